@@ -0,0 +1,305 @@
+import os
+import sys
+import asyncio
+import logging
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Any, AsyncContextManager, AsyncIterator, Awaitable, Callable, Deque, Dict, List, Optional, Tuple
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'webhook-sdk'))
+from tracing import summarize
+
+logger = logging.getLogger("agent-pool")
+
+# Errors meaning an agent's MCP servers or their connection broke. Anything
+# else raised while an agent is checked out, e.g. a rejected swap, is a
+# failure of that request and leaves the agent usable
+TRANSPORT_ERRORS: Tuple[type, ...] = (OSError, EOFError)
+try:
+    import anyio
+    TRANSPORT_ERRORS += (anyio.ClosedResourceError, anyio.BrokenResourceError, anyio.EndOfStream)
+except ImportError:
+    pass
+try:
+    from mcp.shared.exceptions import McpError
+    TRANSPORT_ERRORS += (McpError,)
+except ImportError:
+    pass
+
+
+class AgentPoolError(RuntimeError):
+    """Raised when no agent can be checked out of the pool"""
+
+
+class _PoolSlot:
+    """One warm agent instance and the task that owns its MCP servers"""
+
+    def __init__(self, index: int):
+        self.index = index
+        self.agent: Any = None
+        self.generation = 0
+        self.in_use = False
+        self.restart = asyncio.Event()
+        self.task: Optional[asyncio.Task] = None
+        self.cold_starts = 0
+        self.failures = 0
+
+
+class AgentPool:
+    """Pool of long-lived Fast-Agent instances with warm MCP server connections
+
+    Each slot is owned by a dedicated task that enters the agent context
+    (e.g. ``fast.run()``) once and keeps it open, so the MCP subprocess and
+    handshake are paid at startup instead of per event. The context is always
+    entered and exited from the same task, which the MCP stdio transport
+    requires.
+    """
+
+    def __init__(
+        self,
+        factory: Callable[[], AsyncContextManager[Any]],
+        size: int = 1,
+        health_check: Optional[Callable[[Any], Awaitable[bool]]] = None,
+        health_interval: float = 30.0,
+        restart_backoff: float = 1.0,
+        max_restart_backoff: float = 30.0,
+        sample_size: int = 1000,
+        max_start_failures: int = 3,
+        unhealthy_errors: Tuple[type, ...] = TRANSPORT_ERRORS,
+    ):
+        """Initialize the agent pool
+
+        Args:
+            factory: Callable returning an async context manager that yields an agent (e.g. ``fast.run``)
+            size: Number of warm agent instances to keep running
+            health_check: Optional coroutine returning False if an idle agent should be restarted
+            health_interval: Seconds between health checks of idle agents
+            restart_backoff: Initial delay before restarting a slot that failed to start
+            max_restart_backoff: Upper bound for the restart delay
+            sample_size: Number of recent timing samples kept for the metrics
+            max_start_failures: Failed warm-ups of every slot after which ``start`` gives up
+            unhealthy_errors: Exceptions raised inside ``checkout`` that restart the agent
+        """
+        if size < 1:
+            raise ValueError("Agent pool size must be at least 1")
+
+        self.factory = factory
+        self.size = size
+        self.health_check = health_check
+        self.health_interval = health_interval
+        self.restart_backoff = restart_backoff
+        self.max_restart_backoff = max_restart_backoff
+        self.max_start_failures = max_start_failures
+        self.unhealthy_errors = unhealthy_errors
+
+        self._slots: List[_PoolSlot] = []
+        self._idle: Optional["asyncio.Queue[Tuple[_PoolSlot, int]]"] = None
+        self._health_task: Optional[asyncio.Task] = None
+        self._closing = False
+
+        # Metrics
+        self._cold_start_times: Deque[float] = deque(maxlen=sample_size)
+        self._dispatch_times: Deque[float] = deque(maxlen=sample_size)
+        self.checkouts = 0
+        self.restarts = 0
+        self.health_failures = 0
+
+    async def start(self, wait: bool = True, timeout: Optional[float] = None):
+        """Start all pool slots
+
+        Args:
+            wait: Wait until at least one agent is warm before returning
+            timeout: Maximum seconds to wait for the first warm agent, None to wait
+                until every slot failed ``max_start_failures`` times
+
+        Raises:
+            AgentPoolError: If no agent got warm, e.g. because of a bad MCP server
+                config; the pool is stopped again
+        """
+        self._closing = False
+        self._idle = asyncio.Queue()
+        self._slots = [_PoolSlot(i) for i in range(self.size)]
+        for slot in self._slots:
+            slot.task = asyncio.create_task(self._run_slot(slot))
+
+        if self.health_check:
+            self._health_task = asyncio.create_task(self._health_loop())
+
+        if wait:
+            deadline = None if timeout is None else time.perf_counter() + timeout
+            while self._idle.empty():
+                # Slots restart themselves, so count their failed warm-ups
+                error = None
+                if all(slot.task.done() for slot in self._slots):
+                    error = "All agent pool slots exited during startup"
+                elif all(slot.cold_starts == 0 and slot.failures >= self.max_start_failures
+                         for slot in self._slots):
+                    error = f"Every agent pool slot failed to start {self.max_start_failures} times"
+                elif deadline is not None and time.perf_counter() > deadline:
+                    error = f"No agent warm within {timeout}s"
+                if error:
+                    await self.stop()
+                    raise AgentPoolError(error)
+                await asyncio.sleep(0.05)
+
+    async def stop(self):
+        """Shut down all agents and their MCP servers"""
+        self._closing = True
+        if self._health_task:
+            self._health_task.cancel()
+        for slot in self._slots:
+            slot.restart.set()
+            # Slots still starting or backing off hold nothing to tear down
+            if slot.agent is None and slot.task:
+                slot.task.cancel()
+
+        tasks = [slot.task for slot in self._slots if slot.task]
+        if self._health_task:
+            tasks.append(self._health_task)
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._health_task = None
+
+    async def _run_slot(self, slot: _PoolSlot):
+        """Keep one agent instance running, restarting it when it crashes or is marked unhealthy"""
+        backoff = self.restart_backoff
+        while not self._closing:
+            started = time.perf_counter()
+            try:
+                async with self.factory() as agent:
+                    cold_start = time.perf_counter() - started
+                    self._cold_start_times.append(cold_start)
+                    slot.cold_starts += 1
+                    slot.agent = agent
+                    slot.generation += 1
+                    slot.restart.clear()
+                    backoff = self.restart_backoff
+                    logger.info(f"Agent slot {slot.index} warm after {cold_start:.2f}s")
+
+                    self._idle.put_nowait((slot, slot.generation))
+
+                    # Hold the context open until a restart or shutdown is requested,
+                    # and never tear it down underneath a caller that still uses it
+                    await slot.restart.wait()
+                    while slot.in_use and not self._closing:
+                        await asyncio.sleep(0.05)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                slot.failures += 1
+                logger.error(f"Agent slot {slot.index} failed: {str(e)}")
+            finally:
+                slot.agent = None
+
+            if self._closing:
+                break
+
+            self.restarts += 1
+            logger.info(f"Restarting agent slot {slot.index} in {backoff:.1f}s")
+            await asyncio.sleep(backoff)
+            backoff = min(backoff * 2, self.max_restart_backoff)
+
+    async def _health_loop(self):
+        """Periodically check idle agents and restart the unhealthy ones"""
+        while not self._closing:
+            await asyncio.sleep(self.health_interval)
+            for _ in range(self._idle.qsize()):
+                try:
+                    slot, generation = self._idle.get_nowait()
+                except asyncio.QueueEmpty:
+                    break
+                if generation != slot.generation or slot.agent is None:
+                    continue
+
+                try:
+                    healthy = await self.health_check(slot.agent)
+                except Exception as e:
+                    logger.error(f"Health check failed for agent slot {slot.index}: {str(e)}")
+                    healthy = False
+
+                if healthy:
+                    self._idle.put_nowait((slot, generation))
+                else:
+                    self.health_failures += 1
+                    slot.restart.set()
+
+    async def acquire(self, timeout: Optional[float] = None) -> Tuple[_PoolSlot, Any]:
+        """Take a warm agent out of the pool
+
+        Args:
+            timeout: Maximum seconds to wait for a free agent, None to wait forever
+
+        Returns:
+            Tuple of (slot, agent); pass the slot back to ``release``
+        """
+        if self._idle is None or self._closing:
+            raise AgentPoolError("Agent pool is not running")
+
+        started = time.perf_counter()
+        deadline = None if timeout is None else started + timeout
+        while True:
+            remaining = None if deadline is None else max(0.0, deadline - time.perf_counter())
+            try:
+                slot, generation = await asyncio.wait_for(self._idle.get(), remaining)
+            except asyncio.TimeoutError:
+                raise AgentPoolError(f"No agent available within {timeout}s")
+
+            # Skip entries left behind by a slot that has since restarted
+            if generation != slot.generation or slot.agent is None or slot.restart.is_set():
+                continue
+
+            slot.in_use = True
+            self.checkouts += 1
+            self._dispatch_times.append(time.perf_counter() - started)
+            return slot, slot.agent
+
+    def release(self, slot: _PoolSlot, healthy: bool = True):
+        """Return an agent to the pool
+
+        Args:
+            slot: Slot returned by ``acquire``
+            healthy: False to restart the agent and its MCP servers instead of reusing it
+        """
+        slot.in_use = False
+        if not healthy:
+            slot.restart.set()
+        elif not self._closing and slot.agent is not None and not slot.restart.is_set():
+            self._idle.put_nowait((slot, slot.generation))
+
+    @asynccontextmanager
+    async def checkout(self, timeout: Optional[float] = None) -> AsyncIterator[Any]:
+        """Check out a warm agent for the duration of the block
+
+        A transport failure raised inside the block (``unhealthy_errors``)
+        marks the agent unhealthy, so its MCP servers are restarted before it
+        is handed out again. Other exceptions propagate and the agent is reused.
+
+        Args:
+            timeout: Maximum seconds to wait for a free agent
+        """
+        slot, agent = await self.acquire(timeout)
+        healthy = True
+        try:
+            yield agent
+        except self.unhealthy_errors:
+            healthy = False
+            raise
+        finally:
+            self.release(slot, healthy)
+
+    def stats(self) -> Dict[str, Any]:
+        """Return pool metrics
+
+        Returns:
+            Dictionary with slot states, cold start and warm dispatch timings
+        """
+        return {
+            "size": self.size,
+            "idle": self._idle.qsize() if self._idle else 0,
+            "in_use": sum(1 for slot in self._slots if slot.in_use),
+            "checkouts": self.checkouts,
+            "restarts": self.restarts,
+            "health_failures": self.health_failures,
+            "cold_start": summarize(self._cold_start_times, quantiles=(0.5,)),
+            "warm_dispatch": summarize(self._dispatch_times, quantiles=(0.5,)),
+        }
@@ -0,0 +1,379 @@
+#!/usr/bin/env python3
+"""Backtest cast-driven trading signals per author
+
+Replays recorded Neynar cast.created payloads (one JSON object per line,
+as received by WebhookServer) through the intent parser, and prices every
+parsed trade against local OHLC bars to report PnL, slippage and hit rate
+per author, e.g. before adding a KOL to AUTHORIZED_USERS or tuning
+TRADE_LIMIT_USDC.
+
+    python backtest.py --casts casts.jsonl --prices prices/ --horizon 3600
+    python backtest.py --synthetic 300   # benchmark on a year of generated data
+
+Price files are CSVs named after the token symbol (``prices/WETH.csv``),
+priced in USDC, with a header row and the columns
+``timestamp,open,high,low,close``; timestamps are bar open times in unix
+seconds or ISO 8601. Requires NumPy (``pip install numpy``).
+"""
+import os
+import sys
+import csv
+import json
+import time
+import random
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(__file__), 'webhook-sdk'))
+from cast_event import CastEvent
+from intent_parser import QUOTE_SYMBOL, IntentParser
+
+
+@dataclass
+class PriceSeries:
+    """OHLC bars of one token, reduced to the columns the backtest uses"""
+
+    times: np.ndarray  # Bar open times, unix seconds, ascending
+    open: np.ndarray
+    close: np.ndarray
+
+
+@dataclass(frozen=True)
+class BacktestConfig:
+    """How signals are turned into trades"""
+
+    trade_limit: float = 1.0   # Trades are capped at this size, in USDC, like TRADE_LIMIT_USDC
+    latency: float = 5.0       # Seconds from the cast to the swap
+    horizon: float = 3600.0    # Seconds a position is held
+    cost_bps: float = 30.0     # Swap fee and price impact paid on entry and exit, in basis points
+
+
+def _parse_time(value: str) -> int:
+    """Parse a unix timestamp or an ISO 8601 time, naive times being UTC"""
+    try:
+        return int(float(value))
+    except ValueError:
+        parsed = datetime.fromisoformat(value.replace('Z', '+00:00'))
+        if parsed.tzinfo is None:
+            parsed = parsed.replace(tzinfo=timezone.utc)
+        return int(parsed.timestamp())
+
+
+def load_price_file(path: str) -> PriceSeries:
+    """Load a CSV of OHLC bars, see the module docstring for the format"""
+    try:
+        data = np.loadtxt(path, delimiter=',', skiprows=1, usecols=(0, 1, 4), ndmin=2)
+        times = data[:, 0].astype(np.int64)
+    except ValueError:
+        # ISO 8601 timestamps, parsed row by row
+        with open(path, newline='') as f:
+            rows = list(csv.reader(f))[1:]
+        times = np.array([_parse_time(row[0]) for row in rows], dtype=np.int64)
+        data = np.array([[0.0, float(row[1]), float(row[4])] for row in rows]).reshape(-1, 3)
+
+    order = np.argsort(times, kind='stable')
+    return PriceSeries(times=times[order], open=data[order, 1], close=data[order, 2])
+
+
+def load_prices(directory: str) -> Dict[str, PriceSeries]:
+    """Load every ``<SYMBOL>.csv`` in a directory"""
+    prices = {}
+    for name in sorted(os.listdir(directory)):
+        symbol, extension = os.path.splitext(name)
+        if extension.lower() == '.csv':
+            prices[symbol] = load_price_file(os.path.join(directory, name))
+    return prices
+
+
+def load_casts(path: str) -> List[CastEvent]:
+    """Load recorded cast.created payloads, one JSON object per line"""
+    casts = []
+    with open(path) as f:
+        for line in f:
+            if not line.strip():
+                continue
+            payload = json.loads(line)
+            if payload.get('type') == 'cast.created' and isinstance(payload.get('data'), dict):
+                casts.append(CastEvent.from_payload(payload))
+    return casts
+
+
+def group_casts(casts: List[CastEvent]) -> Dict[str, Tuple[Optional[int], np.ndarray, List[str]]]:
+    """Group casts by author into (fid, cast times, texts), skipping casts without a time"""
+    grouped: Dict[str, Tuple[Optional[int], List[int], List[str]]] = {}
+    for cast in casts:
+        if cast.created_at is not None:
+            created_at = int(cast.created_at)
+        elif cast.timestamp:
+            created_at = _parse_time(cast.timestamp)
+        else:
+            continue
+        fid, times, texts = grouped.setdefault(cast.username, (cast.fid, [], []))
+        times.append(created_at)
+        texts.append(cast.text)
+    return {author: (fid, np.array(times, dtype=np.int64), texts)
+            for author, (fid, times, texts) in grouped.items()}
+
+
+# Prices and parser of a worker process, set once by _init_worker
+_prices: Dict[str, PriceSeries] = {}
+_parser: Optional[IntentParser] = None
+
+
+def _init_worker(prices: Dict[str, PriceSeries]):
+    """Keep the prices in the worker, so they are sent once per process instead of per chunk"""
+    global _prices, _parser
+    _prices = prices
+    # Addresses are not needed to backtest, the parser only resolves symbols
+    _parser = IntentParser({QUOTE_SYMBOL: QUOTE_SYMBOL, **{symbol: symbol for symbol in prices}})
+
+
+def _backtest_chunk(authors: List[Tuple[str, Optional[int], np.ndarray, List[str]]],
+                    config: BacktestConfig) -> List[Dict[str, Any]]:
+    """Parse the casts of some authors and price their trades
+
+    Intents are extracted per cast, then every signal of the chunk is
+    aligned with its token's bars at once with ``searchsorted`` and the
+    results are summed per author with ``bincount``.
+    """
+    symbols = list(_prices)
+    token_index = {symbol: i for i, symbol in enumerate(symbols)}
+
+    # Batch intent extraction, parsing repeated texts once
+    parsed: Dict[str, Any] = {}
+    author_ids, times, tokens, sides, amounts, in_quote = [], [], [], [], [], []
+    for author_id, (_, _, cast_times, texts) in enumerate(authors):
+        for created_at, text in zip(cast_times.tolist(), texts):
+            if text not in parsed:
+                parsed[text] = _parser.parse(text)
+            intent = parsed[text]
+            if intent is None:
+                continue
+            author_ids.append(author_id)
+            times.append(created_at)
+            tokens.append(token_index[intent.token])
+            sides.append(1.0 if intent.side == 'buy' else -1.0)
+            amounts.append(float(intent.amount))
+            in_quote.append(intent.unit == QUOTE_SYMBOL)
+
+    author_ids = np.array(author_ids, dtype=np.int64)
+    times = np.array(times, dtype=np.int64)
+    tokens = np.array(tokens, dtype=np.int64)
+    sides = np.array(sides)
+    amounts = np.array(amounts)
+    in_quote = np.array(in_quote, dtype=bool)
+
+    # Per-signal results, NaN until priced
+    pnl = np.full(len(times), np.nan)
+    volume = np.full(len(times), np.nan)
+    slippage = np.full(len(times), np.nan)
+    cost = config.cost_bps / 1e4
+
+    for token, symbol in enumerate(symbols):
+        mask = np.flatnonzero(tokens == token)
+        series = _prices[symbol]
+        if not len(mask) or not len(series.times):
+            continue
+        signal_times = times[mask]
+        # Price when the cast was made: close of the last bar opened before it
+        quoted = np.searchsorted(series.times, signal_times, side='right') - 1
+        # Fill at the open of the first bar after the pipeline latency
+        entry = np.searchsorted(series.times, signal_times + config.latency, side='left')
+        # Exit at the close of the last bar opened within the horizon
+        entry_times = series.times[np.minimum(entry, len(series.times) - 1)]
+        exit_ = np.searchsorted(series.times, entry_times + config.horizon, side='right') - 1
+        valid = ((quoted >= 0) & (entry < len(series.times))
+                 & (entry_times + config.horizon <= series.times[-1]))
+        if not valid.any():
+            continue
+
+        rows = mask[valid]
+        side = sides[rows]
+        quote_price = series.close[quoted[valid]]
+        entry_fill = series.open[entry[valid]] * (1 + side * cost)
+        exit_fill = series.close[exit_[valid]] * (1 - side * cost)
+
+        size = np.where(in_quote[rows], amounts[rows], amounts[rows] * quote_price)
+        size = np.minimum(size, config.trade_limit)
+        volume[rows] = size
+        pnl[rows] = size * side * (exit_fill / entry_fill - 1)
+        # Adverse move from the cast to the fill, including the entry cost
+        slippage[rows] = side * (entry_fill / quote_price - 1) * 1e4
+
+    priced = ~np.isnan(pnl)
+    count = len(authors)
+    signals = np.bincount(author_ids, minlength=count)
+    trades = np.bincount(author_ids[priced], minlength=count)
+    wins = np.bincount(author_ids[priced & (np.nan_to_num(pnl) > 0)], minlength=count)
+    pnl_sum = np.bincount(author_ids[priced], weights=pnl[priced], minlength=count)
+    volume_sum = np.bincount(author_ids[priced], weights=volume[priced], minlength=count)
+    slippage_sum = np.bincount(author_ids[priced], weights=slippage[priced], minlength=count)
+
+    results = []
+    for author_id, (author, fid, cast_times, _) in enumerate(authors):
+        n = int(trades[author_id])
+        results.append({
+            "author": author,
+            "fid": fid,
+            "casts": len(cast_times),
+            "signals": int(signals[author_id]),
+            "trades": n,
+            "volume_usdc": round(float(volume_sum[author_id]), 6),
+            "pnl_usdc": round(float(pnl_sum[author_id]), 6),
+            "return": round(float(pnl_sum[author_id] / volume_sum[author_id]), 6) if n else 0.0,
+            "hit_rate": round(float(wins[author_id] / n), 4) if n else 0.0,
+            "avg_slippage_bps": round(float(slippage_sum[author_id] / n), 2) if n else 0.0,
+        })
+    return results
+
+
+def _chunk_authors(grouped: Dict[str, Tuple[Optional[int], np.ndarray, List[str]]],
+                   chunks: int) -> List[List[Tuple[str, Optional[int], np.ndarray, List[str]]]]:
+    """Split authors into chunks of similar cast counts, largest authors first"""
+    buckets: List[List[Tuple[str, Optional[int], np.ndarray, List[str]]]] = [[] for _ in range(chunks)]
+    sizes = [0] * chunks
+    for author, (fid, times, texts) in sorted(grouped.items(), key=lambda item: -len(item[1][2])):
+        smallest = sizes.index(min(sizes))
+        buckets[smallest].append((author, fid, times, texts))
+        sizes[smallest] += len(texts)
+    return [bucket for bucket in buckets if bucket]
+
+
+def run_backtest(casts: List[CastEvent], prices: Dict[str, PriceSeries],
+                 config: BacktestConfig = BacktestConfig(), workers: Optional[int] = None) -> Dict[str, Any]:
+    """Backtest the casts of every author
+
+    Args:
+        casts: Recorded casts, see ``load_casts``
+        prices: Bars per token symbol, see ``load_prices``
+        config: Trade sizing, latency, holding period and costs
+        workers: Worker processes, authors being split between them; defaults to the CPU count, 1 runs in process
+
+    Returns:
+        Dictionary with per-author results sorted by PnL and the totals
+    """
+    started = time.perf_counter()
+    grouped = group_casts(casts)
+    workers = workers or os.cpu_count() or 1
+
+    if workers == 1 or len(grouped) < 2:
+        _init_worker(prices)
+        results = _backtest_chunk(_chunk_authors(grouped, 1)[0], config) if grouped else []
+    else:
+        # A few chunks per worker, so one prolific author does not leave the others idle
+        chunks = _chunk_authors(grouped, workers * 4)
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(prices,)) as pool:
+            results = [result for chunk in pool.map(_backtest_chunk, chunks, [config] * len(chunks))
+                       for result in chunk]
+
+    results.sort(key=lambda result: -result["pnl_usdc"])
+    trades = sum(result["trades"] for result in results)
+    volume = sum(result["volume_usdc"] for result in results)
+    pnl = sum(result["pnl_usdc"] for result in results)
+    return {
+        "authors": results,
+        "total": {
+            "authors": len(results),
+            "casts": sum(result["casts"] for result in results),
+            "signals": sum(result["signals"] for result in results),
+            "trades": trades,
+            "volume_usdc": round(volume, 6),
+            "pnl_usdc": round(pnl, 6),
+            "return": round(pnl / volume, 6) if volume else 0.0,
+            "hit_rate": round(sum(result["hit_rate"] * result["trades"] for result in results) / trades, 4)
+            if trades else 0.0,
+            "avg_slippage_bps": round(sum(result["avg_slippage_bps"] * result["trades"]
+                                          for result in results) / trades, 2) if trades else 0.0,
+        },
+        "config": config.__dict__,
+        "elapsed": time.perf_counter() - started,
+    }
+
+
+def synthetic_data(authors: int = 300, casts_per_author: int = 2000, days: int = 365,
+                   seed: int = 5) -> Tuple[List[CastEvent], Dict[str, PriceSeries]]:
+    """Generate minute bars as random walks and casts mixing commands with chatter"""
+    rng = np.random.default_rng(seed)
+    start = 1_704_067_200  # 2024-01-01
+    times = start + 60 * np.arange(days * 24 * 60, dtype=np.int64)
+    prices = {}
+    for symbol, initial in [('WETH', 3000.0), ('WBTC', 60000.0), ('WMATIC', 0.7)]:
+        close = initial * np.exp(np.cumsum(rng.normal(0, 0.0008, len(times))))
+        prices[symbol] = PriceSeries(times=times, open=np.concatenate(([initial], close[:-1])), close=close)
+
+    texts = ["buy 0.5 USDC of WETH", "buy $1 worth of WBTC", "sell WETH for 0.5 USDC",
+             "buy 0.001 WETH", "sell 10 wmatic", "buy WMATIC with 0.25 USDC",
+             "gm frens", "ETH looks strong here", "new blog post is up, link below"]
+    pick = random.Random(seed)
+    casts = []
+    for author in range(authors):
+        for created_at in np.sort(rng.integers(start, times[-1], casts_per_author)).tolist():
+            casts.append(CastEvent(hash=None, fid=author, username=f"author{author}",
+                                   text=pick.choice(texts), created_at=created_at))
+    return casts, prices
+
+
+def measure_backtest(authors: int = 300, workers: Optional[int] = None):
+    """Time a backtest over a year of minute bars and the casts of many authors"""
+    started = time.perf_counter()
+    casts, prices = synthetic_data(authors)
+    print(f"Generated {len(casts)} casts by {authors} authors and "
+          f"{sum(len(series.times) for series in prices.values())} bars in {time.perf_counter() - started:.1f} s")
+    for label, count in [("in process", 1), (f"{workers or os.cpu_count()} worker(s)", workers)]:
+        report = run_backtest(casts, prices, workers=count)
+        print(f"Backtest {label}: {report['elapsed']:.2f} s, {report['total']}")
+
+
+def print_report(report: Dict[str, Any], top: int = 20):
+    """Print the totals and the best and worst authors"""
+    total = report["total"]
+    print("\n=== Backtest ===\n")
+    print(f"Authors: {total['authors']}  casts: {total['casts']}  signals: {total['signals']}  "
+          f"trades: {total['trades']}  ({report['elapsed']:.2f} s)")
+    print(f"PnL: {total['pnl_usdc']:+.4f} USDC on {total['volume_usdc']:.2f} USDC ({total['return']:+.2%}), "
+          f"hit rate {total['hit_rate']:.1%}, slippage {total['avg_slippage_bps']:.1f} bps\n")
+    authors = report["authors"]
+    shown = authors if len(authors) <= 2 * top else authors[:top] + authors[-top:]
+    print(f"{'author':<24} {'trades':>7} {'pnl usdc':>10} {'return':>8} {'hit rate':>9} {'slip bps':>9}")
+    for result in shown:
+        print(f"{result['author']:<24} {result['trades']:>7} {result['pnl_usdc']:>+10.4f} "
+              f"{result['return']:>+8.2%} {result['hit_rate']:>9.1%} {result['avg_slippage_bps']:>9.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Backtest cast-driven trading signals per author")
+    parser.add_argument("--casts", help="Recorded cast.created payloads, one JSON object per line")
+    parser.add_argument("--prices", default="prices", help="Directory of <SYMBOL>.csv OHLC files priced in USDC")
+    parser.add_argument("--trade-limit", type=float, default=1.0, help="Trade size cap in USDC (TRADE_LIMIT_USDC)")
+    parser.add_argument("--latency", type=float, default=5.0, help="Seconds from the cast to the swap")
+    parser.add_argument("--horizon", type=float, default=3600.0, help="Seconds a position is held")
+    parser.add_argument("--cost-bps", type=float, default=30.0, help="Swap cost per side in basis points")
+    parser.add_argument("--workers", type=int, help="Worker processes (default: CPU count, 1 runs in process)")
+    parser.add_argument("--top", type=int, default=20, help="Best and worst authors shown")
+    parser.add_argument("--synthetic", type=int, metavar="AUTHORS",
+                        help="Benchmark on a year of generated data for this many authors")
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON")
+    args = parser.parse_args()
+
+    if args.synthetic:
+        measure_backtest(args.synthetic, args.workers)
+        return
+    if not args.casts:
+        parser.error("--casts is required unless --synthetic is given")
+
+    config = BacktestConfig(trade_limit=args.trade_limit, latency=args.latency,
+                            horizon=args.horizon, cost_bps=args.cost_bps)
+    report = run_backtest(load_casts(args.casts), load_prices(args.prices), config, args.workers)
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print_report(report, args.top)
+
+
+if __name__ == "__main__":
+    main()
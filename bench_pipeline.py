@@ -0,0 +1,295 @@
+#!/usr/bin/env python3
+"""Replay and load-test harness for the webhook -> trade pipeline
+
+Replays recorded or synthetic Neynar cast.created payloads against the
+FastAPI app in-process, with a stub agent and stub MCP server standing in
+for the LLM and the chain, and reports throughput, latency percentiles,
+queue growth and memory.
+
+    python bench_pipeline.py --events 2000 --rate 500 --concurrency 50
+    python bench_pipeline.py --replay casts.jsonl --llm-latency 0.5
+    python bench_pipeline.py --server-only   # without quantar.py / Fast-Agent
+"""
+import os
+import sys
+import json
+import time
+import random
+import asyncio
+import argparse
+import resource
+import contextlib
+from types import SimpleNamespace
+from typing import Any, Dict, List, Optional
+
+import httpx
+
+sys.path.append(os.path.join(os.path.dirname(__file__), 'webhook-sdk'))
+from webhook_server import WebhookServer
+from tracing import Histogram, span, tracer
+from agent_pool import AgentPool
+from execution_router import ChainExecutor, ExecutionRouter
+from trade_policy import PolicyEngine
+
+# Cast texts used for synthetic payloads, mixing fast-path commands,
+# messages that need the LLM and chatter the prefilter should drop
+SYNTHETIC_TEXTS = [
+    "buy 0.5 USDC of WETH",
+    "buy $1 worth of WBTC",
+    "buy WMATIC with 0.25 USDC",
+    "ETH looks strong here, adding a small position",
+    "Sell some $MATIC, the unlock is coming",
+    "gm frens",
+    "what a great conference",
+    "new blog post is up, link below",
+]
+
+
+class StubMCPServer:
+    """Stands in for the Polygon MCP server: tools return after a fixed delay"""
+
+    def __init__(self, latency: float):
+        self.latency = latency
+        self.calls = 0
+
+    async def call_tool(self, name, arguments=None, *args, **kwargs):
+        await asyncio.sleep(self.latency)
+        self.calls += 1
+        return {"tool": name, "tx_hash": f"0x{random.getrandbits(256):064x}"}
+
+    async def list_tools(self):
+        return SimpleNamespace(tools=["inch_swap", "get_gas_price"])
+
+
+class StubAnalyst:
+    """Stands in for a signal analyst: sleeps, then answers with a JSON decision"""
+
+    def __init__(self, latency: float):
+        self.latency = latency
+
+    async def send(self, prompt: str) -> str:
+        await asyncio.sleep(self.latency)
+        side = "sell" if "sell" in prompt.lower() else "buy"
+        return json.dumps({"trade": True, "side": side, "token": "WETH", "amount_usdc": 0.1, "reason": "stub"})
+
+
+class StubAgent:
+    """Stands in for the Fast-Agent app: each LLM turn sleeps, then calls one tool"""
+
+    def __init__(self, llm_latency: float, tool_latency: float):
+        self.llm_latency = llm_latency
+        self.default = StubMCPServer(tool_latency)
+        self.signal_analyst = StubAnalyst(llm_latency)
+        self.signal_analyst_fast = StubAnalyst(llm_latency / 2)
+
+    async def send(self, prompt: str) -> str:
+        await asyncio.sleep(self.llm_latency)
+        await self.default.call_tool("inch_swap", {"prompt_chars": len(prompt)})
+        return "stub trade executed"
+
+
+def synthetic_payloads(count: int, username: str, fid: Optional[int] = None) -> List[Dict[str, Any]]:
+    """Build cast.created payloads shaped like the ones Neynar delivers"""
+    payloads = []
+    now = int(time.time())
+    for i in range(count):
+        payloads.append({
+            "created_at": now + i,
+            "type": "cast.created",
+            "data": {
+                "object": "cast",
+                "hash": f"0x{i:040x}",
+                "thread_hash": f"0x{i:040x}",
+                "parent_hash": None,
+                "author": {
+                    "object": "user",
+                    "fid": fid,
+                    "username": username if i % 10 else "someone_else",
+                    "display_name": username,
+                },
+                "text": SYNTHETIC_TEXTS[i % len(SYNTHETIC_TEXTS)],
+                "timestamp": "2025-04-03T12:00:00.000Z",
+                "embeds": [],
+                "reactions": {"likes_count": 0, "recasts_count": 0},
+            },
+        })
+    return payloads
+
+
+def load_payloads(path: str) -> List[Dict[str, Any]]:
+    """Load recorded payloads, one JSON object per line"""
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def percentiles(histogram: Histogram) -> str:
+    summary = histogram.summary()
+    if not summary["count"]:
+        return "n/a"
+    return (f"p50 {summary['p50_ms']:.2f} ms, p95 {summary['p95_ms']:.2f} ms, "
+            f"p99 {summary['p99_ms']:.2f} ms, max {summary['max_ms']:.2f} ms")
+
+
+async def run_benchmark(args) -> Dict[str, Any]:
+    if args.server_only:
+        async def callback(event_data):
+            with span("stub_callback"):
+                await asyncio.sleep(args.llm_latency)
+    else:
+        import quantar
+
+        @contextlib.asynccontextmanager
+        async def stub_agent_factory():
+            await asyncio.sleep(args.cold_start)
+            agent = StubAgent(args.llm_latency, args.tool_latency)
+            quantar.instrument_tool_calls(agent.default)
+            yield agent
+
+        quantar.agent_pool = AgentPool(stub_agent_factory, size=args.pool_size,
+                                       health_check=quantar.check_agent_health)
+        quantar.execution_router = ExecutionRouter({
+            'polygon': ChainExecutor('polygon', quantar.agent_pool, concurrency=args.chain_concurrency),
+        })
+        await quantar.execution_router.start()
+        quantar.analyst_pool = AgentPool(stub_agent_factory, size=args.pool_size)
+        await quantar.analyst_pool.start()
+        callback = quantar.process_farcaster_event
+
+    if args.replay:
+        payloads = load_payloads(args.replay)
+    else:
+        username = "bench_user" if args.server_only else quantar.AUTHORIZED_USERS[0]
+        payloads = synthetic_payloads(args.events, username)
+        if not args.server_only:
+            # Without cooldowns or spend windows, so the policy does not throttle the load
+            quantar.trade_policy = PolicyEngine(defaults={'trade_limit_usdc': quantar.TRADE_LIMIT_USDC},
+                                                authors=[{'username': username}])
+    bodies = [json.dumps(payload).encode() for payload in payloads]
+
+    server = WebhookServer(
+        callback=callback,
+        queue_size=args.queue_size,
+        workers=args.workers,
+        overflow_policy=args.overflow_policy,
+    )
+    await server.start()
+
+    ack_latency = Histogram()
+    statuses: Dict[int, int] = {}
+    depth_samples: List[int] = []
+    semaphore = asyncio.Semaphore(args.concurrency)
+    transport = httpx.ASGITransport(app=server.app)
+
+    async def sample_queue(stop: asyncio.Event):
+        while not stop.is_set():
+            depth_samples.append(server.event_queue.stats()["depth"])
+            await asyncio.sleep(0.05)
+
+    async def send(client: httpx.AsyncClient, body: bytes):
+        async with semaphore:
+            started = time.perf_counter()
+            response = await client.post("/webhook", content=body)
+            ack_latency.record(time.perf_counter() - started)
+            statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+
+    rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    stop_sampling = asyncio.Event()
+    sampler = asyncio.create_task(sample_queue(stop_sampling))
+
+    # Quiet the per-event prints and logs of the pipeline while measuring
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        started = time.perf_counter()
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            tasks = []
+            interval = 1.0 / args.rate if args.rate else 0.0
+            for i, body in enumerate(bodies):
+                if interval:
+                    # Open-loop arrivals: keep the schedule even if the server falls behind
+                    delay = started + i * interval - time.perf_counter()
+                    if delay > 0:
+                        await asyncio.sleep(delay)
+                tasks.append(asyncio.create_task(send(client, body)))
+            await asyncio.gather(*tasks)
+        ingest_elapsed = time.perf_counter() - started
+
+        await server.event_queue.stop(drain=True)
+        total_elapsed = time.perf_counter() - started
+
+    stop_sampling.set()
+    await sampler
+    await server.stop()
+    if not args.server_only:
+        await quantar.execution_router.stop()
+        await quantar.analyst_pool.stop()
+
+    rss_after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    queue_stats = server.event_queue.stats()
+    return {
+        "events": len(bodies),
+        "statuses": statuses,
+        "ingest_throughput": len(bodies) / ingest_elapsed,
+        "processing_throughput": queue_stats["processed"] / total_elapsed,
+        "ack_latency": ack_latency,
+        "end_to_end": tracer.histograms.get("total", Histogram()),
+        "stages": tracer.stats(),
+        "max_queue_depth": max(depth_samples, default=0),
+        "avg_queue_depth": sum(depth_samples) / len(depth_samples) if depth_samples else 0,
+        "queue": queue_stats,
+        "execution": None if args.server_only else quantar.execution_router.stats(),
+        "llm_decisions": None if args.server_only else quantar.signal_decider.stats(),
+        "max_rss_mb": rss_after / 1024,
+        "rss_growth_mb": (rss_after - rss_before) / 1024,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load-test the webhook -> trade pipeline")
+    parser.add_argument("--replay", type=str, help="JSON-lines file of recorded webhook payloads")
+    parser.add_argument("--events", type=int, default=1000, help="Number of synthetic events")
+    parser.add_argument("--rate", type=float, default=0, help="Arrival rate in events/s (0 = as fast as possible)")
+    parser.add_argument("--concurrency", type=int, default=50, help="Maximum in-flight HTTP requests")
+    parser.add_argument("--workers", type=int, default=4, help="Event queue workers")
+    parser.add_argument("--queue-size", type=int, default=1000, help="Event queue size")
+    parser.add_argument("--overflow-policy", type=str, default="drop_oldest", help="drop_oldest, reject or block")
+    parser.add_argument("--pool-size", type=int, default=2, help="Stub agent pool size")
+    parser.add_argument("--chain-concurrency", type=int, default=1, help="Trades in flight per chain")
+    parser.add_argument("--llm-latency", type=float, default=0.05, help="Stub LLM turn latency in seconds")
+    parser.add_argument("--tool-latency", type=float, default=0.01, help="Stub MCP tool latency in seconds")
+    parser.add_argument("--cold-start", type=float, default=0.5, help="Stub agent cold start in seconds")
+    parser.add_argument("--server-only", action="store_true", help="Benchmark WebhookServer with a stub callback")
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON")
+    args = parser.parse_args()
+
+    report = asyncio.run(run_benchmark(args))
+
+    if args.json:
+        report["ack_latency"] = report["ack_latency"].summary()
+        report["end_to_end"] = report["end_to_end"].summary()
+        print(json.dumps(report, indent=2))
+        return
+
+    print("\n=== Pipeline Benchmark ===\n")
+    print(f"Events: {report['events']}  HTTP statuses: {report['statuses']}")
+    print(f"Ingest throughput: {report['ingest_throughput']:.1f} events/s")
+    print(f"Processing throughput: {report['processing_throughput']:.1f} events/s")
+    print(f"Ack latency: {percentiles(report['ack_latency'])}")
+    print(f"End-to-end latency: {percentiles(report['end_to_end'])}")
+    print(f"Queue depth: max {report['max_queue_depth']}, avg {report['avg_queue_depth']:.1f}, "
+          f"dropped {report['queue']['dropped']}, rejected {report['queue']['rejected']}")
+    print(f"Memory: max RSS {report['max_rss_mb']:.1f} MB (+{report['rss_growth_mb']:.1f} MB during run)")
+    for chain, stats in (report["execution"] or {}).items():
+        print(f"Chain {chain}: {stats['completed']} trade(s), max queued {stats['max_queued']}, "
+              f"wait p50 {stats['wait_time'].get('p50_ms', 0):.2f} ms, "
+              f"execution p50 {stats['execution_time'].get('p50_ms', 0):.2f} ms")
+    if report["llm_decisions"]:
+        print(f"LLM decisions: wins {report['llm_decisions']['wins']}, hedges {report['llm_decisions']['hedges']}, "
+              f"timeouts {report['llm_decisions']['timeouts']}")
+    print("\nStages:")
+    for name, summary in report["stages"].items():
+        if summary.get("count"):
+            print(f"  {name:<16} n={summary['count']:<6} p50 {summary['p50_ms']:.3f} ms  "
+                  f"p95 {summary['p95_ms']:.3f} ms  p99 {summary['p99_ms']:.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
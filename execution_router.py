@@ -0,0 +1,177 @@
+import asyncio
+import itertools
+import logging
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, Optional
+
+from agent_pool import AgentPool
+from tracing import summarize
+
+logger = logging.getLogger("execution-router")
+
+
+class ChainExecutor:
+    """Runs trades on one chain through its own agent pool
+
+    At most ``concurrency`` trades run at once and waiting trades are started
+    strictly in arrival order. Trades on a chain are signed by the same
+    wallet, and its MCP server takes the next nonce at send time, so with the
+    default concurrency of 1 transactions reach the chain in the order the
+    signals arrived and never race for a nonce.
+    """
+
+    def __init__(self, chain: str, pool: AgentPool, concurrency: int = 1, sample_size: int = 1000):
+        """Initialize the executor
+
+        Args:
+            chain: Chain name, e.g. 'polygon'
+            pool: Agent pool whose agents are connected to the chain's MCP server
+            concurrency: Maximum number of trades in flight on this chain
+            sample_size: Number of recent timing samples kept for the metrics
+        """
+        if concurrency < 1:
+            raise ValueError("concurrency must be at least 1")
+
+        self.chain = chain
+        self.pool = pool
+        self.concurrency = concurrency
+
+        self._running = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+        self._sequence = itertools.count(1)
+
+        # Metrics
+        self._wait_times: Deque[float] = deque(maxlen=sample_size)
+        self._execution_times: Deque[float] = deque(maxlen=sample_size)
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.max_queued = 0
+        self.last_sequence = 0
+
+    async def submit(self, fn: Callable[[Any], Awaitable[Any]]) -> Any:
+        """Run a trade on this chain once it is its turn
+
+        Args:
+            fn: Coroutine function called with an agent checked out of the chain's pool
+
+        Returns:
+            Result of ``fn``
+        """
+        sequence = next(self._sequence)
+        self.submitted += 1
+        enqueued = time.perf_counter()
+        await self._acquire()
+        started = time.perf_counter()
+        self._wait_times.append(started - enqueued)
+        self.last_sequence = sequence
+        try:
+            async with self.pool.checkout() as agent:
+                result = await fn(agent)
+            self.completed += 1
+            return result
+        except Exception:
+            self.failed += 1
+            raise
+        finally:
+            self._execution_times.append(time.perf_counter() - started)
+            self._release()
+
+    async def _acquire(self):
+        """Wait for a free execution slot, first come first served"""
+        if self._running < self.concurrency and not self._waiters:
+            self._running += 1
+            return
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        self.max_queued = max(self.max_queued, len(self._waiters))
+        try:
+            # The releasing trade hands its slot over, _running stays the same
+            await waiter
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                self._release()
+            else:
+                self._waiters.remove(waiter)
+            raise
+
+    def _release(self):
+        """Hand the slot to the next waiting trade, or free it"""
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self._running -= 1
+
+    def stats(self) -> Dict[str, Any]:
+        """Return queue, latency and outcome metrics of the chain"""
+        return {
+            "concurrency": self.concurrency,
+            "in_flight": self._running,
+            "queued": len(self._waiters),
+            "max_queued": self.max_queued,
+            "submitted": self.submitted,
+            "completed": self.completed,
+            "failed": self.failed,
+            "last_sequence": self.last_sequence,
+            "wait_time": summarize(self._wait_times),
+            "execution_time": summarize(self._execution_times),
+        }
+
+
+class ExecutionRouter:
+    """Maps trades to chains by token and runs each chain independently
+
+    Every chain has its own executor and agent pool, so a slow swap on one
+    chain never holds up trades on another.
+    """
+
+    def __init__(
+        self,
+        executors: Dict[str, ChainExecutor],
+        token_chains: Optional[Dict[str, str]] = None,
+        default_chain: Optional[str] = None,
+    ):
+        """Initialize the router
+
+        Args:
+            executors: Executor per chain name
+            token_chains: Chain a token is traded on, e.g. {'WBTC': 'ethereum'}
+            default_chain: Chain for tokens not in ``token_chains``, defaults to the first executor
+        """
+        if not executors:
+            raise ValueError("At least one chain executor is required")
+        self.executors = executors
+        self.token_chains = token_chains or {}
+        self.default_chain = default_chain or next(iter(executors))
+        for token, chain in self.token_chains.items():
+            if chain not in executors:
+                raise ValueError(f"Token {token} is mapped to unknown chain {chain}")
+
+    def chain_for(self, token: str) -> str:
+        """Return the chain a token is traded on"""
+        return self.token_chains.get(token, self.default_chain)
+
+    async def execute(self, chain: str, fn: Callable[[Any], Awaitable[Any]]) -> Any:
+        """Run a trade on a chain
+
+        Args:
+            chain: Chain name, see ``chain_for``
+            fn: Coroutine function called with an agent of that chain
+        """
+        return await self.executors[chain].submit(fn)
+
+    async def start(self):
+        """Warm up the agent pools of all chains concurrently"""
+        await asyncio.gather(*(executor.pool.start() for executor in self.executors.values()))
+
+    async def stop(self):
+        """Shut down the agent pools of all chains"""
+        await asyncio.gather(*(executor.pool.stop() for executor in self.executors.values()),
+                             return_exceptions=True)
+
+    def stats(self) -> Dict[str, Any]:
+        """Return executor metrics per chain"""
+        return {chain: executor.stats() for chain, executor in self.executors.items()}
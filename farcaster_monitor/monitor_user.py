@@ -1,9 +1,16 @@
 import os
+import sys
 import json
+import asyncio
 import requests
 from dotenv import load_dotenv
 from datetime import datetime
 
+# 复用 webhook-sdk 中的异步客户端和用户目录
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'webhook-sdk'))
+from neynar_client import AsyncNeynarClient
+from user_directory import UserDirectory
+
 # 加载环境变量
 load_dotenv(dotenv_path='../.env')
 
@@ -46,6 +53,16 @@ def get_user_by_username(username):
         raise
 
 
+async def resolve_users(usernames):
+    """并发解析多个用户名，返回 用户名 -> 用户信息"""
+    async with AsyncNeynarClient(api_key=NEYNAR_API_KEY) as client:
+        directory = UserDirectory(client)
+        fids = await directory.resolve(usernames)
+        # 按FID批量获取用户信息
+        users = await directory.get_users(fid for fid in fids.values() if fid)
+    return {name: users.get(fid) for name, fid in fids.items() if fid}
+
+
 def get_user_casts(fid):
     """获取指定用户的casts"""
     try:
@@ -95,9 +112,12 @@ def search_vitalik():
     # 使用多个搜索关键词
     search_terms = ["vitalik.eth", "vitalik"]
 
+    # 一次并发解析所有关键词
+    print(f"正在搜索: {', '.join(search_terms)}...")
+    users = asyncio.run(resolve_users(search_terms))
+
     for term in search_terms:
-        print(f"正在搜索: {term}...")
-        user = get_user_by_username(term)
+        user = users.get(term)
         if user:
             fid = user.get('fid')
             display_name = user.get('display_name', '')
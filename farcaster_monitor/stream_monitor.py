@@ -0,0 +1,260 @@
+import os
+import sys
+import time
+import heapq
+import asyncio
+import logging
+import argparse
+from datetime import datetime
+from typing import Any, AsyncIterator, Dict, Iterable, List, Optional
+
+# 复用 webhook-sdk 中的异步 Neynar 客户端
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'webhook-sdk'))
+from neynar_client import AsyncNeynarClient
+
+logger = logging.getLogger("stream-monitor")
+
+
+def cast_to_event(cast: Dict[str, Any]) -> Dict[str, Any]:
+    """将cast包装成与Neynar webhook相同的事件格式
+
+    Args:
+        cast: Neynar API返回的cast
+
+    Returns:
+        WebhookServer.submit可以直接处理的 cast.created 事件
+    """
+    created_at = int(time.time())
+    timestamp = cast.get('timestamp')
+    if timestamp:
+        try:
+            created_at = int(datetime.fromisoformat(timestamp.replace('Z', '+00:00')).timestamp())
+        except ValueError:
+            pass
+    return {"type": "cast.created", "created_at": created_at, "data": cast}
+
+
+class FidState:
+    """单个FID的轮询状态"""
+
+    __slots__ = ("fid", "last_hash", "primed", "interval", "next_poll", "polls", "new_casts", "errors")
+
+    def __init__(self, fid: int, interval: float):
+        self.fid = fid
+        self.last_hash: Optional[str] = None
+        # 首次轮询成功后置位；没有任何cast的账号last_hash一直为None，不能用它判断
+        self.primed = False
+        self.interval = interval
+        self.next_poll = 0.0
+        self.polls = 0
+        self.new_casts = 0
+        self.errors = 0
+
+
+class CastStreamMonitor:
+    """并发轮询多个FID的新casts，以异步生成器输出
+
+    每个FID记录最后看到的cast hash，只翻页到上次的位置为止；
+    活跃用户的轮询间隔自动缩短，不活跃用户的间隔逐渐拉长。
+    """
+
+    def __init__(
+        self,
+        client: AsyncNeynarClient,
+        fids: Iterable[int],
+        min_interval: float = 5.0,
+        max_interval: float = 120.0,
+        concurrency: int = 10,
+        page_size: int = 25,
+        max_pages: int = 4,
+        emit_backlog: bool = False,
+        queue_size: int = 1000,
+    ):
+        """初始化监控器
+
+        Args:
+            client: 异步Neynar客户端
+            fids: 要监控的FID列表
+            min_interval: 最短轮询间隔（秒），用于活跃用户
+            max_interval: 最长轮询间隔（秒），用于不活跃用户
+            concurrency: 同时进行的请求数上限
+            page_size: 每页cast数量
+            max_pages: 每次轮询最多翻页数
+            emit_backlog: 首次轮询时是否输出已有的casts
+            queue_size: 待输出事件的队列长度
+        """
+        self.client = client
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.page_size = page_size
+        self.max_pages = max_pages
+        self.emit_backlog = emit_backlog
+        self.queue_size = queue_size
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._states: Dict[int, FidState] = {}
+        self._heap: List[tuple] = []
+        self._wakeup = asyncio.Event()
+        self._queue: Optional[asyncio.Queue] = None
+
+        for fid in fids:
+            self.add_fid(fid)
+
+    def add_fid(self, fid: int):
+        """开始监控一个FID"""
+        fid = int(fid)
+        if fid in self._states:
+            return
+        state = FidState(fid, self.min_interval)
+        self._states[fid] = state
+        heapq.heappush(self._heap, (state.next_poll, fid))
+        self._wakeup.set()
+
+    def remove_fid(self, fid: int):
+        """停止监控一个FID，堆中的旧条目会被跳过"""
+        self._states.pop(int(fid), None)
+
+    async def stream(self) -> AsyncIterator[Dict[str, Any]]:
+        """持续输出新cast事件
+
+        Yields:
+            cast.created 事件，格式与webhook相同
+        """
+        self._queue = asyncio.Queue(maxsize=self.queue_size)
+        scheduler = asyncio.create_task(self._scheduler())
+        try:
+            while True:
+                if scheduler.done():
+                    scheduler.result()  # 重新抛出调度器中的异常
+                yield await self._queue.get()
+        finally:
+            scheduler.cancel()
+            await asyncio.gather(scheduler, return_exceptions=True)
+
+    async def _scheduler(self):
+        """按下次轮询时间调度各个FID"""
+        tasks = set()
+        try:
+            while True:
+                if not self._heap:
+                    self._wakeup.clear()
+                    await self._wakeup.wait()
+                    continue
+
+                due, fid = self._heap[0]
+                delay = due - time.monotonic()
+                if delay > 0:
+                    self._wakeup.clear()
+                    try:
+                        await asyncio.wait_for(self._wakeup.wait(), delay)
+                    except asyncio.TimeoutError:
+                        pass
+                    continue
+
+                heapq.heappop(self._heap)
+                state = self._states.get(fid)
+                if state is None or state.next_poll != due:
+                    continue
+
+                await self._semaphore.acquire()
+                task = asyncio.create_task(self._poll(state))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def _poll(self, state: FidState):
+        """轮询一个FID，输出新casts并调整轮询间隔"""
+        try:
+            new_casts = await self._fetch_new_casts(state)
+            state.errors = 0
+        except Exception as e:
+            new_casts = []
+            state.errors += 1
+            logger.warning(f"获取FID {state.fid} 的casts失败: {str(e)}")
+        finally:
+            self._semaphore.release()
+
+        state.polls += 1
+        if new_casts:
+            state.new_casts += len(new_casts)
+            state.interval = max(self.min_interval, state.interval / 2)
+        else:
+            state.interval = min(self.max_interval, state.interval * 1.5)
+
+        # 按时间顺序输出（API返回最新在前）
+        for cast in reversed(new_casts):
+            await self._queue.put(cast_to_event(cast))
+
+        if state.fid in self._states:
+            backoff = min(self.max_interval, state.interval * (2 ** state.errors))
+            state.next_poll = time.monotonic() + backoff
+            heapq.heappush(self._heap, (state.next_poll, state.fid))
+            self._wakeup.set()
+
+    async def _fetch_new_casts(self, state: FidState) -> List[Dict[str, Any]]:
+        """翻页获取上次看到的cast之后的所有casts"""
+        first_poll = not state.primed
+        new_casts: List[Dict[str, Any]] = []
+        cursor = None
+
+        for _ in range(self.max_pages):
+            data = await self.client.fetch_user_casts(state.fid, limit=self.page_size, cursor=cursor)
+            casts = data.get('casts', [])
+            reached_last = False
+            for cast in casts:
+                if cast.get('hash') == state.last_hash:
+                    reached_last = True
+                    break
+                new_casts.append(cast)
+
+            cursor = (data.get('next') or {}).get('cursor')
+            # 首次轮询只需要第一页来确定起点
+            if reached_last or first_poll or not cursor:
+                break
+
+        if new_casts:
+            state.last_hash = new_casts[0].get('hash')
+        state.primed = True
+        if first_poll and not self.emit_backlog:
+            return []
+        return new_casts
+
+    def stats(self) -> Dict[str, Any]:
+        """返回监控统计"""
+        intervals = [state.interval for state in self._states.values()]
+        return {
+            "fids": len(self._states),
+            "polls": sum(state.polls for state in self._states.values()),
+            "new_casts": sum(state.new_casts for state in self._states.values()),
+            "min_interval": min(intervals) if intervals else None,
+            "max_interval": max(intervals) if intervals else None,
+            "queued": self._queue.qsize() if self._queue else 0,
+        }
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="并发监控多个Farcaster用户的新casts")
+    parser.add_argument("fids", type=int, nargs="+", help="要监控的FID")
+    parser.add_argument("--min-interval", type=float, default=5.0, help="最短轮询间隔（秒）")
+    parser.add_argument("--max-interval", type=float, default=120.0, help="最长轮询间隔（秒）")
+    parser.add_argument("--concurrency", type=int, default=10, help="并发请求数")
+    args = parser.parse_args()
+
+    async with AsyncNeynarClient() as client:
+        monitor = CastStreamMonitor(
+            client,
+            args.fids,
+            min_interval=args.min_interval,
+            max_interval=args.max_interval,
+            concurrency=args.concurrency,
+        )
+        print(f"开始监控 {len(args.fids)} 个用户...")
+        async for event in monitor.stream():
+            cast = event['data']
+            author = cast.get('author', {})
+            print(f"@{author.get('username')}: {cast.get('text')}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
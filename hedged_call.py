@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+import os
+import sys
+import asyncio
+import random
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Deque, Dict, Optional
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'webhook-sdk'))
+from tracing import summarize
+
+
+@dataclass
+class HedgeResult:
+    """Outcome of a hedged call"""
+
+    value: Any        # Validated answer
+    path: str         # 'primary' or 'secondary'
+    latency: float    # Seconds until the winning answer
+    hedged: bool      # Whether the secondary request was launched
+
+
+class HedgedCaller:
+    """Bounds a request by a deadline and hedges it with a secondary provider
+
+    The primary request starts at once. If it has not produced a valid
+    answer after ``hedge_delay`` seconds (or fails before that), the same
+    request is sent to the secondary provider. The first valid answer wins
+    and the other request is cancelled. When neither answers validly within
+    ``timeout`` seconds, both are cancelled and TimeoutError is raised.
+
+    Only hedge requests without side effects: the loser may be cancelled at
+    any point, and both may complete.
+    """
+
+    def __init__(
+        self,
+        primary: Callable[[Any], Awaitable[Any]],
+        secondary: Optional[Callable[[Any], Awaitable[Any]]] = None,
+        validate: Callable[[Any], Any] = lambda value: value,
+        hedge_delay: float = 2.0,
+        timeout: float = 20.0,
+        sample_size: int = 1000,
+    ):
+        """Initialize the caller
+
+        Args:
+            primary: Coroutine function sending a request to the primary provider
+            secondary: Coroutine function sending it to the secondary provider, None disables hedging
+            validate: Turns an answer into the result, returning None (or raising ValueError) if invalid
+            hedge_delay: Seconds to wait on the primary before hedging
+            timeout: Seconds after which the call gives up
+            sample_size: Number of recent latency samples kept per path
+        """
+        self.primary = primary
+        self.secondary = secondary
+        self.validate = validate
+        self.hedge_delay = hedge_delay
+        self.timeout = timeout
+
+        # Metrics
+        self._latencies: Dict[str, Deque[float]] = {
+            'primary': deque(maxlen=sample_size), 'secondary': deque(maxlen=sample_size)}
+        self.wins = {'primary': 0, 'secondary': 0}
+        self.hedges = 0
+        self.invalid = {'primary': 0, 'secondary': 0}
+        self.errors = {'primary': 0, 'secondary': 0}
+        self.timeouts = 0
+
+    async def call(self, request: Any, validate: Optional[Callable[[Any], Any]] = None) -> HedgeResult:
+        """Send a request and return the first valid answer
+
+        Args:
+            request: Request passed to the providers, e.g. a prompt
+            validate: Validator for this request, overriding the caller's
+
+        Returns:
+            HedgeResult with the validated answer and the path that produced it
+        """
+        validate = validate or self.validate
+        started = time.perf_counter()
+        deadline = started + self.timeout
+        tasks: Dict[asyncio.Task, str] = {asyncio.create_task(self.primary(request)): 'primary'}
+        hedge_at = started + self.hedge_delay if self.secondary else None
+
+        try:
+            while True:
+                now = time.perf_counter()
+                if now >= deadline:
+                    break
+                if hedge_at is not None and (now >= hedge_at or not tasks):
+                    tasks[asyncio.create_task(self.secondary(request))] = 'secondary'
+                    hedge_at = None
+                    self.hedges += 1
+                if not tasks:
+                    break
+
+                wake_at = deadline if hedge_at is None else min(deadline, hedge_at)
+                done, _ = await asyncio.wait(tasks, timeout=max(wake_at - time.perf_counter(), 0),
+                                             return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    path = tasks.pop(task)
+                    value = self._accept(task, path, validate)
+                    if value is not None:
+                        latency = time.perf_counter() - started
+                        self.wins[path] += 1
+                        self._latencies[path].append(latency)
+                        return HedgeResult(value, path, latency, hedged=hedge_at is None and self.secondary is not None)
+        finally:
+            for task in tasks:
+                task.cancel()
+            if tasks:
+                await asyncio.gather(*tasks, return_exceptions=True)
+
+        self.timeouts += 1
+        raise asyncio.TimeoutError(f"No valid answer within {self.timeout:.1f}s")
+
+    def _accept(self, task: asyncio.Task, path: str, validate: Callable[[Any], Any]) -> Any:
+        """Return the validated result of a finished request, None if it failed or is invalid"""
+        if task.cancelled():
+            return None
+        if task.exception() is not None:
+            self.errors[path] += 1
+            return None
+        try:
+            value = validate(task.result())
+        except ValueError:
+            value = None
+        if value is None:
+            self.invalid[path] += 1
+        return value
+
+    def stats(self) -> Dict[str, Any]:
+        """Return wins, hedges, failures and winning latency per path"""
+        return {
+            "wins": dict(self.wins),
+            "hedges": self.hedges,
+            "invalid": dict(self.invalid),
+            "errors": dict(self.errors),
+            "timeouts": self.timeouts,
+            "latency": {path: summarize(samples) for path, samples in self._latencies.items()},
+        }
+
+
+async def run_demo(requests: int = 200, seed: int = 3):
+    """Compare tail latency with and without hedging, using stub providers with injected delays"""
+    rng = random.Random(seed)
+
+    def stub(median: float, slow_rate: float, slow: float, invalid_rate: float = 0.0):
+        async def send(request: str) -> str:
+            # Mostly fast, with an occasional long stall, like an overloaded provider
+            delay = slow if rng.random() < slow_rate else rng.uniform(median * 0.5, median * 1.5)
+            await asyncio.sleep(delay)
+            return "invalid" if rng.random() < invalid_rate else '{"trade": false}'
+        return send
+
+    def validate(answer: str):
+        return answer if answer.startswith("{") else None
+
+    primary = stub(median=0.10, slow_rate=0.1, slow=2.0, invalid_rate=0.02)
+    secondary = stub(median=0.05, slow_rate=0.02, slow=1.0)
+
+    for name, caller in [
+        ("primary only", HedgedCaller(primary, None, validate, timeout=1.5)),
+        ("hedged after 200 ms", HedgedCaller(primary, secondary, validate, hedge_delay=0.2, timeout=1.5)),
+    ]:
+        async def one():
+            try:
+                return (await caller.call("cast")).latency
+            except asyncio.TimeoutError:
+                return caller.timeout
+
+        latencies = sorted(await asyncio.gather(*(one() for _ in range(requests))))
+        print(f"{name:<20} p50 {latencies[len(latencies) // 2] * 1000:6.0f} ms   "
+              f"p95 {latencies[int(len(latencies) * 0.95)] * 1000:6.0f} ms   "
+              f"max {latencies[-1] * 1000:6.0f} ms")
+        print(f"{'':<20} {caller.stats()['wins']}, hedges {caller.hedges}, timeouts {caller.timeouts}")
+
+
+if __name__ == "__main__":
+    asyncio.run(run_demo())
@@ -0,0 +1,264 @@
+#!/usr/bin/env python3
+import json
+import re
+import time
+from dataclasses import dataclass
+from decimal import Decimal, InvalidOperation
+from typing import Dict, List, Optional, Tuple
+
+from token_registry import PROHIBITED_ADDRESS
+
+# Symbols people use for tokens we only trade in wrapped form
+DEFAULT_ALIASES = {
+    'BTC': 'WBTC',
+    'ETH': 'WETH',
+    'MATIC': 'WMATIC',
+    'POL': 'WMATIC',
+}
+
+# Quote currency for amounts given in dollars
+QUOTE_SYMBOL = 'USDC'
+
+
+
+@dataclass(frozen=True)
+class TradeIntent:
+    """Structured trade command extracted from a cast"""
+
+    side: str            # 'buy' or 'sell'
+    token: str           # Resolved symbol in TOKEN_ADDRESSES, e.g. 'WETH'
+    token_address: str
+    amount: Decimal
+    unit: str            # Symbol the amount is denominated in, QUOTE_SYMBOL or token
+
+    @property
+    def quote_amount(self) -> Optional[Decimal]:
+        """Trade size in the quote currency, if the cast stated it"""
+        return self.amount if self.unit == QUOTE_SYMBOL else None
+
+
+@dataclass(frozen=True)
+class TradeDecision:
+    """Structured answer of the signal analyst"""
+
+    intent: Optional[TradeIntent]  # None when the cast should not be traded
+    reason: str = ''
+
+
+class IntentParser:
+    """Rule-based parser for simple, unambiguous trade commands
+
+    Only messages that match one of the grammar rules as a whole are parsed;
+    anything else returns None so the caller can fall back to the LLM.
+    """
+
+    def __init__(self, token_addresses: Dict[str, str], aliases: Optional[Dict[str, str]] = None):
+        """Initialize the parser
+
+        Args:
+            token_addresses: Mapping of token symbol to address (TOKEN_ADDRESSES)
+            aliases: Extra symbol aliases, e.g. {'ETH': 'WETH'}
+        """
+        self.token_addresses = token_addresses
+        self.symbols: Dict[str, str] = {}
+        for symbol, address in token_addresses.items():
+            if address != PROHIBITED_ADDRESS:
+                self.symbols[symbol.upper()] = symbol
+        for alias, target in {**DEFAULT_ALIASES, **(aliases or {})}.items():
+            if target in token_addresses and token_addresses[target] != PROHIBITED_ADDRESS:
+                self.symbols[alias.upper()] = target
+
+        # Longest symbols first so e.g. WMATIC wins over MATIC
+        sym = '|'.join(re.escape(s) for s in sorted(self.symbols, key=len, reverse=True))
+        num = r'\d+(?:\.\d+)?|\.\d+'
+        side = r'(?:please\s+)?(?P<side>buy|sell)'
+        # Each rule comes with the unit assumed when the amount has no symbol:
+        # None means the amount is ambiguous unless written in dollars
+        self._rules: List[Tuple[re.Pattern, Optional[str]]] = [
+            # buy 0.5 USDC of WETH / buy $0.5 worth of ETH
+            (re.compile(
+                rf'^{side}\s+(?P<usd>\$)?(?P<amount>{num})\s*\$?(?P<unit>{sym})?\s+(?:worth\s+of|of)\s+\$?(?P<token>{sym})$',
+                re.IGNORECASE), None),
+            # buy WETH with 0.5 USDC / sell $ETH for $1
+            (re.compile(
+                rf'^{side}\s+\$?(?P<token>{sym})\s+(?:with|for|using)\s+(?P<usd>\$)?(?P<amount>{num})\s*\$?(?P<unit>{sym})?$',
+                re.IGNORECASE), QUOTE_SYMBOL),
+            # buy 0.001 WETH / buy $1 ETH
+            (re.compile(
+                rf'^{side}\s+(?P<usd>\$)?(?P<amount>{num})\s*\$?(?P<token>{sym})$',
+                re.IGNORECASE), 'token'),
+        ]
+
+    @staticmethod
+    def normalize(text: str) -> str:
+        """Collapse whitespace and strip trailing punctuation"""
+        return ' '.join(text.split()).rstrip('.!')
+
+    def parse(self, text: str) -> Optional[TradeIntent]:
+        """Extract a trade intent from a cast
+
+        Args:
+            text: Cast text
+
+        Returns:
+            TradeIntent if the text is an unambiguous trade command, otherwise None
+        """
+        text = self.normalize(text)
+        if not text or len(text) > 120:
+            return None
+
+        for rule, default_unit in self._rules:
+            match = rule.match(text)
+            if match:
+                return self._build(match, default_unit)
+        return None
+
+    def _build(self, match: re.Match, default_unit: Optional[str]) -> Optional[TradeIntent]:
+        """Validate a grammar match and resolve its symbols"""
+        groups = match.groupdict()
+        token = self.symbols[groups['token'].upper()]
+        if token == QUOTE_SYMBOL:
+            return None
+
+        unit_symbol = groups.get('unit')
+        if unit_symbol:
+            if groups.get('usd'):
+                return None
+            unit = self.symbols[unit_symbol.upper()]
+        elif groups.get('usd'):
+            unit = QUOTE_SYMBOL
+        elif default_unit == 'token':
+            unit = token
+        elif default_unit:
+            unit = default_unit
+        else:
+            # "buy 0.5 of ETH" does not say what the 0.5 is
+            return None
+
+        if unit not in (QUOTE_SYMBOL, token):
+            return None
+
+        try:
+            amount = Decimal(groups['amount'])
+        except InvalidOperation:
+            return None
+        if amount <= 0:
+            return None
+
+        return TradeIntent(
+            side=groups['side'].lower(),
+            token=token,
+            token_address=self.token_addresses[token],
+            amount=amount,
+            unit=unit,
+        )
+
+    def parse_decision(self, answer: str, limit: float) -> TradeDecision:
+        """Validate the JSON answer of the signal analyst
+
+        Args:
+            answer: Model response, one JSON object (optionally in a code fence)
+            limit: Largest trade allowed for the cast, in USDC
+
+        Returns:
+            TradeDecision, with a TradeIntent sized in USDC if the cast should be traded
+
+        Raises:
+            ValueError: If the answer is not a valid decision within the limit
+        """
+        answer = str(answer)
+        start, end = answer.find('{'), answer.rfind('}')
+        if start < 0 or end < start:
+            raise ValueError("No JSON object in answer")
+        decision = json.loads(answer[start:end + 1])
+        if not isinstance(decision, dict) or not isinstance(decision.get('trade'), bool):
+            raise ValueError("Answer has no boolean 'trade' field")
+        reason = str(decision.get('reason') or '')
+        if not decision['trade']:
+            return TradeDecision(None, reason)
+
+        side = str(decision.get('side', '')).lower()
+        token = self.symbols.get(str(decision.get('token', '')).upper().lstrip('$'))
+        if side not in ('buy', 'sell') or token is None or token == QUOTE_SYMBOL:
+            raise ValueError(f"Invalid side or token: {decision.get('side')!r} {decision.get('token')!r}")
+        try:
+            amount = Decimal(str(decision.get('amount_usdc')))
+        except InvalidOperation:
+            raise ValueError(f"Invalid amount: {decision.get('amount_usdc')!r}")
+        if not amount.is_finite() or amount <= 0 or amount > Decimal(str(limit)):
+            raise ValueError(f"Amount {amount} outside (0, {limit}] USDC")
+
+        return TradeDecision(TradeIntent(
+            side=side,
+            token=token,
+            token_address=self.token_addresses[token],
+            amount=amount,
+            unit=QUOTE_SYMBOL,
+        ), reason)
+
+
+# Benchmark corpus: (cast text, expected (side, token, amount, unit) or None for LLM fallback)
+BENCHMARK_CORPUS: List[Tuple[str, Optional[Tuple[str, str, str, str]]]] = [
+    ("buy 0.5 USDC of WETH", ('buy', 'WETH', '0.5', 'USDC')),
+    ("Buy $0.5 worth of ETH!", ('buy', 'WETH', '0.5', 'USDC')),
+    ("buy 1 usdc of wbtc", ('buy', 'WBTC', '1', 'USDC')),
+    ("please buy 0.25 USDC of $WMATIC", ('buy', 'WMATIC', '0.25', 'USDC')),
+    ("buy WETH with 0.5 USDC", ('buy', 'WETH', '0.5', 'USDC')),
+    ("buy $MATIC with $1", ('buy', 'WMATIC', '1', 'USDC')),
+    ("sell WETH for 0.5 USDC", ('sell', 'WETH', '0.5', 'USDC')),
+    ("buy 0.001 WETH", ('buy', 'WETH', '0.001', 'WETH')),
+    ("sell 10 wmatic.", ('sell', 'WMATIC', '10', 'WMATIC')),
+    ("buy $1 BTC", ('buy', 'WBTC', '1', 'USDC')),
+    ("SELL .5 POL", ('sell', 'WMATIC', '.5', 'WMATIC')),
+    ("buy 0.5 of ETH", None),
+    ("buy 0.5 USDC.e of WETH", None),
+    ("buy 0.5 WBTC of WETH", None),
+    ("buy 1 USDC", None),
+    ("don't buy ETH yet", None),
+    ("ETH looks strong, might buy some later", None),
+    ("gm frens", None),
+    ("What do you all think about the merge?", None),
+    ("buy the dip", None),
+]
+
+
+def run_benchmark(iterations: int = 2000):
+    """Report accuracy, fallback rate and parse latency over the benchmark corpus"""
+    token_addresses = {
+        'USDC': '0x3c499c542cEF5E3811e1192ce70d8cC03d5c3359',
+        'USDC.e': PROHIBITED_ADDRESS,
+        'WETH': '0x7ceB23fD6bC0adD59E62ac25578270cFf1b9f619',
+        'WBTC': '0x1BFD67037B42Cf73acF2047067bd4F2C47D9BfD6',
+        'MATIC': '0x0000000000000000000000000000000000001010',
+        'WMATIC': '0x0d500B1d8E8eF31E21C99d1Db9A6444d3ADf1270',
+    }
+    parser = IntentParser(token_addresses)
+
+    correct = 0
+    fallbacks = 0
+    for text, expected in BENCHMARK_CORPUS:
+        intent = parser.parse(text)
+        got = None if intent is None else (intent.side, intent.token, str(intent.amount), intent.unit)
+        want = None if expected is None else (expected[0], expected[1], str(Decimal(expected[2])), expected[3])
+        if got == want:
+            correct += 1
+        else:
+            print(f"MISMATCH: {text!r}: expected {want}, got {got}")
+        if intent is None:
+            fallbacks += 1
+
+    started = time.perf_counter()
+    for _ in range(iterations):
+        for text, _ in BENCHMARK_CORPUS:
+            parser.parse(text)
+    elapsed = time.perf_counter() - started
+    parses = iterations * len(BENCHMARK_CORPUS)
+
+    print(f"Corpus size: {len(BENCHMARK_CORPUS)}")
+    print(f"Accuracy: {correct}/{len(BENCHMARK_CORPUS)}")
+    print(f"LLM fallback rate: {fallbacks / len(BENCHMARK_CORPUS):.1%}")
+    print(f"Mean parse latency: {elapsed / parses * 1e6:.2f} us")
+
+
+if __name__ == "__main__":
+    run_benchmark()
@@ -0,0 +1,289 @@
+import asyncio
+import logging
+import time
+from dataclasses import dataclass
+from decimal import Decimal
+from typing import Any, Dict, Optional
+
+import httpx
+
+from token_registry import TokenRegistry
+
+logger = logging.getLogger("market-data")
+
+# 1inch aggregation API, used for quotes
+ONEINCH_QUOTE_URL = "https://api.1inch.dev/swap/v6.0/{chain_id}/quote"
+
+
+@dataclass
+class CachedValue:
+    """A cached market value and when it was fetched"""
+
+    value: Decimal
+    updated_at: float  # time.time()
+
+    @property
+    def age(self) -> float:
+        return time.time() - self.updated_at
+
+
+class MarketDataCache:
+    """Gas price and token quotes refreshed in the background
+
+    The trade path reads the cached values instead of querying the chain and
+    1inch itself. A value older than ``max_age`` is treated as missing and,
+    when read through ``get_gas_price`` / ``get_price``, refreshed inline once.
+    """
+
+    def __init__(
+        self,
+        registry: TokenRegistry,
+        rpc_url: Optional[str] = None,
+        oneinch_api_key: Optional[str] = None,
+        chain_id: int = 137,
+        quote_symbol: str = 'USDC',
+        gas_interval: float = 5.0,
+        quote_interval: float = 15.0,
+        max_age: float = 60.0,
+        timeout: float = 5.0,
+    ):
+        """Initialize the cache
+
+        Args:
+            registry: Token registry of the chain, for addresses and decimals
+            rpc_url: JSON-RPC endpoint used for eth_gasPrice, gas is not cached without it
+            oneinch_api_key: 1inch API key, quotes are not cached without it
+            chain_id: Chain id used for 1inch quotes (137 = Polygon)
+            quote_symbol: Symbol prices are quoted in
+            gas_interval: Seconds between gas price refreshes
+            quote_interval: Seconds between quote refreshes
+            max_age: Seconds after which a cached value is stale
+            timeout: Request timeout in seconds
+        """
+        self.registry = registry
+        self.rpc_url = rpc_url
+        self.oneinch_api_key = oneinch_api_key
+        self.chain_id = chain_id
+        self.quote_symbol = quote_symbol
+        self.gas_interval = gas_interval
+        self.quote_interval = quote_interval
+        self.max_age = max_age
+        self.timeout = timeout
+
+        self.gas_price: Optional[CachedValue] = None  # in gwei
+        self.prices: Dict[str, CachedValue] = {}       # quote_symbol per token
+        self._client: Optional[httpx.AsyncClient] = None
+        self._tasks = []
+        self._refreshing: Dict[str, asyncio.Task] = {}
+
+        # Counters
+        self.hits = 0
+        self.stale_reads = 0
+        self.refreshes = 0
+        self.errors = 0
+
+    async def start(self):
+        """Fetch initial values and start the background refresh tasks"""
+        self._client = httpx.AsyncClient(timeout=self.timeout)
+        await asyncio.gather(self._refresh_once("gas"), self._refresh_once("quotes"))
+        if self.rpc_url:
+            self._tasks.append(asyncio.create_task(self._refresh_loop("gas", self.gas_interval)))
+        if self.oneinch_api_key:
+            self._tasks.append(asyncio.create_task(self._refresh_loop("quotes", self.quote_interval)))
+
+    async def stop(self):
+        """Stop the refresh tasks and close the HTTP client"""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        if self._client:
+            await self._client.aclose()
+            self._client = None
+
+    async def _refresh_loop(self, kind: str, interval: float):
+        while True:
+            await asyncio.sleep(interval)
+            await self._refresh_once(kind)
+
+    async def _refresh_once(self, kind: str):
+        """Refresh gas or quotes, sharing one request between concurrent callers"""
+        task = self._refreshing.get(kind)
+        if task is None:
+            refresh = self.refresh_gas if kind == "gas" else self.refresh_quotes
+            task = self._refreshing[kind] = asyncio.create_task(refresh())
+            task.add_done_callback(lambda _: self._refreshing.pop(kind, None))
+        try:
+            await asyncio.shield(task)
+        except Exception as e:
+            self.errors += 1
+            logger.warning("Failed to refresh %s: %s", kind, e)
+
+    async def refresh_gas(self):
+        """Fetch the gas price through eth_gasPrice"""
+        if not self.rpc_url:
+            return
+        response = await self._client.post(self.rpc_url, json={
+            "jsonrpc": "2.0", "id": 1, "method": "eth_gasPrice", "params": [],
+        })
+        response.raise_for_status()
+        wei = int(response.json()["result"], 16)
+        self.gas_price = CachedValue(Decimal(wei) / Decimal(10 ** 9), time.time())
+        self.refreshes += 1
+
+    async def refresh_quotes(self):
+        """Fetch the price of one unit of every token, concurrently"""
+        if not self.oneinch_api_key:
+            return
+        quote_token = self.registry.get(self.quote_symbol)
+        tokens = [token for token in self.registry
+                  if token.symbol != self.quote_symbol and token.decimals is not None]
+        results = await asyncio.gather(
+            *(self._fetch_quote(token, quote_token) for token in tokens), return_exceptions=True)
+        for token, result in zip(tokens, results):
+            if isinstance(result, Exception):
+                self.errors += 1
+                logger.warning("Failed to quote %s: %s", token.symbol, result)
+            else:
+                self.prices[token.symbol] = CachedValue(result, time.time())
+        self.refreshes += 1
+
+    async def _fetch_quote(self, token, quote_token) -> Decimal:
+        response = await self._client.get(
+            ONEINCH_QUOTE_URL.format(chain_id=self.chain_id),
+            params={"src": token.address, "dst": quote_token.address,
+                    "amount": str(token.to_base_units(Decimal(1)))},
+            headers={"Authorization": f"Bearer {self.oneinch_api_key}"},
+        )
+        response.raise_for_status()
+        return quote_token.from_base_units(int(response.json()["dstAmount"]))
+
+    def _fresh(self, value: Optional[CachedValue]) -> Optional[CachedValue]:
+        if value is not None and value.age <= self.max_age:
+            self.hits += 1
+            return value
+        self.stale_reads += 1
+        return None
+
+    def cached_gas_price(self) -> Optional[CachedValue]:
+        """Return the gas price in gwei if fresh, without any network call"""
+        return self._fresh(self.gas_price)
+
+    def cached_price(self, symbol: str) -> Optional[CachedValue]:
+        """Return the price of a token in the quote symbol if fresh, without any network call"""
+        return self._fresh(self.prices.get(symbol))
+
+    async def get_gas_price(self) -> Optional[CachedValue]:
+        """Return the gas price in gwei, refreshing it first if stale"""
+        value = self.cached_gas_price()
+        if value is None and self._client:
+            await self._refresh_once("gas")
+            value = self.gas_price
+        return value
+
+    async def get_price(self, symbol: str) -> Optional[CachedValue]:
+        """Return the price of a token in the quote symbol, refreshing quotes first if stale"""
+        value = self.cached_price(symbol)
+        if value is None and self._client:
+            await self._refresh_once("quotes")
+            value = self.prices.get(symbol)
+        return value
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Return all cached values with their age in seconds"""
+        snapshot: Dict[str, Any] = {"quote_symbol": self.quote_symbol, "max_age_s": self.max_age}
+        if self.gas_price:
+            snapshot["gas_price_gwei"] = {"value": str(self.gas_price.value), "age_s": round(self.gas_price.age, 1)}
+        snapshot["prices"] = {
+            symbol: {"value": str(value.value), "age_s": round(value.age, 1)}
+            for symbol, value in self.prices.items()
+        }
+        return snapshot
+
+    def describe(self) -> str:
+        """Summarize fresh cached values, one per line, for agent prompts"""
+        lines = []
+        if self.gas_price and self.gas_price.age <= self.max_age:
+            lines.append(f"- Gas price: {self.gas_price.value:.2f} gwei ({self.gas_price.age:.0f}s old)")
+        for symbol, value in sorted(self.prices.items()):
+            if value.age <= self.max_age:
+                lines.append(f"- {symbol}: {value.value:.6g} {self.quote_symbol} ({value.age:.0f}s old)")
+        return "\n".join(lines) or "- No fresh market data cached"
+
+    def stats(self) -> Dict[str, Any]:
+        """Return cache counters"""
+        return {
+            "hits": self.hits,
+            "stale_reads": self.stale_reads,
+            "refreshes": self.refreshes,
+            "errors": self.errors,
+            "cached_prices": len(self.prices),
+        }
+
+
+def create_mcp_server(cache: MarketDataCache):
+    """Expose the cache to the agent as local MCP tools
+
+    Args:
+        cache: Market data cache
+
+    Returns:
+        FastMCP server with the get_gas_price, get_token_price and get_market_snapshot tools
+    """
+    from mcp.server.fastmcp import FastMCP
+
+    server = FastMCP("market-data")
+
+    @server.tool()
+    async def get_gas_price() -> Dict[str, Any]:
+        """Current gas price in gwei from the local cache, with its age in seconds"""
+        value = await cache.get_gas_price()
+        if value is None:
+            return {"error": "gas price unavailable"}
+        return {"gas_price_gwei": str(value.value), "age_s": round(value.age, 1)}
+
+    @server.tool()
+    async def get_token_price(symbol: str) -> Dict[str, Any]:
+        """Price of one token unit (e.g. WETH) in USDC from the local cache, with its age in seconds"""
+        value = await cache.get_price(symbol.upper())
+        if value is None:
+            return {"error": f"no quote for {symbol}"}
+        return {"symbol": symbol.upper(), "price": str(value.value),
+                "quote_symbol": cache.quote_symbol, "age_s": round(value.age, 1)}
+
+    @server.tool()
+    def get_market_snapshot() -> Dict[str, Any]:
+        """All cached gas and token prices with their age in seconds"""
+        return cache.snapshot()
+
+    return server
+
+
+async def serve_mcp_server(cache: MarketDataCache, host: str = "127.0.0.1", port: int = 8011):
+    """Serve the market data tools over SSE on the running event loop
+
+    Returns once the server accepts connections, so agents started afterwards
+    can connect to it right away.
+
+    Args:
+        cache: Market data cache
+        host: Host the SSE endpoint listens on
+        port: Port the SSE endpoint listens on
+
+    Returns:
+        Tuple of the uvicorn server and its task; set ``server.should_exit`` and
+        await the task to stop it
+    """
+    import uvicorn
+
+    app = create_mcp_server(cache).sse_app()
+    server = uvicorn.Server(uvicorn.Config(app, host=host, port=port, log_config=None))
+    task = asyncio.create_task(server.serve())
+    while not server.started:
+        if task.done():
+            # Surface bind errors instead of waiting forever
+            task.result()
+            raise RuntimeError(f"Market data server on port {port} exited during startup")
+        await asyncio.sleep(0.01)
+    logger.info("Serving market data tools on http://%s:%d/sse", host, port)
+    return server, task
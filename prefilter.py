@@ -0,0 +1,224 @@
+#!/usr/bin/env python3
+import math
+import re
+import time
+from collections import deque
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from intent_parser import DEFAULT_ALIASES
+from token_registry import PROHIBITED_ADDRESS
+
+# Words that indicate a cast is about trading at all
+TRADE_KEYWORDS = [
+    'buy', 'sell', 'long', 'short', 'ape', 'pump', 'dump', 'moon',
+    'bullish', 'bearish', 'accumulate', 'exit', 'swap', 'trade',
+]
+
+# Weights of the scoring model, applied to binary features
+DEFAULT_WEIGHTS = {
+    'bias': -2.0,
+    'ticker': 2.0,
+    'keyword': 1.5,
+    # Watched names are explicit interest, enough to clear the threshold alone
+    'watchlist': 2.5,
+    'cashtag': 1.0,
+    'number': 0.5,
+    'reply': -1.0,
+    'question': -0.5,
+}
+
+_NUMBER = re.compile(r'\d')
+_CASHTAG = re.compile(r'\$[A-Za-z]{2,10}\b')
+
+
+class AhoCorasick:
+    """Multi-pattern matcher finding all patterns in one pass over the text"""
+
+    def __init__(self, patterns: Iterable[str]):
+        """Build the automaton
+
+        Args:
+            patterns: Patterns to match, matched case-insensitively
+        """
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[List[str]] = [[]]
+
+        for pattern in patterns:
+            pattern = pattern.lower()
+            if not pattern:
+                continue
+            node = 0
+            for char in pattern:
+                nxt = self._goto[node].get(char)
+                if nxt is None:
+                    nxt = len(self._goto)
+                    self._goto[node][char] = nxt
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._out.append([])
+                node = nxt
+            self._out[node].append(pattern)
+
+        # Breadth-first construction of failure links
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for char, nxt in self._goto[node].items():
+                queue.append(nxt)
+                fail = self._fail[node]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[nxt] = self._goto[fail].get(char, 0) if node else 0
+                self._out[nxt].extend(self._out[self._fail[nxt]])
+
+    def find(self, text: str, whole_words: bool = True) -> Set[str]:
+        """Find the patterns occurring in a text
+
+        Args:
+            text: Text to search
+            whole_words: Only report matches not surrounded by letters or digits
+
+        Returns:
+            Set of matched patterns
+        """
+        text = text.lower()
+        found: Set[str] = set()
+        node = 0
+        goto = self._goto
+        fail = self._fail
+        for i, char in enumerate(text):
+            while node and char not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(char, 0)
+            for pattern in self._out[node]:
+                if whole_words:
+                    start = i - len(pattern) + 1
+                    if start > 0 and text[start - 1].isalnum():
+                        continue
+                    if i + 1 < len(text) and text[i + 1].isalnum():
+                        continue
+                found.add(pattern)
+        return found
+
+
+class CastPrefilter:
+    """Cheap relevance filter that discards casts with no trading content"""
+
+    def __init__(
+        self,
+        token_addresses: Dict[str, str],
+        watchlist: Optional[Iterable[str]] = None,
+        weights: Optional[Dict[str, float]] = None,
+        threshold: float = 0.5,
+    ):
+        """Initialize the prefilter
+
+        Args:
+            token_addresses: Mapping of token symbol to address (TOKEN_ADDRESSES)
+            watchlist: Extra keywords to watch for, e.g. project names
+            weights: Overrides for the scoring model weights
+            threshold: Minimum score (0-1) for a cast to be forwarded
+        """
+        self.tickers: Set[str] = set()
+        for symbol, address in token_addresses.items():
+            if address != PROHIBITED_ADDRESS:
+                self.tickers.add(symbol.lower())
+        for alias, target in DEFAULT_ALIASES.items():
+            if target in token_addresses:
+                self.tickers.add(alias.lower())
+        self.keywords = set(TRADE_KEYWORDS)
+        self.watchlist = {word.lower() for word in (watchlist or []) if word}
+        self.weights = {**DEFAULT_WEIGHTS, **(weights or {})}
+        self.threshold = threshold
+
+        self._matcher = AhoCorasick(self.tickers | self.keywords | self.watchlist)
+
+        # Counters
+        self.forwarded = 0
+        self.short_circuited = 0
+
+    def score(self, text: str, is_reply: bool = False) -> Tuple[float, Set[str]]:
+        """Score how likely a cast is to carry a trading signal
+
+        Args:
+            text: Cast text
+            is_reply: Whether the cast is a reply to another cast
+
+        Returns:
+            Tuple of (score between 0 and 1, matched patterns)
+        """
+        matches = self._matcher.find(text)
+        if not matches and not _CASHTAG.search(text):
+            return 0.0, matches
+
+        w = self.weights
+        z = w['bias']
+        if matches & self.tickers:
+            z += w['ticker']
+        if matches & self.keywords:
+            z += w['keyword']
+        if matches & self.watchlist:
+            z += w['watchlist']
+        if _CASHTAG.search(text):
+            z += w['cashtag']
+        if _NUMBER.search(text):
+            z += w['number']
+        if is_reply:
+            z += w['reply']
+        if '?' in text:
+            z += w['question']
+        return 1.0 / (1.0 + math.exp(-z)), matches
+
+    def should_forward(self, text: str, is_reply: bool = False) -> bool:
+        """Decide whether a cast is worth any agent work
+
+        Args:
+            text: Cast text
+            is_reply: Whether the cast is a reply to another cast
+
+        Returns:
+            True if the cast should be forwarded to the trading pipeline
+        """
+        score, _ = self.score(text, is_reply)
+        if score >= self.threshold:
+            self.forwarded += 1
+            return True
+        self.short_circuited += 1
+        return False
+
+    def stats(self) -> Dict[str, int]:
+        """Return prefilter counters"""
+        return {
+            "forwarded": self.forwarded,
+            "short_circuited": self.short_circuited,
+        }
+
+
+if __name__ == "__main__":
+    from intent_parser import BENCHMARK_CORPUS
+
+    token_addresses = {
+        'USDC': '0x3c499c542cEF5E3811e1192ce70d8cC03d5c3359',
+        'USDC.e': PROHIBITED_ADDRESS,
+        'WETH': '0x7ceB23fD6bC0adD59E62ac25578270cFf1b9f619',
+        'WBTC': '0x1BFD67037B42Cf73acF2047067bd4F2C47D9BfD6',
+        'MATIC': '0x0000000000000000000000000000000000001010',
+        'WMATIC': '0x0d500B1d8E8eF31E21C99d1Db9A6444d3ADf1270',
+    }
+    prefilter = CastPrefilter(token_addresses)
+    texts = [text for text, _ in BENCHMARK_CORPUS]
+
+    iterations = 2000
+    started = time.perf_counter()
+    for _ in range(iterations):
+        for text in texts:
+            prefilter.should_forward(text)
+    elapsed = time.perf_counter() - started
+
+    for text in texts:
+        score, _ = prefilter.score(text)
+        print(f"{score:.2f}  {text}")
+    total = prefilter.forwarded + prefilter.short_circuited
+    print(f"Short-circuited: {prefilter.short_circuited / total:.1%}")
+    print(f"Mean filter latency: {elapsed / total * 1e6:.2f} us")
@@ -3,25 +3,95 @@ import os
 import asyncio
 import sys
 import json
+import time
+from contextlib import asynccontextmanager
+from dataclasses import replace
+from decimal import Decimal
 from dotenv import load_dotenv
 from mcp_agent.core.fastagent import FastAgent
 
 # Add webhook-sdk to Python path
 sys.path.append(os.path.join(os.path.dirname(__file__), 'webhook-sdk'))
+sys.path.append(os.path.join(os.path.dirname(__file__), 'farcaster_monitor'))
 from webhook_server import WebhookServer
+from cast_event import CastEvent
+from neynar_client import AsyncNeynarClient
+from stream_monitor import CastStreamMonitor
+from user_directory import UserDirectory
+from tracing import annotate, record_span, span
+from log_config import configure_from_env, shutdown_logging
+from agent_pool import AgentPool
+from execution_router import ChainExecutor, ExecutionRouter
+from hedged_call import HedgedCaller
+from intent_parser import IntentParser
+from prefilter import CastPrefilter
+from near_duplicates import NearDuplicateIndex
+from trade_coalescer import TradeCoalescer
+from trade_policy import PolicyEngine
+from rpc_executor import DirectSwapExecutor, load_signer
+from token_registry import TokenRegistry
+from market_data import MarketDataCache, serve_mcp_server
+from trading_prompts import build_analyst_instruction, build_event_prompt, build_instruction
 
 # Load environment variables
 load_dotenv()
 
 # Create Fast-Agent application
 fast = FastAgent("Farcaster Event Trader")
+# Separate application for Ethereum, so its MCP server runs in its own agent pool
+fast_ethereum = FastAgent("Farcaster Event Trader (Ethereum)")
+# Separate application for the tool-less signal analysts, so decisions never hold a trader's slot
+fast_analysts = FastAgent("Farcaster Event Trader (Analysts)")
+
+# Number of warm agent instances (each owns its own MCP server processes)
+AGENT_POOL_SIZE = int(os.getenv('AGENT_POOL_SIZE', '1'))
+# Number of warm signal analyst instances, i.e. LLM decisions in flight
+ANALYST_POOL_SIZE = int(os.getenv('ANALYST_POOL_SIZE', '2'))
+
+# Webhook event queue: events are acknowledged at once and processed by workers
+WEBHOOK_QUEUE_SIZE = int(os.getenv('WEBHOOK_QUEUE_SIZE', '1000'))
+WEBHOOK_WORKERS = int(os.getenv('WEBHOOK_WORKERS', '4'))
+WEBHOOK_OVERFLOW_POLICY = os.getenv('WEBHOOK_OVERFLOW_POLICY', 'drop_oldest')
+WEBHOOK_PORT = int(os.getenv('WEBHOOK_PORT', '8000'))
+# Ingest processes sharing the port; events are still traded by this process only
+WEBHOOK_PROCESSES = int(os.getenv('WEBHOOK_PROCESSES', '1'))
+
+# Dedup state is persisted so replays after a restart do not re-trade
+WEBHOOK_DEDUP_PATH = os.getenv('WEBHOOK_DEDUP_PATH', 'webhook_dedup.db')
+
+# Unfinished events are journaled and replayed after a crash, unless older than the cutoff
+WEBHOOK_JOURNAL_PATH = os.getenv('WEBHOOK_JOURNAL_PATH', 'webhook_journal.db')
+WEBHOOK_JOURNAL_MAX_AGE = float(os.getenv('WEBHOOK_JOURNAL_MAX_AGE', '600'))
+
+# FIDs (comma separated) polled as a fallback when webhooks lag
+MONITOR_FIDS = [int(fid) for fid in os.getenv('MONITOR_FIDS', '').split(',') if fid.strip()]
 
 # Define trading limit (in USDC)
 TRADE_LIMIT_USDC = 1.0
 
+# Seconds fast-path intents for the same token are collected and netted into one trade (0 disables)
+TRADE_COALESCE_WINDOW = float(os.getenv('TRADE_COALESCE_WINDOW', '1.0'))
+
 # Define authorized trading users
 AUTHORIZED_USERS = ['0xhardman']
 
+# Authorization is enforced by FID, which unlike usernames never changes.
+# AUTHORIZED_USERS are resolved to FIDs at startup; usernames that cannot be
+# resolved keep being matched by name.
+AUTHORIZED_FIDS = {int(fid) for fid in os.getenv('AUTHORIZED_FIDS', '').split(',') if fid.strip()}
+USER_DIRECTORY_PATH = os.getenv('USER_DIRECTORY_PATH', 'user_directory.db')
+
+# Per-author limits, allowed tokens, cooldowns and spend windows, reloaded when the
+# file changes. Without the file, AUTHORIZED_USERS and AUTHORIZED_FIDS may trade up
+# to TRADE_LIMIT_USDC each (see trade_policy.example.json)
+TRADE_POLICY_PATH = os.getenv('TRADE_POLICY_PATH', 'trade_policy.json')
+trade_policy = PolicyEngine(
+    TRADE_POLICY_PATH,
+    defaults={'trade_limit_usdc': TRADE_LIMIT_USDC},
+    authors=[{'username': username} for username in AUTHORIZED_USERS]
+    + [{'fid': fid} for fid in AUTHORIZED_FIDS],
+)
+
 # Define common token addresses
 TOKEN_ADDRESSES = {
     'USDC': '0x3c499c542cEF5E3811e1192ce70d8cC03d5c3359',  # Native USDC
@@ -33,115 +103,625 @@ TOKEN_ADDRESSES = {
     'WMATIC': '0x0d500B1d8E8eF31E21C99d1Db9A6444d3ADf1270'
 }
 
-# Define agent using Polygon MCP server
-
-
-@fast.agent(
-    instruction="""You are an AI assistant specialized in analyzing Farcaster messages and executing cryptocurrency trades.
-
-When you receive a Farcaster message, you need to:
-1. Analyze the message content to determine if it contains trading intent (buy/sell a token)
-2. If trading intent is detected, identify the trade type (buy/sell), token symbol, and amount (if specified)
-3. Execute the appropriate trading operation, ensuring the trade amount does not exceed 1 USDC
-4. Return the trade execution results
-
-Trading style:
-- Conservative: Do not execute trades unless explicitly instructed
-- Precise: Execute trades strictly according to the message instructions
-- Safe: Always adhere to trading limits
-- Transparent: Clearly report all trading details
-
-Important notes:
-- STRICTLY PROHIBITED from using USDC.e for any transactions, always use only native USDC (0x3c499c542cEF5E3811e1192ce70d8cC03d5c3359)
-- Use token addresses defined in the TOKEN_ADDRESSES dictionary
-- Only messages from authorized users will trigger trades
-- PAY ATTENTION TO TOKEN DECIMALS when calculating amounts:
-  * USDC: 6 decimals (1 USDC = 1,000,000 wei)
-  * WBTC: 8 decimals (1 WBTC = 100,000,000 wei)
-  * WETH/WMATIC: 18 decimals (1 token = 1,000,000,000,000,000,000 wei)
-- Always use get_token_decimals tool to verify token decimals before calculating amounts
-
-Always ensure trading safety and follow all restrictions.""",
-    # Use Polygon MCP server defined in fastagent.config.yaml
-    servers=["polygon"],
+# Token metadata (decimals) loaded once and cached locally, verified on boot
+TOKEN_CACHE_PATH = os.getenv('TOKEN_CACHE_PATH', 'token_cache.json')
+POLYGON_RPC_URL = os.getenv('POLYGON_RPC_URL')
+token_registry = TokenRegistry.load(TOKEN_ADDRESSES, TOKEN_CACHE_PATH)
+
+# Ethereum mainnet addresses of the tokens that can be routed to Ethereum
+ETHEREUM_TOKEN_ADDRESSES = {
+    'USDC': '0xA0b86991c6218b36c1d19D4a2e9Eb0cE3606eB48',
+    'WETH': '0xC02aaA39b223FE8D0A0e5C4F27eAD9083C756Cc2',
+    'WBTC': '0x2260FAC5E5542a773Aa44fBCfeDf7C193bc2C599',
+}
+ETHEREUM_TOKEN_CACHE_PATH = os.getenv('ETHEREUM_TOKEN_CACHE_PATH', 'token_cache.ethereum.json')
+ETHEREUM_RPC_URL = os.getenv('ETHEREUM_RPC_URL')
+ethereum_token_registry = TokenRegistry.load(
+    ETHEREUM_TOKEN_ADDRESSES, ETHEREUM_TOKEN_CACHE_PATH, chain='ethereum')
+
+# Chain each token is traded on (comma separated, e.g. "WBTC=ethereum"); others trade on Polygon
+TOKEN_CHAINS = {token.strip(): chain.strip() for token, chain in (
+    item.split('=', 1) for item in os.getenv('TOKEN_CHAINS', '').split(',') if '=' in item)}
+# Trades in flight per chain; 1 keeps each wallet's transactions in signal order
+CHAIN_CONCURRENCY = int(os.getenv('CHAIN_CONCURRENCY', '1'))
+
+# Optional JSON-lines file receiving a latency trace per event
+TRACE_PATH = os.getenv('TRACE_PATH')
+
+# Fraction of webhook requests whose full payload is logged
+# (log levels per stage are set with LOG_LEVEL / LOG_LEVELS, see webhook-sdk/log_config.py)
+LOG_PAYLOAD_SAMPLE_RATE = float(os.getenv('LOG_PAYLOAD_SAMPLE_RATE', '0.01'))
+
+
+def instrument_tool_calls(agent):
+    """Record a tracing span for every MCP tool call the agent makes
+
+    Args:
+        agent: Agent whose call_tool is wrapped (also used by its LLM)
+    """
+    call_tool = agent.call_tool
+
+    async def traced_call_tool(name, arguments=None, *args, **kwargs):
+        with span("mcp_tool", tool=name):
+            return await call_tool(name, arguments, *args, **kwargs)
+
+    agent.call_tool = traced_call_tool
+
+
+@asynccontextmanager
+async def run_agent():
+    """Start the Fast-Agent application with instrumented tool calls"""
+    async with fast.run() as agent:
+        instrument_tool_calls(agent.default)
+        yield agent
+
+
+async def check_agent_health(agent):
+    """Check that the agent's MCP servers still respond
+
+    Args:
+        agent: Agent application yielded by fast.run()
+    """
+    result = await agent.default.list_tools()
+    return bool(result.tools)
+
+
+# Long-lived agent pool, started once in main()
+agent_pool = AgentPool(run_agent, size=AGENT_POOL_SIZE,
+                       health_check=check_agent_health)
+
+
+async def ethereum_trader():
+    """Ethereum trading agent, used through ethereum_agent_pool"""
+
+
+@asynccontextmanager
+async def run_ethereum_agent():
+    """Start the Ethereum Fast-Agent application with instrumented tool calls"""
+    async with fast_ethereum.run() as agent:
+        instrument_tool_calls(agent.default)
+        yield agent
+
+
+ethereum_agent_pool = AgentPool(run_ethereum_agent, size=AGENT_POOL_SIZE,
+                                health_check=check_agent_health)
+
+# Trades run per chain, so a slow Ethereum swap never blocks a Polygon one.
+# The Ethereum pool is only started when TOKEN_CHAINS routes a token there.
+chain_executors = {'polygon': ChainExecutor('polygon', agent_pool, concurrency=CHAIN_CONCURRENCY)}
+if 'ethereum' in TOKEN_CHAINS.values():
+    chain_executors['ethereum'] = ChainExecutor('ethereum', ethereum_agent_pool, concurrency=CHAIN_CONCURRENCY)
+execution_router = ExecutionRouter(chain_executors, TOKEN_CHAINS, default_chain='polygon')
+
+# Polygon MCP tool used for structured swaps that bypass the LLM
+SWAP_TOOL_NAME = os.getenv('SWAP_TOOL_NAME', 'inch_swap')
+ETHEREUM_SWAP_TOOL_NAME = os.getenv('ETHEREUM_SWAP_TOOL_NAME', 'swapToken')
+TRADE_SLIPPAGE = 1  # percent
+
+# Background-refreshed gas price and quotes, served to the agent as local tools
+ONEINCH_API_KEY = os.getenv('ONEINCH_API_KEY')
+MARKET_DATA_PORT = int(os.getenv('MARKET_DATA_PORT', '8011'))
+MARKET_DATA_GAS_INTERVAL = float(os.getenv('MARKET_DATA_GAS_INTERVAL', '5'))
+MARKET_DATA_QUOTE_INTERVAL = float(os.getenv('MARKET_DATA_QUOTE_INTERVAL', '15'))
+# Seconds after which a cached value is refreshed before use
+MARKET_DATA_MAX_AGE = float(os.getenv('MARKET_DATA_MAX_AGE', '60'))
+market_data = MarketDataCache(
+    token_registry,
+    rpc_url=POLYGON_RPC_URL,
+    oneinch_api_key=ONEINCH_API_KEY,
+    gas_interval=MARKET_DATA_GAS_INTERVAL,
+    quote_interval=MARKET_DATA_QUOTE_INTERVAL,
+    max_age=MARKET_DATA_MAX_AGE,
 )
+
+# Sign and submit routine Polygon swaps straight to POLYGON_RPC_URL instead of going
+# through the MCP server (needs eth-account and WALLET_PRIVATE_KEY or SEED_PHRASE)
+DIRECT_EXECUTION = os.getenv('DIRECT_EXECUTION', '0') == '1'
+direct_executor = None
+
+# Token addresses, decimals and swap tool of each chain trades can be routed to
+CHAINS = {
+    'polygon': {'tokens': TOKEN_ADDRESSES, 'registry': token_registry, 'swap_tool': SWAP_TOOL_NAME},
+    'ethereum': {'tokens': ETHEREUM_TOKEN_ADDRESSES, 'registry': ethereum_token_registry,
+                 'swap_tool': ETHEREUM_SWAP_TOOL_NAME},
+}
+
+# Deterministic parser for simple trade commands
+intent_parser = IntentParser(TOKEN_ADDRESSES)
+
+# Extra keywords (comma separated) that make a cast worth analyzing
+PREFILTER_WATCHLIST = [word.strip() for word in os.getenv(
+    'PREFILTER_WATCHLIST', '').split(',') if word.strip()]
+
+# Cheap relevance filter ahead of any agent work
+prefilter = CastPrefilter(TOKEN_ADDRESSES, watchlist=PREFILTER_WATCHLIST)
+
+# Seconds and number of recent casts kept to detect reposted or edited headlines
+NEAR_DUPLICATE_WINDOW = float(os.getenv('NEAR_DUPLICATE_WINDOW', '3600'))
+NEAR_DUPLICATE_MAX_ENTRIES = int(os.getenv('NEAR_DUPLICATE_MAX_ENTRIES', '100000'))
+near_duplicates = NearDuplicateIndex(window=NEAR_DUPLICATE_WINDOW, max_entries=NEAR_DUPLICATE_MAX_ENTRIES)
+
+# Faster, cheaper model the signal decision is hedged to when the primary is slow (empty disables hedging)
+SECONDARY_MODEL = os.getenv('SECONDARY_MODEL', 'haiku')
+# Seconds to wait on the primary model before hedging, and the deadline of a decision
+LLM_HEDGE_DELAY = float(os.getenv('LLM_HEDGE_DELAY', '2.0'))
+LLM_TIMEOUT = float(os.getenv('LLM_TIMEOUT', '20'))
+
+
+async def execute_trade_intent(agent, intent, chain='polygon', price=None):
+    """Execute a parsed trade intent by calling the swap tool directly
+
+    Buys sized in USDC are executed as is. Sells sized in USDC need the
+    token's price to size the swap, so they are only executed here with a
+    cached price.
+
+    Args:
+        agent: Agent application checked out from the chain's pool
+        intent: TradeIntent with the token address of that chain
+        chain: Chain name in CHAINS
+        price: Price of one token in USDC, required for sells
+
+    Returns:
+        Result of the MCP tool call
+    """
+    config = CHAINS[chain]
+    registry = config['registry']
+    if intent.side == 'buy':
+        from_token, to_token = config['tokens']['USDC'], intent.token_address
+        amount = registry.get('USDC').to_base_units(intent.quote_amount)
+    else:
+        if price is None:
+            raise ValueError(f"Selling {intent.token} for USDC needs a price")
+        from_token, to_token = intent.token_address, config['tokens']['USDC']
+        amount = registry.get(intent.token).to_base_units(intent.quote_amount / price)
+    return await agent.default.call_tool(config['swap_tool'], {
+        'fromToken': from_token,
+        'toToken': to_token,
+        'amount': str(amount),
+        'slippage': TRADE_SLIPPAGE,
+    })
+
+
+def is_fast_path_intent(intent):
+    """Check whether a parsed intent can skip the LLM analysis
+
+    Intents sized in USDC are coalesced per token and netted, so sells are
+    accepted too; the limit is enforced again on the consolidated trade.
+
+    Args:
+        intent: TradeIntent or None
+    """
+    return (intent is not None
+            and intent.quote_amount is not None
+            and intent.quote_amount <= TRADE_LIMIT_USDC)
+
+
+async def execute_coalesced_trade(intent):
+    """Execute the consolidated trade of a coalescing window on the token's chain
+
+    With DIRECT_EXECUTION and fresh cached price and gas, Polygon swaps are
+    signed and submitted over JSON-RPC in one round trip. Otherwise buys are
+    sent to the swap tool directly, and so are Polygon sells when the token
+    has a fresh cached price; the remaining sells are left to the agent,
+    which can look the price up itself.
+
+    Args:
+        intent: Net TradeIntent, sized in USDC and within TRADE_LIMIT_USDC
+
+    Returns:
+        Transaction hashes, the result of the swap tool call or the agent response
+    """
+    chain = execution_router.chain_for(intent.token)
+    tokens = CHAINS[chain]['tokens']
+    if intent.token not in tokens:
+        raise ValueError(f"{intent.token} has no address on {chain}")
+    intent = replace(intent, token_address=tokens[intent.token])
+
+    checkout_started = time.perf_counter()
+
+    async def trade(agent):
+        # Time until this trade had an agent: its turn on the chain plus the pool checkout
+        record_span("agent_checkout", time.perf_counter() - checkout_started, chain=chain)
+        # Read the price when the trade's turn comes, never waiting on a quote
+        price = market_data.cached_price(intent.token) if chain == 'polygon' else None
+        gas_price = market_data.cached_gas_price() if direct_executor else None
+        if price is not None and gas_price is not None and intent.token in direct_executor.templates:
+            with span("direct_swap"):
+                return await direct_executor.swap(intent.side, intent.token, intent.quote_amount,
+                                                  price.value, gas_price.value, Decimal(TRADE_SLIPPAGE) / 100)
+        if direct_executor and chain == 'polygon':
+            # The MCP server takes the wallet's next nonce itself
+            direct_executor.nonces.invalidate()
+        if intent.side == 'buy':
+            return await execute_trade_intent(agent, intent, chain)
+        if price is not None:
+            return await execute_trade_intent(agent, intent, chain, price=price.value)
+        with span("llm_turn"):
+            return await agent.send(
+                f"Sell {intent.token} (address: {intent.token_address}) worth {intent.amount} USDC "
+                f"for native USDC (address: {tokens['USDC']}) on {chain}. "
+                f"Do not exceed {TRADE_LIMIT_USDC} USDC.")
+
+    annotate(chain=chain)
+    with span(f"execute_{chain}"):
+        return await execution_router.execute(chain, trade)
+
+
+trade_coalescer = TradeCoalescer(
+    execute_coalesced_trade, trade_limit=TRADE_LIMIT_USDC, window=TRADE_COALESCE_WINDOW)
+
+
+async def ask_analyst(request):
+    """Ask the primary signal analyst for a decision
+
+    Args:
+        request: Tuple of the checked out agent application and the cast prompt
+    """
+    agent, prompt = request
+    with span("llm_turn", model="primary"):
+        return await agent.signal_analyst.send(prompt)
+
+
+async def ask_fast_analyst(request):
+    """Ask the signal analyst running on SECONDARY_MODEL for a decision"""
+    agent, prompt = request
+    with span("llm_turn", model="secondary"):
+        return await agent.signal_analyst_fast.send(prompt)
+
+
+# Decisions are hedged, never trades: the analysts have no tools, so the losing
+# request can be cancelled, and the winning decision goes through the coalescer
+signal_decider = HedgedCaller(
+    ask_analyst,
+    ask_fast_analyst if SECONDARY_MODEL else None,
+    hedge_delay=LLM_HEDGE_DELAY,
+    timeout=LLM_TIMEOUT,
+)
+
 # Callback function to process Farcaster messages
-async def process_farcaster_event(event_data):
+async def process_farcaster_event(event):
     """Process events received from Farcaster webhook
 
     Args:
-        event_data: Neynar webhook event data
+        event: CastEvent for cast.created, the decoded dict for other event types
     """
-    if event_data.get('type') == 'cast.created':
-        # Get cast data from data field
-        cast_data = event_data.get('data', {})
-
-        # Get author information
-        author = cast_data.get('author', {})
-        username = author.get('username', 'unknown')
+    if isinstance(event, CastEvent):
+        username = event.username
 
         # Check if user is authorized
-        if username not in AUTHORIZED_USERS:
+        policy = trade_policy.policy_for(event.fid, username)
+        if policy is None:
             print(
                 f"Received message from unauthorized user @{username}, ignoring")
+            annotate(route="unauthorized")
             return
 
-        # Get cast text
-        text = cast_data.get('text', '')
+        text = event.text
         print(f"\nReceived message from @{username}: {text}")
 
-        # Use Fast-Agent to analyze message and execute trade
-        async with fast.run() as agent:
-            # Send message to agent for analysis
-            prompt = f"""Analyze this Farcaster message and decide whether to execute a trade (limit {TRADE_LIMIT_USDC} USDC): '{text}'
-
-Notes:
-1. STRICTLY PROHIBITED from using USDC.e for any transactions, always use only native USDC (address: {TOKEN_ADDRESSES['USDC']})
-2. If trading BTC is needed, use WBTC (address: {TOKEN_ADDRESSES['WBTC']})
-3. If trading ETH is needed, use WETH (address: {TOKEN_ADDRESSES['WETH']})
-4. If trading MATIC is needed, use WMATIC (address: {TOKEN_ADDRESSES['WMATIC']})
-5. PAY ATTENTION TO TOKEN DECIMALS when calculating amounts:
-   - USDC uses 6 decimals (1 USDC = 1,000,000 wei)
-   - WBTC uses 8 decimals (1 WBTC = 100,000,000 wei)
-   - WETH uses 18 decimals (1 WETH = 1,000,000,000,000,000,000 wei)
-   - WMATIC uses 18 decimals (1 WMATIC = 1,000,000,000,000,000,000 wei)
-6. Always use get_token_decimals tool to verify token decimals before calculating amounts
-"""
-            response = await agent.send(prompt)
-
-            print(f"\nAgent response: {response}\n")
+        # Discard casts without trading content before touching the agent
+        with span("filter"):
+            relevant = prefilter.should_forward(text, is_reply=event.is_reply)
+        if not relevant:
+            print("No trading content detected, ignoring")
+            annotate(route="filtered")
+            return
+
+        # Simple, unambiguous commands are executed without the LLM
+        with span("intent_parse"):
+            intent = intent_parser.parse(text)
+        if is_fast_path_intent(intent):
+            # The author's limits are enforced before the trade is queued
+            decision = trade_policy.acquire(policy, intent.token, float(intent.quote_amount))
+            if not decision.allowed:
+                print(f"Trade by @{username} denied by policy: {decision.reason}")
+                annotate(route="policy_denied")
+                return
+            print(f"Fast-path trade: {intent.side} {intent.amount} {intent.unit} of {intent.token}")
+            annotate(route="fast_path")
+            # Casts about the same token within the window share one netted trade
+            with span("coalesce"):
+                coalesced = await trade_coalescer.submit(intent, source=event.hash)
+            if coalesced.trade is None:
+                print(f"Buys and sells of {intent.token} netted out, no trade")
+                return
+            trade = coalesced.trade
+            print(f"\nTrade result ({len(coalesced.intents)} intent(s) -> "
+                  f"{trade.side} {trade.amount} {trade.unit} of {trade.token}): {coalesced.result}\n")
+            return
+
+        # Skip the analysis when the author may not trade at all right now
+        decision = trade_policy.check(policy, intent.token if intent else None)
+        if not decision.allowed:
+            print(f"Trade by @{username} denied by policy: {decision.reason}")
+            annotate(route="policy_denied")
+            return
+
+        # Copies of a recently decided signal, e.g. the same headline from another
+        # account, are attached to it instead of starting another agent run
+        with span("near_duplicate"):
+            original = near_duplicates.find(text, author=username)
+        if original is not None:
+            near_duplicates.attach(original, key=event.hash, author=username)
+            print(f"Near-duplicate of cast {original.key} by @{original.author}, attached to it")
+            annotate(route="near_duplicate")
+            return
+        trade_limit = min(decision.limit, TRADE_LIMIT_USDC)
+        annotate(route="llm")
+
+        # Only the cast and fresh market data, the rules are in the cached instruction
+        prompt = build_event_prompt(text, username, market_data.describe(), trade_limit)
+        # The analysts have their own pool, so decisions do not wait behind trades
+        with span("llm_decision"):
+            checkout_started = time.perf_counter()
+            async with analyst_pool.checkout() as analysts:
+                record_span("analyst_checkout", time.perf_counter() - checkout_started)
+                try:
+                    answer = await signal_decider.call(
+                        (analysts, prompt),
+                        validate=lambda response: intent_parser.parse_decision(response, trade_limit))
+                except asyncio.TimeoutError:
+                    # Both requests were cancelled, the analysts themselves are healthy
+                    answer = None
+        if answer is None:
+            print(f"No valid decision within {LLM_TIMEOUT:.0f}s, ignoring cast")
+            annotate(llm_path="timeout")
+            return
+        # Only decided casts are indexed, a denied or timed out cast may be retried by a copy
+        near_duplicates.add(text, key=event.hash, author=username)
+        annotate(llm_path=answer.path, hedged=answer.hedged)
+        print(f"Decision by {answer.path} model in {answer.latency * 1000:.0f} ms: "
+              f"{'trade' if answer.value.intent else 'no trade'} ({answer.value.reason})")
+        intent = answer.value.intent
+        if intent is None:
+            return
+
+        # Record the decided trade against the author's cooldown and spend window
+        decision = trade_policy.acquire(policy, intent.token, float(intent.quote_amount))
+        if not decision.allowed:
+            print(f"Trade by @{username} denied by policy: {decision.reason}")
+            annotate(route="policy_denied")
+            return
+        with span("coalesce"):
+            coalesced = await trade_coalescer.submit(intent, source=event.hash)
+        if coalesced.trade is None:
+            print(f"Buys and sells of {intent.token} netted out, no trade")
+            return
+        trade = coalesced.trade
+        print(f"\nTrade result ({len(coalesced.intents)} intent(s) -> "
+              f"{trade.side} {trade.amount} {trade.unit} of {trade.token}): {coalesced.result}\n")
+
+
+# Tool-less analysts deciding on casts the parser cannot handle
+
+
+@fast_analysts.agent(
+    name="signal_analyst",
+    instruction=build_analyst_instruction(TOKEN_ADDRESSES, TRADE_LIMIT_USDC),
+    servers=[],
+    use_history=False,
+)
+async def signal_analyst():
+    """Primary signal analyst, asked through signal_decider"""
+
+
+@fast_analysts.agent(
+    name="signal_analyst_fast",
+    instruction=build_analyst_instruction(TOKEN_ADDRESSES, TRADE_LIMIT_USDC),
+    servers=[],
+    model=SECONDARY_MODEL or None,
+    use_history=False,
+)
+async def signal_analyst_fast():
+    """Signal analyst on SECONDARY_MODEL, the hedge of signal_analyst"""
+
+
+@asynccontextmanager
+async def run_analysts():
+    """Start the analyst Fast-Agent application"""
+    async with fast_analysts.run() as agent:
+        yield agent
+
+
+# Warm analysts, checked out per decision; without MCP servers there is nothing to health check
+analyst_pool = AgentPool(run_analysts, size=ANALYST_POOL_SIZE)
+
+
+async def resolve_authorized_users():
+    """Resolve the usernames in the trade policy to FIDs in one batch"""
+    usernames = trade_policy.unresolved_usernames()
+    if not usernames:
+        return
+    try:
+        async with AsyncNeynarClient() as client:
+            directory = UserDirectory(client, path=USER_DIRECTORY_PATH)
+            resolved = await directory.resolve(usernames)
+            directory.close()
+    except Exception as e:
+        print(f"Failed to resolve authorized users, matching by username: {str(e)}")
+        return
+
+    for username, fid in resolved.items():
+        if fid is None:
+            print(f"Could not resolve @{username} to a FID, matching by username")
+            continue
+        trade_policy.bind(username, fid)
+
+
+async def run_polling_fallback(webhook_server):
+    """Poll monitored FIDs and feed new casts through the webhook server
+
+    Events go through the server's dedup store, so casts also delivered by
+    the webhook are only processed once.
+
+    Args:
+        webhook_server: Running WebhookServer
+    """
+    await webhook_server.wait_ready()
+    async with AsyncNeynarClient() as client:
+        monitor = CastStreamMonitor(client, MONITOR_FIDS)
+        async for event in monitor.stream():
+            try:
+                await webhook_server.submit(event)
+            except Exception as e:
+                print(f"Failed to submit polled cast: {str(e)}")
+
+
+def register_trading_agents():
+    """Define the trading agents of both chains
+
+    Their instructions carry the token decimals, so this runs once the
+    registries are warmed, before the agent pools start.
+    """
+    # Define agent using Polygon MCP server
+    fast.agent(
+        # Static rules, addresses and decimals, cached by the provider as one prefix
+        instruction=build_instruction(TOKEN_ADDRESSES, token_registry, TRADE_LIMIT_USDC),
+        # Use Polygon MCP server and the local market data server defined in fastagent.config.yaml
+        servers=["polygon", "market_data"],
+        # Casts are independent, so keep the request to the cached prefix plus one cast
+        use_history=False,
+    )(process_farcaster_event)
+
+    fast_ethereum.agent(
+        instruction=f"""You execute cryptocurrency trades on Ethereum mainnet for a Farcaster signal trader.
+
+Execute exactly the trade you are asked for and never exceed {TRADE_LIMIT_USDC} USDC.
+Use native USDC ({ETHEREUM_TOKEN_ADDRESSES['USDC']}) and these verified token decimals:
+{ethereum_token_registry.describe()}""",
+        servers=["ethereum"],
+    )(ethereum_trader)
+
+
+async def start_direct_executor():
+    """Create the direct swap executor and fetch its nonce and allowances"""
+    global direct_executor
+    if not POLYGON_RPC_URL:
+        print("DIRECT_EXECUTION needs POLYGON_RPC_URL, swaps go through the MCP server")
+        return
+    try:
+        address, signer = load_signer(os.getenv('WALLET_PRIVATE_KEY'), os.getenv('SEED_PHRASE'))
+        executor = DirectSwapExecutor(POLYGON_RPC_URL, token_registry, address, signer)
+        await executor.warm()
+    except Exception as e:
+        print(f"Direct execution disabled, swaps go through the MCP server: {str(e)}")
+        return
+    direct_executor = executor
+    print(f"Direct execution enabled for {address}")
+
 
 # Define main function
 
 
 async def main():
+    # Format and write log records off the event loop
+    configure_from_env()
+
     print("\n=== Farcaster Event Trader ===\n")
     print("Starting Fast-Agent and Polygon MCP server...\n")
 
-    # Create and start webhook server (run in background)
-    webhook_server = WebhookServer(callback=process_farcaster_event)
+    # Verify token decimals once, so trades never look them up
+    if POLYGON_RPC_URL:
+        try:
+            updated = await asyncio.to_thread(token_registry.warm, POLYGON_RPC_URL)
+            print(f"Token registry warmed, {updated} record(s) updated")
+        except Exception as e:
+            print(f"Failed to warm token registry, using cached decimals: {str(e)}")
+    if ETHEREUM_RPC_URL and 'ethereum' in execution_router.executors:
+        try:
+            updated = await asyncio.to_thread(ethereum_token_registry.warm, ETHEREUM_RPC_URL)
+            print(f"Ethereum token registry warmed, {updated} record(s) updated")
+        except Exception as e:
+            print(f"Failed to warm Ethereum token registry, using cached decimals: {str(e)}")
+    register_trading_agents()
+
+    # Resolve authorized usernames to FIDs
+    await resolve_authorized_users()
+
+    # Start refreshing market data and serve it to the agents before they connect
+    await market_data.start()
+    market_data_server, market_data_task = await serve_mcp_server(market_data, port=MARKET_DATA_PORT)
+    print(f"Market data cache ready on port {MARKET_DATA_PORT}: "
+          f"{len(market_data.prices)} price(s), gas {'cached' if market_data.gas_price else 'unavailable'}")
+
+    # Submit routine swaps directly over JSON-RPC, the MCP server remains the fallback
+    if DIRECT_EXECUTION:
+        await start_direct_executor()
+
+    # Pick up edits to the policy file without a restart
+    trade_policy.watch(on_reload=resolve_authorized_users)
+
+    # Warm up the agent pools of all chains once, instead of per event
+    await execution_router.start()
+    await analyst_pool.start()
+    for chain, executor in execution_router.executors.items():
+        cold_start = executor.pool.stats()['cold_start']
+        print(f"{chain} agent pool ready: {AGENT_POOL_SIZE} instance(s), "
+              f"cold start {cold_start.get('avg_ms', 0):.0f} ms")
+
+    # Serve webhooks on this event loop, sharing it with the agent pool
+    webhook_server = WebhookServer(
+        callback=process_farcaster_event,
+        queue_size=WEBHOOK_QUEUE_SIZE,
+        workers=WEBHOOK_WORKERS,
+        overflow_policy=WEBHOOK_OVERFLOW_POLICY,
+        dedup_path=WEBHOOK_DEDUP_PATH,
+        journal_path=WEBHOOK_JOURNAL_PATH,
+        journal_max_age=WEBHOOK_JOURNAL_MAX_AGE,
+        trace_path=TRACE_PATH,
+        payload_sample_rate=LOG_PAYLOAD_SAMPLE_RATE,
+    )
     webhook_task = asyncio.create_task(
-        asyncio.to_thread(webhook_server.run)
+        webhook_server.serve(port=WEBHOOK_PORT, processes=WEBHOOK_PROCESSES)
     )
 
-    print(f"Webhook server started, listening on port 8000")
-    print(f"Authorized users: {', '.join(AUTHORIZED_USERS)}")
+    print(f"Webhook server started, listening on port {WEBHOOK_PORT}"
+          + (f" with {WEBHOOK_PROCESSES} ingest processes" if WEBHOOK_PROCESSES > 1 else ""))
+
+    # Optional polling ingestion path
+    polling_task = None
+    if MONITOR_FIDS:
+        polling_task = asyncio.create_task(run_polling_fallback(webhook_server))
+        print(f"Polling {len(MONITOR_FIDS)} FID(s) as webhook fallback")
+    policy_stats = trade_policy.stats()
+    print(f"Trade policy: {policy_stats['authors']} authorized author(s), "
+          f"{policy_stats['unresolved']} matched by username")
     print(f"Trading limit: {TRADE_LIMIT_USDC} USDC")
+    print(f"Signal decisions: timeout {LLM_TIMEOUT:g}s, "
+          + (f"hedged to {SECONDARY_MODEL} after {LLM_HEDGE_DELAY:g}s" if SECONDARY_MODEL else "not hedged"))
     print("\nWaiting for Farcaster messages...\n")
 
     try:
-        # Keep program running
-        while True:
-            await asyncio.sleep(1)
-    except KeyboardInterrupt:
-        print("\nShutting down services...")
+        # Runs until SIGINT/SIGTERM, then drains in-flight events
+        await webhook_task
+    except (KeyboardInterrupt, asyncio.CancelledError):
+        pass
     finally:
-        # Cancel webhook task
-        webhook_task.cancel()
-        try:
-            await webhook_task
-        except asyncio.CancelledError:
-            pass
+        print("\nShutting down services...")
+        if polling_task:
+            polling_task.cancel()
+        if not webhook_task.done():
+            webhook_server.shutdown()
+            await asyncio.gather(webhook_task, return_exceptions=True)
+        print(f"Agent pool stats: {json.dumps(agent_pool.stats())}")
+        print(f"Analyst pool stats: {json.dumps(analyst_pool.stats())}")
+        print(f"Execution router stats: {json.dumps(execution_router.stats())}")
+        print(f"Prefilter stats: {json.dumps(prefilter.stats())}")
+        print(f"Near-duplicate stats: {json.dumps(near_duplicates.stats())}")
+        print(f"Coalescer stats: {json.dumps(trade_coalescer.stats())}")
+        print(f"LLM decision stats: {json.dumps(signal_decider.stats())}")
+        print(f"Market data stats: {json.dumps(market_data.stats())}")
+        print(f"Trade policy stats: {json.dumps(trade_policy.stats())}")
+        await trade_policy.stop()
+        if direct_executor:
+            print(f"Direct executor stats: {json.dumps(direct_executor.stats())}")
+            await direct_executor.close()
+        await execution_router.stop()
+        await analyst_pool.stop()
+        market_data_server.should_exit = True
+        await asyncio.gather(market_data_task, return_exceptions=True)
+        await market_data.stop()
+        shutdown_logging()
         print("Services shut down")
 
 # Run main function
@@ -0,0 +1,462 @@
+#!/usr/bin/env python3
+import asyncio
+import itertools
+import logging
+import time
+from dataclasses import dataclass
+from decimal import Decimal
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+import httpx
+
+from token_registry import TokenInfo, TokenRegistry
+
+logger = logging.getLogger("rpc-executor")
+
+# Uniswap V3 SwapRouter02, deployed at the same address on Ethereum and Polygon
+UNISWAP_V3_ROUTER = '0x68b3465833fb72A70ecDF485E0e4C7bD8665Fc45'
+
+# Function selectors
+APPROVE_SELECTOR = '0x095ea7b3'             # approve(address,uint256)
+ALLOWANCE_SELECTOR = '0xdd62ed3e'           # allowance(address,address)
+EXACT_INPUT_SINGLE_SELECTOR = '0x04e45aaf'  # exactInputSingle((address,address,uint24,address,uint256,uint256,uint160))
+
+# Fee tier of the USDC pool each token is swapped through, in hundredths of a bip
+DEFAULT_POOL_FEES = {'WETH': 500, 'WBTC': 500, 'WMATIC': 500}
+
+# Gas limits used until estimated
+DEFAULT_APPROVE_GAS = 60_000
+DEFAULT_SWAP_GAS = 250_000
+
+
+class RpcError(Exception):
+    """Error returned by the JSON-RPC node"""
+
+    def __init__(self, code: int, message: str, method: Optional[str] = None):
+        super().__init__(f"{method or 'rpc'}: {message} ({code})")
+        self.code = code
+        self.message = message
+        self.method = method
+
+
+def _word(value: int) -> str:
+    return f"{value:064x}"
+
+
+def _address_word(address: str) -> str:
+    return address.lower().removeprefix('0x').rjust(64, '0')
+
+
+class JsonRpcPool:
+    """Keep-alive HTTP connections to one JSON-RPC node, with request batching"""
+
+    def __init__(self, url: str, max_connections: int = 4, timeout: float = 10.0):
+        """Initialize the pool
+
+        Args:
+            url: JSON-RPC endpoint
+            max_connections: Connections kept open to the node
+            timeout: Request timeout in seconds
+        """
+        self.url = url
+        self._client = httpx.AsyncClient(
+            timeout=timeout,
+            limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections),
+        )
+        self._ids = itertools.count(1)
+
+        # Counters
+        self.round_trips = 0
+        self.requests = 0
+
+    async def close(self):
+        await self._client.aclose()
+
+    async def call(self, method: str, params: Sequence[Any] = ()) -> Any:
+        """Send one request and return its result"""
+        return (await self.batch([(method, params)]))[0]
+
+    async def batch(self, calls: Sequence[Tuple[str, Sequence[Any]]], raise_errors: bool = True) -> List[Any]:
+        """Send several requests in one HTTP round trip
+
+        Args:
+            calls: ``(method, params)`` tuples
+            raise_errors: Raise the first RpcError; otherwise errors are returned in place of results
+
+        Returns:
+            Results in the order of ``calls``
+        """
+        ids = [next(self._ids) for _ in calls]
+        body = [{"jsonrpc": "2.0", "id": id_, "method": method, "params": list(params)}
+                for id_, (method, params) in zip(ids, calls)]
+        response = await self._client.post(self.url, json=body[0] if len(body) == 1 else body)
+        response.raise_for_status()
+        self.round_trips += 1
+        self.requests += len(calls)
+
+        replies = response.json()
+        if isinstance(replies, dict):
+            replies = [replies]
+        by_id = {reply.get("id"): reply for reply in replies}
+        results = []
+        for id_, (method, _) in zip(ids, calls):
+            reply = by_id.get(id_, {"error": {"code": -32603, "message": "missing reply"}})
+            if "error" in reply:
+                error = RpcError(reply["error"].get("code", 0), reply["error"].get("message", ""), method)
+                if raise_errors:
+                    raise error
+                results.append(error)
+            else:
+                results.append(reply.get("result"))
+        return results
+
+
+class NonceManager:
+    """Hands out the wallet's nonces locally, without asking the node per transaction"""
+
+    def __init__(self, pool: JsonRpcPool, address: str):
+        self.pool = pool
+        self.address = address
+        self._next: Optional[int] = None
+        self._lock = asyncio.Lock()
+
+    def set(self, nonce: int):
+        """Set the next nonce, e.g. from a batched eth_getTransactionCount"""
+        self._next = nonce
+
+    def invalidate(self):
+        """Forget the local nonce, e.g. after a transaction sent by another client"""
+        self._next = None
+
+    def peek(self) -> Optional[int]:
+        """Return the next nonce without reserving it, None until fetched"""
+        return self._next
+
+    async def take(self, count: int = 1) -> int:
+        """Reserve ``count`` consecutive nonces and return the first"""
+        async with self._lock:
+            if self._next is None:
+                self._next = int(await self.pool.call("eth_getTransactionCount", [self.address, "pending"]), 16)
+            nonce = self._next
+            self._next += count
+            return nonce
+
+
+@dataclass
+class SwapTemplate:
+    """Pre-built parts of the approve and swap transactions of one token"""
+
+    token: TokenInfo
+    pool_fee: int
+    approve_gas: int = DEFAULT_APPROVE_GAS
+    swap_gas: int = DEFAULT_SWAP_GAS
+    approve_prefix: str = ""  # approve(router, ...) calldata without the amount
+
+
+class DirectSwapExecutor:
+    """Signs and submits swaps of known tokens straight to a JSON-RPC node
+
+    Swaps go through Uniswap V3 ``exactInputSingle`` against the token's USDC
+    pool, so the calldata is built locally from a per-token template. With
+    the nonce managed locally, allowances cached and the gas price supplied
+    by the caller, a swap (plus an approval when the cached allowance is too
+    low) is submitted in a single batched round trip.
+
+    ``warm`` does the lookups up front in one batch: chain id, pending nonce,
+    current allowances and approval gas estimates.
+    """
+
+    def __init__(
+        self,
+        rpc_url: str,
+        registry: TokenRegistry,
+        address: str,
+        signer: Callable[[Dict[str, Any]], bytes],
+        chain_id: int = 137,
+        quote_symbol: str = 'USDC',
+        router: str = UNISWAP_V3_ROUTER,
+        pool_fees: Optional[Dict[str, int]] = None,
+        approval_multiple: int = 100,
+        max_connections: int = 4,
+    ):
+        """Initialize the executor
+
+        Args:
+            rpc_url: JSON-RPC endpoint
+            registry: Token registry with verified decimals
+            address: Wallet address
+            signer: Function signing a transaction dict into raw transaction bytes, see ``load_signer``
+            chain_id: Chain id, checked against the node in ``warm``
+            quote_symbol: Symbol swaps are priced in
+            router: Uniswap V3 SwapRouter02 address
+            pool_fees: Fee tier of each token's pool, defaults to DEFAULT_POOL_FEES
+            approval_multiple: Approvals cover this many trades of the current size
+            max_connections: Connections kept open to the node
+        """
+        self.pool = JsonRpcPool(rpc_url, max_connections=max_connections)
+        self.registry = registry
+        self.address = address
+        self.signer = signer
+        self.chain_id = chain_id
+        self.quote_symbol = quote_symbol
+        self.router = router
+        self.approval_multiple = approval_multiple
+        self.nonces = NonceManager(self.pool, address)
+        self.allowances: Dict[str, int] = {}
+
+        fees = pool_fees or DEFAULT_POOL_FEES
+        self.templates: Dict[str, SwapTemplate] = {}
+        for token in registry:
+            if token.decimals is None or (token.symbol != quote_symbol and token.symbol not in fees):
+                continue
+            self.templates[token.symbol] = SwapTemplate(
+                token=token,
+                pool_fee=fees.get(token.symbol, 0),
+                approve_prefix=APPROVE_SELECTOR + _address_word(router),
+            )
+
+        # Counters
+        self.swaps = 0
+        self.approvals = 0
+
+    async def close(self):
+        await self.pool.close()
+
+    async def warm(self):
+        """Fetch chain id, nonce, allowances and approval gas in one batch"""
+        tokens = list(self.templates.values())
+        calls = [("eth_chainId", []), ("eth_getTransactionCount", [self.address, "pending"])]
+        for template in tokens:
+            calls.append(("eth_call", [{
+                "to": template.token.address,
+                "data": ALLOWANCE_SELECTOR + _address_word(self.address) + _address_word(self.router),
+            }, "latest"]))
+        for template in tokens:
+            calls.append(("eth_estimateGas", [{
+                "from": self.address, "to": template.token.address,
+                "data": template.approve_prefix + _word(1),
+            }]))
+        results = await self.pool.batch(calls, raise_errors=False)
+
+        chain_id, nonce = results[0], results[1]
+        for result in (chain_id, nonce):
+            if isinstance(result, RpcError):
+                raise result
+        if int(chain_id, 16) != self.chain_id:
+            raise ValueError(f"RPC node is on chain {int(chain_id, 16)}, expected {self.chain_id}")
+        self.nonces.set(int(nonce, 16))
+
+        allowances = results[2:2 + len(tokens)]
+        estimates = results[2 + len(tokens):]
+        for template, allowance, estimate in zip(tokens, allowances, estimates):
+            if not isinstance(allowance, RpcError) and allowance not in (None, "0x"):
+                self.allowances[template.token.symbol] = int(allowance, 16)
+            if not isinstance(estimate, RpcError):
+                # Headroom for allowances going from zero to non-zero
+                template.approve_gas = int(int(estimate, 16) * 1.3)
+        logger.info("Direct executor warmed: nonce %d, %d token templates", self.nonces.peek(), len(tokens))
+
+    def _sign(self, to: str, data: str, gas: int, gas_price: int, nonce: int) -> str:
+        raw = self.signer({
+            "chainId": self.chain_id, "nonce": nonce, "to": to, "value": 0,
+            "data": data, "gas": gas, "gasPrice": gas_price,
+        })
+        return "0x" + bytes(raw).hex()
+
+    def _swap_data(self, token_in: TokenInfo, token_out: TokenInfo, fee: int,
+                   amount_in: int, min_out: int) -> str:
+        return (EXACT_INPUT_SINGLE_SELECTOR
+                + _address_word(token_in.address) + _address_word(token_out.address)
+                + _word(fee) + _address_word(self.address)
+                + _word(amount_in) + _word(min_out) + _word(0))
+
+    async def swap(self, side: str, token: str, quote_amount: Decimal, price: Decimal,
+                   gas_price_gwei: Decimal, slippage: Decimal = Decimal('0.01')) -> Dict[str, Any]:
+        """Sign and submit a swap between USDC and a token
+
+        Args:
+            side: 'buy' (USDC -> token) or 'sell' (token -> USDC)
+            token: Token symbol, must have a template
+            quote_amount: Trade size in USDC
+            price: Price of one token in USDC, used for the minimum output
+            gas_price_gwei: Gas price to pay, e.g. from the market data cache
+            slippage: Accepted slippage as a fraction
+
+        Returns:
+            Dictionary with the swap transaction hash, and the approval hash if one was sent
+        """
+        template = self.templates.get(token)
+        quote = self.templates.get(self.quote_symbol)
+        if template is None or template.token.symbol == self.quote_symbol or quote is None:
+            raise ValueError(f"No swap template for {token}")
+        quote_amount = Decimal(str(quote_amount))
+        price = Decimal(str(price))
+        keep = 1 - Decimal(str(slippage))
+
+        if side == 'buy':
+            token_in, token_out = quote.token, template.token
+            amount_in = token_in.to_base_units(quote_amount)
+            min_out = token_out.to_base_units(quote_amount / price * keep)
+        else:
+            token_in, token_out = template.token, quote.token
+            amount_in = token_in.to_base_units(quote_amount / price)
+            min_out = token_out.to_base_units(quote_amount * keep)
+
+        gas_price = int(Decimal(str(gas_price_gwei)) * 10 ** 9)
+        needs_approval = self.allowances.get(token_in.symbol, 0) < amount_in
+        nonce = await self.nonces.take(2 if needs_approval else 1)
+
+        try:
+            raw_transactions = []
+            if needs_approval:
+                approval = amount_in * self.approval_multiple
+                raw_transactions.append(self._sign(
+                    token_in.address, self.templates[token_in.symbol].approve_prefix + _word(approval),
+                    self.templates[token_in.symbol].approve_gas, gas_price, nonce))
+                nonce += 1
+            raw_transactions.append(self._sign(
+                self.router, self._swap_data(token_in, token_out, template.pool_fee, amount_in, min_out),
+                template.swap_gas, gas_price, nonce))
+            hashes = await self.pool.batch([("eth_sendRawTransaction", [raw]) for raw in raw_transactions])
+        except BaseException:
+            # The reserved nonces were not (or only partly) used: resync from the node's
+            # pending count, so the next swap fills the gap instead of queuing behind it
+            self.nonces.invalidate()
+            if needs_approval:
+                self.allowances.pop(token_in.symbol, None)
+            raise
+
+        result = {"swap_tx": hashes[-1], "amount_in": amount_in, "min_out": min_out}
+        if needs_approval:
+            self.allowances[token_in.symbol] = approval
+            self.approvals += 1
+            result["approve_tx"] = hashes[0]
+        self.allowances[token_in.symbol] = self.allowances.get(token_in.symbol, 0) - amount_in
+        self.swaps += 1
+        return result
+
+    def stats(self) -> Dict[str, Any]:
+        """Return swap and round trip counters"""
+        return {
+            "swaps": self.swaps,
+            "approvals": self.approvals,
+            "round_trips": self.pool.round_trips,
+            "requests": self.pool.requests,
+            "cached_allowances": len(self.allowances),
+        }
+
+
+def load_signer(private_key: Optional[str] = None, seed_phrase: Optional[str] = None):
+    """Create a transaction signer from a private key or seed phrase
+
+    A seed phrase is derived along the default path m/44'/60'/0'/0/0, the
+    account the MCP servers use. Requires the optional eth-account package.
+
+    Returns:
+        Tuple of the wallet address and a function signing a transaction dict
+    """
+    try:
+        from eth_account import Account
+    except ImportError:
+        raise RuntimeError("Direct execution requires eth-account: pip install eth-account")
+
+    if private_key:
+        account = Account.from_key(private_key)
+    elif seed_phrase:
+        Account.enable_unaudited_hdwallet_features()
+        account = Account.from_mnemonic(seed_phrase)
+    else:
+        raise ValueError("A private key or seed phrase is required")
+
+    def sign(transaction: Dict[str, Any]) -> bytes:
+        signed = account.sign_transaction(transaction)
+        return getattr(signed, "raw_transaction", None) or signed.rawTransaction
+
+    return account.address, sign
+
+
+def stub_rpc_app(chain_id: int = 137, latency: float = 0.0):
+    """FastAPI app answering the JSON-RPC methods the executor uses
+
+    Args:
+        chain_id: Chain id reported by eth_chainId
+        latency: Seconds each HTTP request takes, to model a remote node
+    """
+    from fastapi import FastAPI, Request
+
+    app = FastAPI()
+    # reject_sends: number of upcoming eth_sendRawTransaction calls to reject
+    state = {"nonce": 0, "received": [], "http_requests": 0, "reject_sends": 0}
+    app.state.rpc = state
+
+    def handle(request: Dict[str, Any]) -> Dict[str, Any]:
+        method = request["method"]
+        if method == "eth_chainId":
+            result = hex(chain_id)
+        elif method == "eth_getTransactionCount":
+            result = hex(state["nonce"])
+        elif method == "eth_call":
+            result = "0x" + _word(0)
+        elif method == "eth_estimateGas":
+            result = hex(46_000)
+        elif method == "eth_sendRawTransaction" and state["reject_sends"]:
+            state["reject_sends"] -= 1
+            return {"jsonrpc": "2.0", "id": request.get("id"),
+                    "error": {"code": -32000, "message": "transaction rejected"}}
+        elif method == "eth_sendRawTransaction":
+            state["received"].append(request["params"][0])
+            state["nonce"] += 1
+            result = "0x" + _word(len(state["received"]))
+        else:
+            return {"jsonrpc": "2.0", "id": request.get("id"),
+                    "error": {"code": -32601, "message": f"method {method} not found"}}
+        return {"jsonrpc": "2.0", "id": request.get("id"), "result": result}
+
+    @app.post("/")
+    async def rpc(request: Request):
+        await asyncio.sleep(latency)
+        state["http_requests"] += 1
+        body = await request.json()
+        return [handle(item) for item in body] if isinstance(body, list) else handle(body)
+
+    return app
+
+
+async def run_demo(swaps: int = 20, latency: float = 0.05):
+    """Submit swaps against a local stub RPC node and count round trips"""
+    import uvicorn
+
+    token_addresses = {
+        'USDC': '0x3c499c542cEF5E3811e1192ce70d8cC03d5c3359',
+        'WETH': '0x7ceB23fD6bC0adD59E62ac25578270cFf1b9f619',
+        'WBTC': '0x1BFD67037B42Cf73acF2047067bd4F2C47D9BfD6',
+    }
+    app = stub_rpc_app(latency=latency)
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=8545, log_config=None))
+    server_task = asyncio.create_task(server.serve())
+    while not server.started:
+        await asyncio.sleep(0.01)
+
+    # Throwaway key, the stub node accepts any signed transaction
+    address, signer = load_signer(private_key="0x" + "11" * 32)
+    executor = DirectSwapExecutor("http://127.0.0.1:8545", TokenRegistry.load(token_addresses), address, signer)
+    try:
+        await executor.warm()
+        started = time.perf_counter()
+        for i in range(swaps):
+            await executor.swap('buy' if i % 2 == 0 else 'sell', 'WETH' if i % 3 else 'WBTC',
+                                Decimal('0.5'), Decimal('3100') if i % 3 else Decimal('64000'), Decimal('35'))
+        elapsed = time.perf_counter() - started
+    finally:
+        await executor.close()
+        server.should_exit = True
+        await server_task
+
+    print(f"{swaps} swaps in {elapsed * 1000:.0f} ms ({elapsed / swaps * 1000:.1f} ms/swap at "
+          f"{latency * 1000:.0f} ms RPC latency), {app.state.rpc['http_requests'] - 1} HTTP round trips "
+          f"for {len(app.state.rpc['received'])} transactions")
+    print(executor.stats())
+
+
+if __name__ == "__main__":
+    asyncio.run(run_demo())
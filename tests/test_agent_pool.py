@@ -0,0 +1,86 @@
+import asyncio
+from contextlib import asynccontextmanager
+
+import pytest
+
+from agent_pool import AgentPool, AgentPoolError
+from rpc_executor import RpcError
+
+
+def run(test, **pool_kwargs):
+    started = []
+
+    @asynccontextmanager
+    async def factory():
+        started.append(len(started))
+        yield f"agent{len(started)}"
+
+    async def main():
+        pool = AgentPool(factory, restart_backoff=0.01, **pool_kwargs)
+        await pool.start()
+        try:
+            await test(pool)
+        finally:
+            await pool.stop()
+    asyncio.run(main())
+    return len(started)
+
+
+async def checkout_raising(pool, error):
+    with pytest.raises(type(error)):
+        async with pool.checkout():
+            raise error
+    async with pool.checkout(timeout=1) as agent:
+        return agent
+
+
+def test_trade_error_keeps_the_agent():
+    async def test(pool):
+        assert await checkout_raising(pool, ValueError("no price")) == "agent1"
+        assert await checkout_raising(pool, RpcError(-32000, "nonce too low")) == "agent1"
+        assert pool.stats()["restarts"] == 0
+
+    assert run(test) == 1
+
+
+def test_transport_error_restarts_the_agent():
+    async def test(pool):
+        assert await checkout_raising(pool, BrokenPipeError("server exited")) == "agent2"
+        assert pool.stats()["restarts"] == 1
+
+    assert run(test) == 2
+
+
+def test_start_fails_when_no_slot_gets_warm():
+    attempts = []
+
+    @asynccontextmanager
+    async def broken_factory():
+        attempts.append(1)
+        raise OSError("mcp server not found")
+        yield
+
+    async def main():
+        pool = AgentPool(broken_factory, size=2, restart_backoff=0.01, max_start_failures=2)
+        with pytest.raises(AgentPoolError, match="failed to start 2 times"):
+            await pool.start()
+        count = len(attempts)
+        await asyncio.sleep(0.05)
+        # The slots were stopped and do not keep restarting
+        assert len(attempts) == count
+
+    asyncio.run(main())
+
+
+def test_start_times_out_on_a_hanging_slot():
+    @asynccontextmanager
+    async def hanging_factory():
+        await asyncio.sleep(10)
+        yield
+
+    async def main():
+        pool = AgentPool(hanging_factory, restart_backoff=0.01)
+        with pytest.raises(AgentPoolError, match="within 0.1s"):
+            await pool.start(timeout=0.1)
+
+    asyncio.run(main())
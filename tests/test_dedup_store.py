@@ -0,0 +1,69 @@
+import asyncio
+import time
+
+from dedup_store import DedupStore
+
+
+def test_key_evicted_from_memory_is_found_in_database(tmp_path):
+    store = DedupStore(max_entries=2, path=str(tmp_path / "dedup.db"))
+    for key in ("a", "b", "c"):
+        assert store.add(key)
+    # "a" fell out of the memory cap but is still within its TTL
+    assert len(store) == 2
+    assert not store.add("a")
+    assert store.stats()["db_hits"] == 1
+    store.close()
+
+
+def test_memory_is_authoritative_until_keys_spill():
+    store = DedupStore(max_entries=10)
+    assert store.add("a")
+    assert not store.add("a")
+    assert store.stats()["db_lookups"] == 0
+
+
+def test_discarded_key_is_new_again(tmp_path):
+    store = DedupStore(max_entries=1, path=str(tmp_path / "dedup.db"))
+    store.add("a")
+    store.add("b")
+    store.discard("a")
+    assert store.add("a")
+    store.close()
+
+
+def test_state_survives_restart(tmp_path):
+    path = str(tmp_path / "dedup.db")
+    store = DedupStore(max_entries=1, path=path)
+    store.add("a")
+    store.add("b")
+    store.close()
+
+    reopened = DedupStore(max_entries=1, path=path)
+    assert not reopened.add("b")
+    assert not reopened.add("a")
+    reopened.close()
+
+
+def test_background_writer_batches_commits_and_prunes(tmp_path):
+    async def main():
+        store = DedupStore(max_entries=2, ttl=60, path=str(tmp_path / "dedup.db"),
+                           commit_interval=0.01, prune_interval=0.01)
+        await store.start()
+        for i in range(50):
+            store.add(f"key{i}")
+        # Buffered, not yet committed, but still seen as duplicates
+        assert not store.add("key0")
+        await asyncio.sleep(0.1)
+        assert 1 <= store.stats()["commits"] <= 5
+
+        # Age one key past the TTL, the writer removes it from the database
+        with store._db_lock:
+            store._db.execute("UPDATE dedup SET seen_at = ? WHERE key = 'key1'", (time.time() - 120,))
+            store._db.commit()
+        await asyncio.sleep(0.1)
+        with store._db_lock:
+            assert store._db.execute("SELECT COUNT(*) FROM dedup WHERE key = 'key1'").fetchone()[0] == 0
+        await store.stop()
+        store.close()
+
+    asyncio.run(main())
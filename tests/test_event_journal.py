@@ -0,0 +1,33 @@
+import asyncio
+
+from cast_event import decode_event, sample_payload
+from webhook_server import WebhookServer
+
+
+def test_event_interrupted_by_stop_is_replayed(tmp_path):
+    path = str(tmp_path / "journal.db")
+    started = asyncio.Event()
+    replayed = []
+
+    async def slow_callback(event):
+        started.set()
+        await asyncio.sleep(10)
+
+    async def record_callback(event):
+        replayed.append(event.hash)
+
+    async def main():
+        server = WebhookServer(callback=slow_callback, journal_path=path, drain_timeout=0.2)
+        await server.start()
+        event = decode_event(sample_payload())
+        assert await server.submit(event)
+        await started.wait()
+        await server.stop()
+
+        restarted = WebhookServer(callback=record_callback, journal_path=path)
+        await restarted.start()
+        await restarted.event_queue._queue.join()
+        await restarted.stop()
+        return event.hash
+
+    assert replayed == [asyncio.run(main())]
@@ -0,0 +1,87 @@
+import asyncio
+
+import pytest
+
+from ingest_ipc import IngestBridge, IngestForwarder
+
+
+def run(tmp_path, test, submit=None, query=None):
+    async def accept(event, spans):
+        return True
+
+    async def main():
+        path = str(tmp_path / "ingest.sock")
+        bridge = IngestBridge(path, submit or accept, query)
+        await bridge.start()
+        forwarder = IngestForwarder(path, timeout=2.0)
+        await forwarder.connect()
+        try:
+            await test(forwarder, bridge)
+        finally:
+            await forwarder.close()
+            await bridge.stop()
+    asyncio.run(main())
+
+
+def test_forwarded_event_carries_worker_spans(tmp_path):
+    received = []
+
+    async def submit(event, spans):
+        received.append((event, spans))
+        return event["id"] != "full"
+
+    async def test(forwarder, bridge):
+        assert await forwarder.submit({"id": "a"}, {"json_parse": 0.001})
+        assert not await forwarder.submit({"id": "full"})
+        assert bridge.stats() == {"received": 2, "rejected": 1}
+
+    run(tmp_path, test, submit=submit)
+    assert received == [({"id": "a"}, {"json_parse": 0.001}), ({"id": "full"}, {})]
+
+
+def test_query_is_answered_by_the_executor(tmp_path):
+    def query(name):
+        return {"queue": {"size": 3}} if name == "stats" else "# metrics\n"
+
+    async def test(forwarder, bridge):
+        stats, metrics = await asyncio.gather(forwarder.query("stats"), forwarder.query("metrics"))
+        assert stats == {"queue": {"size": 3}}
+        assert metrics == "# metrics\n"
+        # Queries are not counted as forwarded events
+        assert bridge.stats()["received"] == 0
+
+    run(tmp_path, test, query=query)
+
+
+def test_forwarder_reconnects_after_the_connection_drops(tmp_path):
+    async def main():
+        path = str(tmp_path / "ingest.sock")
+
+        async def accept(event, spans):
+            return True
+
+        bridge = IngestBridge(path, accept)
+        await bridge.start()
+        forwarder = IngestForwarder(path, timeout=2.0, reconnect_backoff=0.05)
+        await forwarder.connect()
+        try:
+            # The executor goes away and the connection drops
+            await bridge.stop()
+            forwarder._writer.transport.abort()
+            await asyncio.sleep(0.01)
+            with pytest.raises(ConnectionError):
+                await forwarder.submit({"id": "lost"})
+
+            # It comes back on the same path
+            bridge = IngestBridge(path, accept)
+            await bridge.start()
+            for _ in range(100):
+                if forwarder.reconnects:
+                    break
+                await asyncio.sleep(0.02)
+            assert await forwarder.submit({"id": "a"})
+            assert bridge.stats()["received"] == 1
+        finally:
+            await forwarder.close()
+            await bridge.stop()
+    asyncio.run(main())
@@ -0,0 +1,58 @@
+from near_duplicates import NearDuplicateIndex
+
+HEADLINE = "SEC approves spot ether ETF applications from several issuers today"
+REPOST = "BREAKING: SEC approves spot ether ETF applications from several issuers today https://x.example/1"
+
+
+def test_find_does_not_index():
+    index = NearDuplicateIndex()
+    assert index.find(HEADLINE, now=0) is None
+    assert index.find(REPOST, now=1) is None
+    assert len(index) == 0
+
+
+def test_copy_of_added_cast_is_found_and_attached():
+    index = NearDuplicateIndex()
+    index.add(HEADLINE, key="0x1", author="alice", now=0)
+    original = index.find(REPOST, now=1)
+    assert original is not None and original.key == "0x1"
+    index.attach(original, key="0x2", author="bob")
+    assert original.duplicates == [("0x2", "bob")]
+    assert index.stats()["duplicates"] == 1
+
+
+def test_check_indexes_new_casts_only():
+    index = NearDuplicateIndex()
+    assert index.check(HEADLINE, key="0x1", now=0) is None
+    assert index.check(REPOST, key="0x2", now=1).key == "0x1"
+    assert len(index) == 1
+
+
+def test_opposite_direction_is_not_a_copy():
+    index = NearDuplicateIndex()
+    index.add("Going long WBTC right now, the ETF approval is coming this week", key="0x1", author="alice", now=0)
+    assert index.find("Going short WBTC right now, the ETF approval is delayed this week", author="bob", now=1) is None
+    index.add("buy 20 usdc of weth if btc holds 60k today", key="0x2", author="alice", now=0)
+    assert index.find("sell 20 usdc of weth if btc holds 60k today", author="bob", now=1) is None
+
+
+def test_negated_copy_is_not_a_copy():
+    index = NearDuplicateIndex()
+    index.add(HEADLINE, key="0x1", author="alice", now=0)
+    assert index.find("SEC has not approved spot ether ETF applications from several issuers today", now=1) is None
+
+
+def test_same_author_is_never_attached():
+    index = NearDuplicateIndex()
+    index.add(HEADLINE, key="0x1", author="alice", now=0)
+    assert index.find(REPOST, author="alice", now=1) is None
+    assert index.find(REPOST, author="bob", now=1).key == "0x1"
+
+
+def test_reversal_of_a_long_cast_is_not_a_copy():
+    # Scores well above the threshold, only the changed side tells them apart
+    text = "buy 20 usdc of weth if btc holds 60k today and etf flows stay strong into the weekend close"
+    index = NearDuplicateIndex()
+    index.add(text, key="0x1", author="alice", now=0)
+    assert index.find(text.replace("buy", "sell"), author="bob", now=1) is None
+    assert index.find(text, author="bob", now=1).key == "0x1"
@@ -0,0 +1,114 @@
+import asyncio
+import logging
+import socket
+import time
+
+import httpx
+import pytest
+import requests
+from fastapi import FastAPI, Response
+
+from neynar_client import AsyncNeynarClient, NeynarClient
+
+
+def mock_neynar(failures=1, status=503, delay=0.0, headers=None):
+    """Mock API answering the first ``failures`` requests per route with ``status``"""
+    app = FastAPI()
+    app.state.hits = {}
+
+    async def handle(route):
+        hits = app.state.hits[route] = app.state.hits.get(route, 0) + 1
+        await asyncio.sleep(delay)
+        if hits <= failures:
+            return Response(status_code=status, headers=headers)
+        return {"route": route, "hits": hits}
+
+    @app.post("/webhook")
+    async def publish_webhook():
+        return await handle("POST")
+
+    @app.get("/webhook")
+    async def list_webhooks():
+        return await handle("GET")
+
+    return app
+
+
+def closed_port_url():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    return f"http://127.0.0.1:{port}"
+
+
+def run(serve, test, **app_kwargs):
+    async def main():
+        app = mock_neynar(**app_kwargs)
+        async with serve(app) as url:
+            await test(url)
+        return app.state.hits
+    return asyncio.run(main())
+
+
+def test_get_is_retried_on_server_error(serve):
+    async def test(url):
+        async with AsyncNeynarClient("key", base_url=url, backoff=0.01) as client:
+            assert (await client.list_webhooks())["hits"] == 2
+        with NeynarClient("key", base_url=url, backoff=0.01) as client:
+            assert (await asyncio.to_thread(client.list_webhooks))["hits"] == 3
+
+    run(serve, test, failures=1)
+
+
+def test_post_is_not_retried_on_server_error(serve):
+    async def test(url):
+        async with AsyncNeynarClient("key", base_url=url, backoff=0.01) as client:
+            with pytest.raises(httpx.HTTPStatusError):
+                await client.publish_webhook("w", "https://example.com", {})
+        with NeynarClient("key", base_url=url, backoff=0.01) as client:
+            with pytest.raises(requests.HTTPError):
+                await asyncio.to_thread(client.publish_webhook, "w", "https://example.com", {})
+
+    assert run(serve, test, failures=2) == {"POST": 2}
+
+
+def test_post_is_retried_when_rate_limited(serve):
+    async def test(url):
+        async with AsyncNeynarClient("key", base_url=url, backoff=5.0) as client:
+            started = time.monotonic()
+            assert (await client.publish_webhook("w", "https://example.com", {}))["hits"] == 2
+            # Waits for Retry-After rather than the exponential backoff
+            assert time.monotonic() - started < 2.0
+        with NeynarClient("key", base_url=url, backoff=5.0) as client:
+            assert (await asyncio.to_thread(client.publish_webhook, "w", "https://example.com", {}))["hits"] == 3
+
+    assert run(serve, test, failures=1, status=429, headers={"Retry-After": "0.05"}) == {"POST": 3}
+
+
+def test_post_is_not_retried_on_timeout(serve):
+    async def test(url):
+        async with AsyncNeynarClient("key", base_url=url, timeout=0.2, backoff=0.01) as client:
+            with pytest.raises(httpx.ReadTimeout):
+                await client.publish_webhook("w", "https://example.com", {})
+        with NeynarClient("key", base_url=url, timeout=0.2, backoff=0.01) as client:
+            with pytest.raises(requests.Timeout):
+                await asyncio.to_thread(client.publish_webhook, "w", "https://example.com", {})
+
+    assert run(serve, test, failures=0, delay=0.5) == {"POST": 2}
+
+
+def test_post_is_retried_when_the_connection_fails(caplog):
+    url = closed_port_url()
+    caplog.set_level(logging.WARNING, logger="neynar-client")
+
+    async def main():
+        async with AsyncNeynarClient("key", base_url=url, max_retries=2, backoff=0.01) as client:
+            with pytest.raises(httpx.ConnectError):
+                await client.publish_webhook("w", "https://example.com", {})
+    asyncio.run(main())
+
+    with NeynarClient("key", base_url=url, max_retries=2, backoff=0.01) as client:
+        with pytest.raises(requests.ConnectionError):
+            client.publish_webhook("w", "https://example.com", {})
+
+    assert sum("retrying" in record.message for record in caplog.records) == 4
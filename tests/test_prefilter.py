@@ -0,0 +1,23 @@
+from prefilter import CastPrefilter
+
+TOKEN_ADDRESSES = {
+    'USDC': '0x3c499c542cEF5E3811e1192ce70d8cC03d5c3359',
+    'WETH': '0x7ceB23fD6bC0adD59E62ac25578270cFf1b9f619',
+}
+
+
+def test_watchlist_only_cast_is_forwarded():
+    prefilter = CastPrefilter(TOKEN_ADDRESSES, watchlist=['Hyperliquid'])
+    assert prefilter.should_forward("hyperliquid just shipped their new vault design")
+    assert prefilter.score("hyperliquid just shipped their new vault design")[0] > prefilter.threshold
+
+
+def test_cast_without_trading_content_is_dropped():
+    prefilter = CastPrefilter(TOKEN_ADDRESSES, watchlist=['Hyperliquid'])
+    assert not prefilter.should_forward("good morning everyone, coffee first")
+    assert prefilter.stats() == {"forwarded": 0, "short_circuited": 1}
+
+
+def test_ticker_and_keyword_cast_is_forwarded():
+    prefilter = CastPrefilter(TOKEN_ADDRESSES)
+    assert prefilter.should_forward("buy 0.5 WETH now")
@@ -0,0 +1,144 @@
+import asyncio
+import json
+from decimal import Decimal
+
+import pytest
+
+from rpc_executor import (APPROVE_SELECTOR, EXACT_INPUT_SINGLE_SELECTOR, UNISWAP_V3_ROUTER,
+                          DirectSwapExecutor, RpcError, stub_rpc_app)
+from token_registry import TokenRegistry
+
+TOKEN_ADDRESSES = {
+    'USDC': '0x3c499c542cEF5E3811e1192ce70d8cC03d5c3359',
+    'WETH': '0x7ceB23fD6bC0adD59E62ac25578270cFf1b9f619',
+    'WBTC': '0x1BFD67037B42Cf73acF2047067bd4F2C47D9BfD6',
+}
+WALLET = '0x19E7E376E7C213B7E7e7e46cc70A5dD086DAff2A'
+
+
+def json_signer(transaction):
+    """Encode the transaction as JSON instead of signing it, so the stub node's input can be inspected"""
+    return json.dumps(transaction).encode()
+
+
+def decode(raw):
+    return json.loads(bytes.fromhex(raw[2:]))
+
+
+def run(serve, test, signer=json_signer, **app_kwargs):
+    async def main():
+        app = stub_rpc_app(**app_kwargs)
+        async with serve(app) as url:
+            executor = DirectSwapExecutor(url, TokenRegistry.load(TOKEN_ADDRESSES), WALLET, signer)
+            try:
+                await executor.warm()
+                await test(executor, app.state.rpc)
+            finally:
+                await executor.close()
+    asyncio.run(main())
+
+
+def test_concurrent_swaps_take_consecutive_nonces(serve):
+    async def test(executor, node):
+        node["nonce"] = 7
+        executor.nonces.invalidate()
+        await asyncio.gather(*(executor.swap('buy', 'WETH', Decimal('0.1'), Decimal('3000'), Decimal('30'))
+                               for _ in range(10)))
+        nonces = sorted(decode(raw)["nonce"] for raw in node["received"])
+        # One approval plus ten swaps, without gaps or reuse
+        assert nonces == list(range(7, 7 + len(node["received"])))
+        assert executor.nonces.peek() == 7 + len(node["received"])
+
+    run(serve, test)
+
+
+def test_approval_and_swap_share_one_round_trip(serve):
+    async def test(executor, node):
+        requests = node["http_requests"]
+        result = await executor.swap('buy', 'WETH', Decimal('0.5'), Decimal('3000'), Decimal('30'))
+        assert node["http_requests"] == requests + 1
+
+        approve, swap = [decode(raw) for raw in node["received"]]
+        assert approve["to"] == TOKEN_ADDRESSES['USDC']
+        assert approve["data"].startswith(APPROVE_SELECTOR + UNISWAP_V3_ROUTER.lower()[2:].rjust(64, '0'))
+        assert int(approve["data"][-64:], 16) == 500_000 * executor.approval_multiple
+        assert swap["to"] == UNISWAP_V3_ROUTER
+        assert swap["nonce"] == approve["nonce"] + 1
+        assert "approve_tx" in result and "swap_tx" in result
+
+        # The cached allowance covers the next swap, which is sent alone
+        await executor.swap('buy', 'WETH', Decimal('0.5'), Decimal('3000'), Decimal('30'))
+        assert node["http_requests"] == requests + 2
+        assert len(node["received"]) == 3
+        assert executor.stats()["approvals"] == 1
+
+    run(serve, test)
+
+
+def test_rejected_send_resyncs_nonce(serve):
+    async def test(executor, node):
+        await executor.swap('buy', 'WETH', Decimal('0.5'), Decimal('3000'), Decimal('30'))
+        node["reject_sends"] = 1
+        with pytest.raises(RpcError):
+            await executor.swap('buy', 'WETH', Decimal('0.5'), Decimal('3000'), Decimal('30'))
+        assert executor.nonces.peek() is None
+
+        await executor.swap('buy', 'WETH', Decimal('0.5'), Decimal('3000'), Decimal('30'))
+        nonces = [decode(raw)["nonce"] for raw in node["received"]]
+        assert nonces == list(range(len(nonces)))
+
+    run(serve, test)
+
+
+def test_failed_signing_does_not_leave_a_nonce_gap(serve):
+    failures = [True]
+
+    def flaky_signer(transaction):
+        if failures and transaction["to"] == UNISWAP_V3_ROUTER:
+            failures.pop()
+            raise RuntimeError("signer unavailable")
+        return json_signer(transaction)
+
+    async def test(executor, node):
+        executor.allowances['USDC'] = 10 ** 12
+        with pytest.raises(RuntimeError):
+            await executor.swap('buy', 'WETH', Decimal('0.5'), Decimal('3000'), Decimal('30'))
+        await executor.swap('buy', 'WETH', Decimal('0.5'), Decimal('3000'), Decimal('30'))
+        assert [decode(raw)["nonce"] for raw in node["received"]] == [0]
+
+    run(serve, test, signer=flaky_signer)
+
+
+def test_exact_input_single_calldata(serve):
+    async def test(executor, node):
+        executor.allowances['WETH'] = 10 ** 30
+        result = await executor.swap('sell', 'WETH', Decimal('1'), Decimal('2000'), Decimal('30'),
+                                     slippage=Decimal('0.01'))
+        data = decode(node["received"][0])["data"]
+        assert data.startswith(EXACT_INPUT_SINGLE_SELECTOR)
+        words = [data[10 + i * 64:10 + (i + 1) * 64] for i in range((len(data) - 10) // 64)]
+        assert len(words) == 7
+        assert int(words[0], 16) == int(TOKEN_ADDRESSES['WETH'], 16)   # tokenIn
+        assert int(words[1], 16) == int(TOKEN_ADDRESSES['USDC'], 16)   # tokenOut
+        assert int(words[2], 16) == 500                                # fee
+        assert int(words[3], 16) == int(WALLET, 16)                    # recipient
+        assert int(words[4], 16) == 5 * 10 ** 14 == result["amount_in"]  # 1 USDC of WETH at 2000
+        assert int(words[5], 16) == 990_000 == result["min_out"]        # 1% slippage
+        assert int(words[6], 16) == 0                                  # sqrtPriceLimitX96
+
+        eth_abi = pytest.importorskip("eth_abi")
+        assert bytes.fromhex(data[10:]) == eth_abi.encode(
+            ['(address,address,uint24,address,uint256,uint256,uint160)'],
+            [(TOKEN_ADDRESSES['WETH'], TOKEN_ADDRESSES['USDC'], 500, WALLET, 5 * 10 ** 14, 990_000, 0)])
+
+    run(serve, test)
+
+
+def test_selectors_match_signatures():
+    eth_utils = pytest.importorskip("eth_utils")
+    signatures = {
+        APPROVE_SELECTOR: "approve(address,uint256)",
+        EXACT_INPUT_SINGLE_SELECTOR: "exactInputSingle((address,address,uint24,address,uint256,uint256,uint160))",
+    }
+    for selector, signature in signatures.items():
+        assert selector == "0x" + eth_utils.keccak(text=signature)[:4].hex()
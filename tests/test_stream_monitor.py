@@ -0,0 +1,43 @@
+import asyncio
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'farcaster_monitor'))
+
+from stream_monitor import CastStreamMonitor, FidState
+
+
+class FakeClient:
+    def __init__(self):
+        self.casts = []
+
+    async def fetch_user_casts(self, fid, limit=25, cursor=None):
+        return {"casts": list(self.casts)}
+
+
+def test_first_cast_of_an_empty_account_is_emitted():
+    async def main():
+        client = FakeClient()
+        monitor = CastStreamMonitor(client, [])
+        state = FidState(1, 5.0)
+        assert await monitor._fetch_new_casts(state) == []
+        # Still empty on the next poll, which must not count as the first one again
+        assert await monitor._fetch_new_casts(state) == []
+        client.casts = [{"hash": "0x1"}]
+        assert await monitor._fetch_new_casts(state) == [{"hash": "0x1"}]
+        assert await monitor._fetch_new_casts(state) == []
+
+    asyncio.run(main())
+
+
+def test_existing_casts_are_skipped_on_the_first_poll():
+    async def main():
+        client = FakeClient()
+        client.casts = [{"hash": "0x1"}]
+        monitor = CastStreamMonitor(client, [])
+        state = FidState(1, 5.0)
+        assert await monitor._fetch_new_casts(state) == []
+        client.casts = [{"hash": "0x2"}, {"hash": "0x1"}]
+        assert await monitor._fetch_new_casts(state) == [{"hash": "0x2"}]
+
+    asyncio.run(main())
@@ -0,0 +1,46 @@
+import re
+
+from subscription_compiler import compile_subscription, matches, normalize_subscription, plan_sync, text_pattern
+
+
+def cast(text, fid=1):
+    return {"type": "cast.created", "data": {"text": text, "author": {"fid": fid}}}
+
+
+def test_text_pattern_matches_whole_words_case_insensitively():
+    pattern = re.compile(text_pattern(["WETH", "buy"], cashtags=False))
+    assert pattern.search("Time to BUY some weth")
+    assert pattern.search("weth.")
+    assert not pattern.search("buyer of wethx")
+    assert text_pattern([], cashtags=False) is None
+
+
+def test_text_pattern_lets_cashtags_through():
+    pattern = re.compile(text_pattern(["weth"]))
+    assert pattern.search("aping into $DEGEN")
+    assert not pattern.search("no tickers here")
+
+
+def test_matches_applies_author_and_text_filters():
+    subscription = compile_subscription([1, 2], ["weth"], cashtags=False)
+    assert matches(subscription, cast("buying WETH", fid=2))
+    assert not matches(subscription, cast("buying WETH", fid=3))
+    assert not matches(subscription, cast("gm", fid=1))
+    assert not matches(subscription, {"type": "reaction.created", "data": {}})
+    # Neynar returns the filters nested under "filters"
+    assert matches({"filters": subscription}, cast("weth", fid=1))
+
+
+def test_plan_sync_creates_updates_and_prunes():
+    desired = {"name": "bot", "url": "https://a/webhook", "subscription": compile_subscription([1], ["weth"])}
+    assert plan_sync(desired, []).create == desired
+
+    current = {"id": "w1", "name": "bot", "url": "https://a/webhook",
+               "subscription": {"cast.created": {"author_fids": [1]}}}
+    duplicate = {"id": "w2", "name": "old", "url": "https://a/webhook", "subscription": {}}
+    plan = plan_sync(desired, [current, duplicate], prune=True)
+    assert plan.create is None and plan.update["id"] == "w1"
+    assert plan.delete == [duplicate]
+
+    unchanged = {**current, "subscription": normalize_subscription({"filters": desired["subscription"]})}
+    assert plan_sync(desired, [unchanged, duplicate]).empty
@@ -0,0 +1,44 @@
+import asyncio
+from decimal import Decimal
+
+import pytest
+
+from intent_parser import QUOTE_SYMBOL, TradeIntent
+from trade_coalescer import TradeCoalescer
+
+
+def intent(side, amount):
+    return TradeIntent(side=side, token="WETH", token_address="0x0", amount=Decimal(amount), unit=QUOTE_SYMBOL)
+
+
+def test_intents_in_one_window_are_netted():
+    executed = []
+
+    async def execute(trade):
+        executed.append(trade)
+        return "ok"
+
+    async def main():
+        coalescer = TradeCoalescer(execute, trade_limit=Decimal(100), window=0.05)
+        return await asyncio.gather(coalescer.submit(intent("buy", 30)), coalescer.submit(intent("sell", 10)))
+
+    first, second = asyncio.run(main())
+    assert first is second and first.net == 20 and first.result == "ok"
+    assert [(t.side, t.amount) for t in executed] == [("buy", Decimal(20))]
+
+
+def test_waiters_fail_when_the_window_is_cancelled():
+    async def execute(trade):
+        await asyncio.sleep(10)
+
+    async def main():
+        coalescer = TradeCoalescer(execute, trade_limit=Decimal(100), window=0.01)
+        waiter = asyncio.create_task(coalescer.submit(intent("buy", 10)))
+        await asyncio.sleep(0.05)
+        for task in list(coalescer._tasks):
+            task.cancel()
+        with pytest.raises(RuntimeError):
+            await asyncio.wait_for(waiter, 1.0)
+        assert not coalescer._windows
+
+    asyncio.run(main())
@@ -0,0 +1,57 @@
+import asyncio
+import json
+import os
+
+from trade_policy import PolicyEngine
+
+
+def write_policy(path, limit, mtime):
+    path.write_text(json.dumps({"defaults": {"trade_limit_usdc": limit}, "authors": [{"fid": 3}]}))
+    os.utime(path, (mtime, mtime))
+
+
+def test_invalid_file_keeps_previous_policies(tmp_path):
+    path = tmp_path / "policy.json"
+    write_policy(path, 1.0, mtime=1000)
+    engine = PolicyEngine(str(path))
+
+    path.write_text('{"defaults": ')
+    os.utime(path, (1001, 1001))
+    assert not engine.reload_if_changed()
+    assert engine.check(engine.policy_for(3, None), "WETH").limit == 1.0
+
+    write_policy(path, 0.5, mtime=1002)
+    assert engine.reload_if_changed()
+    assert engine.check(engine.policy_for(3, None), "WETH").limit == 0.5
+
+
+def test_removed_file_keeps_previous_policies(tmp_path):
+    path = tmp_path / "policy.json"
+    write_policy(path, 1.0, mtime=1000)
+    engine = PolicyEngine(str(path))
+    path.unlink()
+    assert not engine.reload_if_changed()
+    assert engine.policy_for(3, None) is not None
+
+
+def test_watcher_survives_failing_reload_callback(tmp_path):
+    path = tmp_path / "policy.json"
+    write_policy(path, 1.0, mtime=1000)
+    engine = PolicyEngine(str(path))
+    calls = []
+
+    async def on_reload():
+        calls.append(engine.reloads)
+        raise RuntimeError("resolver down")
+
+    async def main():
+        engine.watch(interval=0.01, on_reload=on_reload)
+        write_policy(path, 0.5, mtime=1001)
+        await asyncio.sleep(0.05)
+        write_policy(path, 0.25, mtime=1002)
+        await asyncio.sleep(0.05)
+        assert not engine._watcher.done()
+        await engine.stop()
+
+    asyncio.run(main())
+    assert calls == [1, 2]
@@ -0,0 +1,30 @@
+import json
+
+import pytest
+
+from intent_parser import IntentParser
+from trading_prompts import MIN_CACHEABLE_TOKENS, build_analyst_instruction, estimate_tokens
+
+TOKEN_ADDRESSES = {
+    'USDC': '0x3c499c542cEF5E3811e1192ce70d8cC03d5c3359',
+    'USDC.e': 'DO_NOT_USE',
+    'WETH': '0x7ceB23fD6bC0adD59E62ac25578270cFf1b9f619',
+    'WBTC': '0x1BFD67037B42Cf73acF2047067bd4F2C47D9BfD6',
+    'WMATIC': '0x0d500B1d8E8eF31E21C99d1Db9A6444d3ADf1270',
+}
+
+
+def test_analyst_prompt_is_long_enough_to_cache():
+    # The estimate is rough, keep a margin over the provider's minimum
+    assert estimate_tokens(build_analyst_instruction(TOKEN_ADDRESSES, 1.0)) >= 1.2 * MIN_CACHEABLE_TOKENS
+
+
+@pytest.mark.parametrize("limit", [1.0, 0.25])
+def test_analyst_examples_are_valid_decisions(limit):
+    parser = IntentParser(TOKEN_ADDRESSES)
+    instruction = build_analyst_instruction(TOKEN_ADDRESSES, limit)
+    answers = [line for line in instruction.splitlines() if line.startswith('{"trade"')][2:]
+    assert len(answers) > 20
+    for answer in answers:
+        decision = parser.parse_decision(answer, limit)
+        assert (decision.intent is not None) == json.loads(answer)["trade"]
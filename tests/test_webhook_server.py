@@ -0,0 +1,36 @@
+import asyncio
+
+import httpx
+
+from cast_event import sample_payload
+from webhook_server import WebhookServer
+
+
+def post(server, body):
+    async def main():
+        transport = httpx.ASGITransport(app=server.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await client.post("/webhook", content=body)
+    return asyncio.run(main())
+
+
+def test_malformed_body_is_rejected_as_invalid_json():
+    response = post(WebhookServer(), b'{"type": ')
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Invalid JSON"
+
+
+def test_internal_error_is_a_server_error():
+    server = WebhookServer()
+
+    async def process_event(data):
+        raise ValueError("broken handler")
+
+    server.process_event = process_event
+    response = post(server, sample_payload())
+    assert response.status_code == 500
+
+
+def test_valid_event_is_received():
+    response = post(WebhookServer(), sample_payload())
+    assert response.status_code == 200
@@ -0,0 +1,179 @@
+import json
+import logging
+import os
+from dataclasses import asdict, dataclass
+from decimal import Decimal
+from typing import Dict, List, Optional
+
+import requests
+
+logger = logging.getLogger("token-registry")
+
+# Address placeholder for tokens that must never be traded
+PROHIBITED_ADDRESS = 'DO_NOT_USE'
+
+# Decimals of the tokens we trade, used until verified on-chain
+KNOWN_DECIMALS = {
+    'USDC': 6,
+    'WBTC': 8,
+    'WETH': 18,
+    'MATIC': 18,
+    'WMATIC': 18,
+}
+
+# ERC-20 decimals() selector
+DECIMALS_SELECTOR = '0x313ce567'
+
+
+@dataclass
+class TokenInfo:
+    """Token metadata record"""
+
+    symbol: str
+    address: str
+    decimals: Optional[int]
+    chain: str
+
+    def to_base_units(self, amount: Decimal) -> int:
+        """Convert a token amount to its smallest unit (wei)"""
+        return int(Decimal(amount) * (10 ** self.decimals))
+
+    def from_base_units(self, amount: int) -> Decimal:
+        """Convert an amount in the smallest unit (wei) to tokens"""
+        return Decimal(amount) / (10 ** self.decimals)
+
+
+class TokenRegistry:
+    """In-process token metadata, loaded once and cached on disk"""
+
+    def __init__(self, tokens: List[TokenInfo], cache_path: Optional[str] = None):
+        """Initialize the registry
+
+        Args:
+            tokens: Token records
+            cache_path: Optional JSON file the registry is persisted to
+        """
+        self.cache_path = cache_path
+        self._by_symbol: Dict[str, TokenInfo] = {}
+        self._by_address: Dict[str, TokenInfo] = {}
+        for token in tokens:
+            self._add(token)
+
+    def _add(self, token: TokenInfo):
+        self._by_symbol[token.symbol] = token
+        self._by_address[token.address.lower()] = token
+
+    @classmethod
+    def load(cls, token_addresses: Dict[str, str], cache_path: Optional[str] = None,
+             chain: str = 'polygon') -> "TokenRegistry":
+        """Build the registry from TOKEN_ADDRESSES and the local cache file
+
+        Prohibited tokens (address DO_NOT_USE) are left out. Cached decimals
+        take precedence over the built-in defaults, but a token whose address
+        changed in TOKEN_ADDRESSES is not taken from the cache.
+
+        Args:
+            token_addresses: Mapping of token symbol to address
+            cache_path: JSON cache file written by ``save``
+            chain: Chain the addresses belong to
+
+        Returns:
+            TokenRegistry instance
+        """
+        cached: Dict[str, dict] = {}
+        if cache_path and os.path.exists(cache_path):
+            try:
+                with open(cache_path) as f:
+                    cached = {record['symbol']: record for record in json.load(f)}
+            except (OSError, ValueError, KeyError) as e:
+                logger.warning(f"Ignoring unreadable token cache {cache_path}: {str(e)}")
+
+        tokens = []
+        for symbol, address in token_addresses.items():
+            if address == PROHIBITED_ADDRESS:
+                continue
+            record = cached.get(symbol)
+            if record and record.get('address', '').lower() == address.lower() and record.get('chain') == chain:
+                decimals = record.get('decimals')
+            else:
+                decimals = KNOWN_DECIMALS.get(symbol)
+            tokens.append(TokenInfo(symbol=symbol, address=address, decimals=decimals, chain=chain))
+
+        return cls(tokens, cache_path)
+
+    def save(self):
+        """Persist the registry to the cache file"""
+        if not self.cache_path:
+            return
+        tmp_path = f"{self.cache_path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump([asdict(token) for token in self._by_symbol.values()], f, indent=2)
+        os.replace(tmp_path, self.cache_path)
+
+    def warm(self, rpc_url: str, timeout: float = 10.0) -> int:
+        """Verify decimals of all tokens with a single batched JSON-RPC request
+
+        Args:
+            rpc_url: JSON-RPC endpoint of the registry's chain
+            timeout: Request timeout in seconds
+
+        Returns:
+            Number of tokens whose decimals were updated
+        """
+        tokens = list(self._by_symbol.values())
+        batch = [
+            {
+                "jsonrpc": "2.0",
+                "id": i,
+                "method": "eth_call",
+                "params": [{"to": token.address, "data": DECIMALS_SELECTOR}, "latest"],
+            }
+            for i, token in enumerate(tokens)
+        ]
+        response = requests.post(rpc_url, json=batch, timeout=timeout)
+        response.raise_for_status()
+
+        updated = 0
+        for item in response.json():
+            result = item.get('result')
+            if not result or result == '0x':
+                continue
+            token = tokens[item['id']]
+            decimals = int(result, 16)
+            if token.decimals != decimals:
+                if token.decimals is not None:
+                    logger.warning(f"{token.symbol} decimals changed from {token.decimals} to {decimals}")
+                token.decimals = decimals
+                updated += 1
+
+        self.save()
+        return updated
+
+    def get(self, symbol: str) -> Optional[TokenInfo]:
+        """Look up a token by symbol"""
+        return self._by_symbol.get(symbol)
+
+    def by_address(self, address: str) -> Optional[TokenInfo]:
+        """Look up a token by address"""
+        return self._by_address.get(address.lower())
+
+    def decimals(self, symbol_or_address: str) -> Optional[int]:
+        """Return the decimals of a token given its symbol or address"""
+        token = self.get(symbol_or_address) or self.by_address(symbol_or_address)
+        return token.decimals if token else None
+
+    def __iter__(self):
+        return iter(self._by_symbol.values())
+
+    def describe(self) -> str:
+        """Describe the tokens for the agent's context, one line per token"""
+        lines = []
+        for token in self._by_symbol.values():
+            if token.decimals is None:
+                lines.append(f"  * {token.symbol}: {token.address} (decimals unknown, verify with get_token_decimals)")
+            else:
+                lines.append(
+                    f"  * {token.symbol}: {token.address}, {token.decimals} decimals "
+                    f"(1 {token.symbol} = {10 ** token.decimals:,} wei)"
+                )
+        return "\n".join(lines)
@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+import asyncio
+import time
+from dataclasses import dataclass, field
+from decimal import Decimal
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set
+
+from intent_parser import QUOTE_SYMBOL, TradeIntent
+
+
+@dataclass
+class CoalescedTrade:
+    """Net result of the trade intents collected for one token in one window"""
+
+    token: str
+    intents: List[TradeIntent]
+    sources: List[Optional[str]]
+    bought: Decimal = Decimal(0)    # Total of the buy intents, in QUOTE_SYMBOL
+    sold: Decimal = Decimal(0)      # Total of the sell intents, in QUOTE_SYMBOL
+    clamped: bool = False
+    trade: Optional[TradeIntent] = None  # Consolidated trade, None if the intents netted out
+    result: Any = None                   # Result of executing the consolidated trade
+
+    @property
+    def net(self) -> Decimal:
+        return self.bought - self.sold
+
+
+@dataclass
+class _Window:
+    intents: List[TradeIntent] = field(default_factory=list)
+    sources: List[Optional[str]] = field(default_factory=list)
+    result: Optional[asyncio.Future] = None
+
+
+class TradeCoalescer:
+    """Groups trade intents per token over a short window into one trade
+
+    The first intent for a token opens a window; intents for the same token
+    arriving before it closes are added to it. When the window closes, buys
+    and sells are netted, the net size is capped at the trade limit and a
+    single consolidated trade is executed. Every caller waiting on the window
+    gets the same result.
+
+    Only intents sized in QUOTE_SYMBOL are accepted, since netting and the
+    limit check need a common unit.
+    """
+
+    def __init__(
+        self,
+        execute: Callable[[TradeIntent], Awaitable[Any]],
+        trade_limit: Decimal,
+        window: float = 1.0,
+    ):
+        """Initialize the coalescer
+
+        Args:
+            execute: Coroutine executing a consolidated trade intent
+            trade_limit: Maximum size of a consolidated trade, in QUOTE_SYMBOL
+            window: Seconds intents for a token are collected, 0 executes each intent on its own
+        """
+        self.execute = execute
+        self.trade_limit = Decimal(str(trade_limit))
+        self.window = window
+        self._windows: Dict[str, _Window] = {}
+        # Strong references to the window closers, the loop only keeps weak ones
+        self._tasks: Set[asyncio.Task] = set()
+
+        # Counters
+        self.intents = 0
+        self.closed_intents = 0
+        self.trades = 0
+        self.netted_out = 0
+        self.clamped = 0
+
+    async def submit(self, intent: TradeIntent, source: Optional[str] = None) -> CoalescedTrade:
+        """Add an intent to its token's window and wait for the window's trade
+
+        Args:
+            intent: Trade intent sized in QUOTE_SYMBOL
+            source: Optional identifier of the originating cast, for reporting
+
+        Returns:
+            CoalescedTrade with the consolidated trade and its execution result
+        """
+        if intent.quote_amount is None:
+            raise ValueError(f"Only intents sized in {QUOTE_SYMBOL} can be coalesced")
+
+        self.intents += 1
+        window = self._windows.get(intent.token)
+        if window is None:
+            window = self._windows[intent.token] = _Window(result=asyncio.get_running_loop().create_future())
+            # Callers may have been cancelled, so retrieve the exception here
+            window.result.add_done_callback(lambda f: f.cancelled() or f.exception())
+            task = asyncio.create_task(self._close_after(intent.token, window))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+        window.intents.append(intent)
+        window.sources.append(source)
+        # Shield, so one cancelled caller does not cancel the trade for the others
+        return await asyncio.shield(window.result)
+
+    async def _close_after(self, token: str, window: _Window):
+        """Close a window once its time is up and execute the net trade"""
+        try:
+            if self.window > 0:
+                await asyncio.sleep(self.window)
+            del self._windows[token]
+            self.closed_intents += len(window.intents)
+            window.result.set_result(await self._execute_window(token, window))
+        except Exception as e:
+            window.result.set_exception(e)
+        finally:
+            # Cancelled (e.g. at shutdown): fail the callers waiting on the shielded result
+            if not window.result.done():
+                if self._windows.get(token) is window:
+                    del self._windows[token]
+                window.result.set_exception(RuntimeError(f"Trade window for {token} was cancelled"))
+
+    async def _execute_window(self, token: str, window: _Window) -> CoalescedTrade:
+        """Net the intents of a window and execute the consolidated trade"""
+        coalesced = CoalescedTrade(token=token, intents=window.intents, sources=window.sources)
+        for intent in window.intents:
+            if intent.side == 'buy':
+                coalesced.bought += intent.quote_amount
+            else:
+                coalesced.sold += intent.quote_amount
+
+        net = coalesced.net
+        if net == 0:
+            self.netted_out += 1
+            return coalesced
+
+        amount = abs(net)
+        if amount > self.trade_limit:
+            amount = self.trade_limit
+            coalesced.clamped = True
+            self.clamped += 1
+
+        first = window.intents[0]
+        coalesced.trade = TradeIntent(
+            side='buy' if net > 0 else 'sell',
+            token=token,
+            token_address=first.token_address,
+            amount=amount,
+            unit=QUOTE_SYMBOL,
+        )
+        self.trades += 1
+        coalesced.result = await self.execute(coalesced.trade)
+        return coalesced
+
+    def stats(self) -> Dict[str, Any]:
+        """Return intent, trade and saved-swap counters"""
+        return {
+            "intents": self.intents,
+            "trades": self.trades,
+            "swaps_saved": self.closed_intents - self.trades,
+            "netted_out": self.netted_out,
+            "clamped": self.clamped,
+            "open_windows": len(self._windows),
+        }
+
+
+async def run_demo():
+    """Coalesce a burst of casts and show the swaps saved"""
+    from intent_parser import IntentParser
+
+    token_addresses = {
+        'USDC': '0x3c499c542cEF5E3811e1192ce70d8cC03d5c3359',
+        'WETH': '0x7ceB23fD6bC0adD59E62ac25578270cFf1b9f619',
+        'WBTC': '0x1BFD67037B42Cf73acF2047067bd4F2C47D9BfD6',
+    }
+    parser = IntentParser(token_addresses)
+    executed = []
+
+    async def execute(trade: TradeIntent):
+        await asyncio.sleep(0.05)
+        executed.append(trade)
+        return f"swapped {trade.side} {trade.amount} {trade.unit} of {trade.token}"
+
+    coalescer = TradeCoalescer(execute, trade_limit=Decimal('1.0'), window=0.2)
+    burst = [
+        "buy 0.5 USDC of WETH", "buy $0.25 worth of ETH", "sell WETH for 0.25 USDC",
+        "buy 0.5 USDC of WETH", "buy 0.4 USDC of WBTC", "sell WBTC for 0.4 USDC",
+    ]
+    started = time.perf_counter()
+    results = await asyncio.gather(*(coalescer.submit(parser.parse(text), source=text) for text in burst))
+    elapsed = time.perf_counter() - started
+
+    for text, coalesced in zip(burst, results):
+        trade = coalesced.trade
+        print(f"{text:<28} -> {'netted out' if trade is None else f'{trade.side} {trade.amount} {trade.unit} of {trade.token}'}")
+    print(f"\n{len(burst)} intents -> {len(executed)} swap(s) in {elapsed * 1000:.0f} ms")
+    print(coalescer.stats())
+
+
+if __name__ == "__main__":
+    asyncio.run(run_demo())
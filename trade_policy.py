@@ -0,0 +1,354 @@
+#!/usr/bin/env python3
+import asyncio
+import json
+import logging
+import os
+import time
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, FrozenSet, Iterable, List, Optional
+
+logger = logging.getLogger("trade-policy")
+
+
+@dataclass(frozen=True)
+class AuthorPolicy:
+    """Trading limits of one authorized author"""
+
+    fid: Optional[int]
+    username: Optional[str]
+    trade_limit: float                      # Maximum size of one trade, in USDC
+    allowed_tokens: Optional[FrozenSet[str]]  # None allows every token
+    cooldown: float                         # Seconds between two trades
+    window: float                           # Length of the rolling spend window, in seconds
+    window_limit: Optional[float]           # Maximum spend within the window, in USDC
+
+    @property
+    def key(self) -> str:
+        """Key the author's spend state is kept under"""
+        return f"fid:{self.fid}" if self.fid is not None else f"user:{self.username}"
+
+
+@dataclass(frozen=True)
+class PolicyDecision:
+    """Outcome of a policy check"""
+
+    allowed: bool
+    reason: str = ""
+    limit: float = 0.0  # Largest trade currently allowed, in USDC
+
+
+class SpendWindow:
+    """Rolling sum of spend over a time window, kept in a ring of buckets
+
+    The window is split into ``buckets`` slots of equal width. Adding and
+    reading only touch the slots that expired since the last call, so both
+    are O(buckets) at worst and O(1) in steady state.
+    """
+
+    def __init__(self, window: float, buckets: int = 60):
+        self.window = window
+        self.width = window / buckets
+        self._amounts = [0.0] * buckets
+        self._head = 0  # Index of the newest bucket, counted in widths since the epoch
+        self._total = 0.0
+
+    def _advance(self, now: float):
+        head = int(now // self.width)
+        expired = min(head - self._head, len(self._amounts))
+        for i in range(1, expired + 1):
+            slot = (self._head + i) % len(self._amounts)
+            self._total -= self._amounts[slot]
+            self._amounts[slot] = 0.0
+        if head > self._head:
+            self._head = head
+
+    def total(self, now: float) -> float:
+        """Return the spend within the window ending at ``now``"""
+        self._advance(now)
+        return max(self._total, 0.0)
+
+    def add(self, amount: float, now: float):
+        """Record spend at ``now``"""
+        self._advance(now)
+        self._amounts[self._head % len(self._amounts)] += amount
+        self._total += amount
+
+
+class _SpendState:
+    __slots__ = ("last_trade", "window")
+
+    def __init__(self, window: float):
+        self.last_trade = float("-inf")
+        self.window = SpendWindow(window)
+
+
+class PolicyEngine:
+    """Per-author authorization and risk checks, loaded from a JSON file
+
+    Policies are indexed by FID, and by username for authors whose FID is
+    not known yet, so every check is a dictionary lookup. Spend state is
+    kept apart from the policies and survives reloads, so editing the file
+    does not reset anyone's cooldown or window.
+
+    File format::
+
+        {
+          "defaults": {"trade_limit_usdc": 1.0, "allowed_tokens": ["WETH", "WBTC"],
+                       "cooldown_seconds": 30, "window_seconds": 3600, "window_limit_usdc": 5.0},
+          "authors": [
+            {"username": "0xhardman"},
+            {"fid": 3, "trade_limit_usdc": 0.5, "allowed_tokens": ["WETH"]}
+          ]
+        }
+
+    Author entries override the defaults. ``allowed_tokens`` may be omitted
+    (or null) to allow every token and ``window_limit_usdc`` to disable the
+    spend window.
+    """
+
+    def __init__(self, path: Optional[str] = None, defaults: Optional[Dict[str, Any]] = None,
+                 authors: Iterable[Dict[str, Any]] = ()):
+        """Initialize the engine
+
+        Args:
+            path: JSON policy file; when missing, ``defaults`` and ``authors`` are used
+            defaults: Default policy fields, in the file's format
+            authors: Author entries, in the file's format
+        """
+        self.path = path
+        self._fallback = {"defaults": defaults or {}, "authors": list(authors)}
+        self._by_fid: Dict[int, AuthorPolicy] = {}
+        self._by_username: Dict[str, AuthorPolicy] = {}
+        self._resolved: Dict[str, int] = {}
+        self._spend: Dict[str, _SpendState] = {}
+        self._mtime: Optional[float] = None
+        self._watcher: Optional[asyncio.Task] = None
+
+        # Counters
+        self.allowed = 0
+        self.denied: Dict[str, int] = {}
+        self.reloads = 0
+
+        self.load()
+
+    def load(self):
+        """Build the policy table from the file, or from the constructor's entries"""
+        config = self._fallback
+        if self.path and os.path.exists(self.path):
+            self._mtime = os.path.getmtime(self.path)
+            with open(self.path) as f:
+                config = json.load(f)
+
+        defaults = config.get("defaults", {})
+        by_fid, by_username = {}, {}
+        for entry in config.get("authors", []):
+            policy = self._build(entry, defaults)
+            if policy.fid is not None:
+                by_fid[policy.fid] = policy
+            elif policy.username in self._resolved:
+                by_fid[self._resolved[policy.username]] = self._with_fid(policy, self._resolved[policy.username])
+            else:
+                by_username[policy.username] = policy
+
+        # Swap the whole table at once, checks never see a half-loaded state
+        self._by_fid, self._by_username = by_fid, by_username
+        logger.info("Loaded %d author policies", len(by_fid) + len(by_username))
+
+    @staticmethod
+    def _build(entry: Dict[str, Any], defaults: Dict[str, Any]) -> AuthorPolicy:
+        fields = {**defaults, **entry}
+        if fields.get("fid") is None and not fields.get("username"):
+            raise ValueError(f"Policy entry needs a fid or username: {entry}")
+        tokens = fields.get("allowed_tokens")
+        return AuthorPolicy(
+            fid=int(fields["fid"]) if fields.get("fid") is not None else None,
+            username=fields.get("username"),
+            trade_limit=float(fields.get("trade_limit_usdc", 1.0)),
+            allowed_tokens=frozenset(tokens) if tokens is not None else None,
+            cooldown=float(fields.get("cooldown_seconds", 0)),
+            window=float(fields.get("window_seconds", 3600)),
+            window_limit=(float(fields["window_limit_usdc"])
+                          if fields.get("window_limit_usdc") is not None else None),
+        )
+
+    @staticmethod
+    def _with_fid(policy: AuthorPolicy, fid: int) -> AuthorPolicy:
+        return AuthorPolicy(fid, policy.username, policy.trade_limit, policy.allowed_tokens,
+                            policy.cooldown, policy.window, policy.window_limit)
+
+    def reload_if_changed(self) -> bool:
+        """Reload the file if it was modified since the last load
+
+        Returns:
+            True if the policies were reloaded
+        """
+        if not self.path:
+            return False
+        try:
+            mtime = os.path.getmtime(self.path)
+        except OSError:
+            # Missing, e.g. while an editor replaces it
+            return False
+        if mtime == self._mtime:
+            return False
+        try:
+            self.load()
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            # Keep enforcing the last valid policies until the file changes again
+            logger.error("Unreadable policy file %s, keeping previous policies: %s", self.path, e)
+            self._mtime = mtime
+            return False
+        self.reloads += 1
+        return True
+
+    async def _watch(self, interval: float, on_reload: Optional[Callable[[], Awaitable[None]]]):
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                if self.reload_if_changed() and on_reload:
+                    await on_reload()
+            except Exception as e:
+                logger.error("Policy reload failed, watching on: %s", e)
+
+    def watch(self, interval: float = 2.0, on_reload: Optional[Callable[[], Awaitable[None]]] = None):
+        """Start reloading the file in the background whenever it changes
+
+        Args:
+            interval: Seconds between modification time checks
+            on_reload: Optional coroutine function called after each reload
+        """
+        self._watcher = asyncio.create_task(self._watch(interval, on_reload))
+
+    async def stop(self):
+        """Stop the background reload task"""
+        if self._watcher:
+            self._watcher.cancel()
+            await asyncio.gather(self._watcher, return_exceptions=True)
+            self._watcher = None
+
+    def unresolved_usernames(self) -> List[str]:
+        """Return usernames whose policies are not indexed by FID yet"""
+        return list(self._by_username)
+
+    def bind(self, username: str, fid: int):
+        """Index a username's policy by its FID, e.g. once resolved through Neynar
+
+        Args:
+            username: Author username
+            fid: Author FID
+        """
+        self._resolved[username] = fid
+        policy = self._by_username.pop(username, None)
+        if policy is not None and fid not in self._by_fid:
+            self._by_fid[fid] = self._with_fid(policy, fid)
+
+    def policy_for(self, fid: Optional[int], username: Optional[str]) -> Optional[AuthorPolicy]:
+        """Return the policy of an author, None if they are not authorized
+
+        Authors are looked up by FID; usernames are only matched for entries
+        whose FID could not be resolved.
+        """
+        if fid is not None:
+            policy = self._by_fid.get(fid)
+            if policy is not None:
+                return policy
+        return self._by_username.get(username) if username else None
+
+    def _state(self, policy: AuthorPolicy) -> _SpendState:
+        state = self._spend.get(policy.key)
+        if state is None or state.window.window != policy.window:
+            state = self._spend[policy.key] = _SpendState(policy.window)
+        return state
+
+    def _deny(self, reason: str) -> PolicyDecision:
+        self.denied[reason] = self.denied.get(reason, 0) + 1
+        return PolicyDecision(False, reason)
+
+    def check(self, policy: AuthorPolicy, token: Optional[str] = None, amount: Optional[float] = None,
+              now: Optional[float] = None) -> PolicyDecision:
+        """Check a trade against an author's policy without recording it
+
+        Args:
+            policy: Author policy, see ``policy_for``
+            token: Token symbol, if known
+            amount: Trade size in USDC, if known
+            now: Current time, defaults to time.time()
+
+        Returns:
+            PolicyDecision; ``limit`` is the largest trade still allowed
+        """
+        now = time.time() if now is None else now
+        if token is not None and policy.allowed_tokens is not None and token not in policy.allowed_tokens:
+            return self._deny("token_not_allowed")
+
+        state = self._spend.get(policy.key)
+        if state is not None and now - state.last_trade < policy.cooldown:
+            return self._deny("cooldown")
+
+        limit = policy.trade_limit
+        if policy.window_limit is not None:
+            spent = state.window.total(now) if state is not None else 0.0
+            limit = min(limit, policy.window_limit - spent)
+            if limit <= 0:
+                return self._deny("window_limit")
+
+        if amount is not None and amount > limit:
+            return self._deny("trade_limit" if amount > policy.trade_limit else "window_limit")
+        return PolicyDecision(True, limit=limit)
+
+    def acquire(self, policy: AuthorPolicy, token: Optional[str] = None, amount: Optional[float] = None,
+                now: Optional[float] = None) -> PolicyDecision:
+        """Check a trade and, if allowed, record it against the cooldown and spend window
+
+        When the amount is not known yet (the agent decides it), the largest
+        allowed trade is recorded, so the window can never be overspent.
+
+        Args:
+            policy: Author policy, see ``policy_for``
+            token: Token symbol, if known
+            amount: Trade size in USDC, if known
+            now: Current time, defaults to time.time()
+
+        Returns:
+            PolicyDecision
+        """
+        now = time.time() if now is None else now
+        decision = self.check(policy, token, amount, now)
+        if decision.allowed:
+            state = self._state(policy)
+            state.last_trade = now
+            if policy.window_limit is not None:
+                state.window.add(amount if amount is not None else decision.limit, now)
+            self.allowed += 1
+        return decision
+
+    def stats(self) -> Dict[str, Any]:
+        """Return policy table size and decision counters"""
+        return {
+            "authors": len(self._by_fid) + len(self._by_username),
+            "unresolved": len(self._by_username),
+            "allowed": self.allowed,
+            "denied": dict(self.denied),
+            "reloads": self.reloads,
+        }
+
+
+def measure_checks(authors: int = 10000, checks: int = 200000):
+    """Time policy checks against a large author table"""
+    engine = PolicyEngine(
+        defaults={"trade_limit_usdc": 1.0, "allowed_tokens": ["WETH", "WBTC"],
+                  "cooldown_seconds": 0, "window_seconds": 3600, "window_limit_usdc": 1e9},
+        authors=[{"fid": fid} for fid in range(authors)],
+    )
+    now = time.time()
+    started = time.perf_counter()
+    for i in range(checks):
+        policy = engine.policy_for(i % authors, None)
+        engine.acquire(policy, "WETH", 0.5, now + i * 0.001)
+    elapsed = time.perf_counter() - started
+    print(f"{checks} checks over {authors} authors: {elapsed / checks * 1e6:.2f} us/check")
+    print(engine.stats())
+
+
+if __name__ == "__main__":
+    measure_checks()
@@ -0,0 +1,397 @@
+#!/usr/bin/env python3
+import argparse
+import asyncio
+import hashlib
+import json
+import math
+import re
+import time
+from typing import Any, Dict, List, Optional
+
+from token_registry import TokenRegistry
+
+# Hex strings (addresses, hashes) tokenize at roughly 2 characters per token
+_HEX = re.compile(r"0x[0-9a-fA-F]+")
+
+
+# Smallest prompt prefix Anthropic caches for Sonnet/Opus models (Haiku needs 2048)
+MIN_CACHEABLE_TOKENS = 1024
+
+# Worked decisions shown to the analysts, as (cast, answer) pairs. Amounts are
+# fractions of the trade limit, so the answers stay valid for any limit. They
+# keep the analysts' format and judgment consistent, and make the system prompt
+# long enough for the provider to cache it.
+ANALYST_EXAMPLES = [
+    ("buy 0.5 usdc of weth", {"trade": True, "side": "buy", "token": "WETH", "amount": 0.5,
+                              "reason": "explicit buy of WETH sized in USDC"}),
+    ("Aping into some ETH here, half a dollar", {"trade": True, "side": "buy", "token": "WETH", "amount": 0.5,
+                                                 "reason": "explicit buy of ETH, traded as WETH"}),
+    ("sell $0.3 of my btc", {"trade": True, "side": "sell", "token": "WBTC", "amount": 0.3,
+                             "reason": "explicit sell of BTC, traded as WBTC"}),
+    ("Rotating 20% of the limit from USDC into MATIC", {"trade": True, "side": "buy", "token": "WMATIC",
+                                                        "amount": 0.2, "reason": "explicit buy of MATIC, "
+                                                        "traded as WMATIC, sized as a share of the limit"}),
+    ("buy 50 usdc of weth", {"trade": True, "side": "buy", "token": "WETH", "amount": 1.0,
+                             "reason": "explicit buy, clamped to the trade limit"}),
+    ("take profit on WBTC, dump a quarter of the limit", {"trade": True, "side": "sell", "token": "WBTC",
+                                                          "amount": 0.25, "reason": "explicit sell of WBTC"}),
+    ("ETH looks strong here", {"trade": False, "reason": "market opinion, no trade instruction"}),
+    ("Should I buy more BTC?", {"trade": False, "reason": "question, not an instruction"}),
+    ("I sold all my ETH last year, biggest mistake", {"trade": False,
+                                                      "reason": "describes a past trade, no instruction"}),
+    ("do not sell your WBTC yet", {"trade": False, "reason": "negated instruction, nothing to execute"}),
+    ("gm, coffee first then charts", {"trade": False, "reason": "no trading content"}),
+    ("buy some USDC.e, it is cheaper", {"trade": False, "reason": "USDC.e is prohibited"}),
+    ("buy 0.5 usdc of PEPE", {"trade": False, "reason": "PEPE is not a tradable token"}),
+    ("SEC approval of the ETH ETF is delayed again", {"trade": False,
+                                                      "reason": "news headline without an instruction"}),
+    ("if BTC breaks 100k I will buy more", {"trade": False, "reason": "conditional on a future event"}),
+    ("Going long ETH with a small bag, 0.4 usdc", {"trade": True, "side": "buy", "token": "WETH", "amount": 0.4,
+                                                   "reason": "explicit long of ETH sized in USDC"}),
+    ("cut my MATIC position, sell 0.1 USDC worth", {"trade": True, "side": "sell", "token": "WMATIC",
+                                                     "amount": 0.1, "reason": "explicit sell of MATIC"}),
+    ("swap 0.2 usdc to wbtc", {"trade": True, "side": "buy", "token": "WBTC", "amount": 0.2,
+                               "reason": "explicit swap from USDC into WBTC"}),
+    ("lol who is still buying ETH at these prices", {"trade": False, "reason": "sarcasm, no instruction"}),
+    ("Reminder: never trade more than you can lose", {"trade": False, "reason": "general advice"}),
+    ("Buying the dip: 0.15 USDC of WBTC, ETH next week", {"trade": True, "side": "buy", "token": "WBTC",
+                                                          "amount": 0.15, "reason": "explicit buy of WBTC "
+                                                          "now, the ETH buy is only planned"}),
+    ("POL looks weak, selling 0.35 usdc worth now", {"trade": True, "side": "sell", "token": "WMATIC",
+                                                     "amount": 0.35, "reason": "explicit sell of POL, "
+                                                     "traded as WMATIC"}),
+    ("just bought 0.2 usdc of weth, you should too", {"trade": False,
+                                                      "reason": "reports the author's own past trade"}),
+    ("Hack confirmed on a major bridge, ETH dumping", {"trade": False,
+                                                       "reason": "news and price action, no instruction"}),
+    ("buy weth", {"trade": True, "side": "buy", "token": "WETH", "amount": 1.0,
+                  "reason": "explicit buy without a size, uses the trade limit"}),
+    ("buy 0.001 WBTC", {"trade": True, "side": "buy", "token": "WBTC", "amount": 1.0,
+                        "reason": "size given in WBTC, converted with the cached price and clamped to the limit"}),
+    ("sell everything, going to cash", {"trade": False, "reason": "no single token or size to trade"}),
+    ("Not financial advice but MATIC to the moon", {"trade": False, "reason": "opinion, no instruction"}),
+]
+
+
+def _render_examples(trade_limit: float) -> str:
+    lines = []
+    for cast, answer in ANALYST_EXAMPLES:
+        answer = dict(answer)
+        if "amount" in answer:
+            answer = {"trade": True, "side": answer["side"], "token": answer["token"],
+                      "amount_usdc": round(answer.pop("amount") * trade_limit, 6), "reason": answer["reason"]}
+        lines.append(f"Cast from @example: {cast!r}\n{json.dumps(answer)}")
+    return "\n\n".join(lines)
+
+
+def build_instruction(token_addresses: Dict[str, str], registry: TokenRegistry, trade_limit: float) -> str:
+    """Build the trading agent's system prompt
+
+    The agent only executes trades already decided by the parser or the
+    signal analysts, e.g. sells without a cached price. Each message is one
+    trade instruction, the static rules and decimals live here so the
+    provider caches them together with the tool definitions.
+
+    Args:
+        token_addresses: TOKEN_ADDRESSES of the chain
+        registry: Token registry with verified decimals
+        trade_limit: Maximum trade size in USDC
+
+    Returns:
+        System prompt
+    """
+    return f"""You execute cryptocurrency trades on Polygon for a Farcaster signal trader.
+
+Each user message is one trade that has already been decided, e.g. "Sell WETH (address: ...) worth
+0.5 USDC for native USDC". Execute exactly that trade with the swap tools:
+1. Do not decide whether to trade, do not change the side, token or size, and never exceed {trade_limit} USDC
+2. Convert amounts given in USDC to token amounts with the cached token price
+3. Report the transaction hash, or the error if the swap failed; do not retry a failed swap
+
+Tokens:
+- STRICTLY PROHIBITED from using USDC.e for any transactions, always use only native USDC ({token_addresses['USDC']})
+- For BTC use WBTC ({token_addresses['WBTC']}), for ETH use WETH ({token_addresses['WETH']}),
+  for MATIC use WMATIC ({token_addresses['WMATIC']})
+- PAY ATTENTION TO TOKEN DECIMALS when calculating amounts. These decimals are verified at startup,
+  use them directly instead of calling get_token_decimals:
+{registry.describe()}
+
+Market data:
+- Gas prices and token prices in USDC are cached locally and refreshed in the background. Use the
+  market_data tools (get_gas_price, get_token_price, get_market_snapshot) instead of querying them on-chain
+
+Always ensure trading safety and follow all restrictions."""
+
+
+def build_analyst_instruction(token_addresses: Dict[str, str], trade_limit: float) -> str:
+    """Build the system prompt of the signal analysts
+
+    The analysts only decide; they have no tools and answer with one JSON
+    object, so their requests can be hedged across models and cancelled
+    at any point without side effects. Without tool definitions the system
+    prompt is the whole cached prefix, so it carries worked examples and
+    stays above MIN_CACHEABLE_TOKENS.
+
+    Args:
+        token_addresses: TOKEN_ADDRESSES of the chain
+        trade_limit: Maximum trade size in USDC
+
+    Returns:
+        System prompt
+    """
+    tokens = ", ".join(symbol for symbol, address in token_addresses.items()
+                       if symbol != "USDC" and address != "DO_NOT_USE")
+    return f"""You analyze Farcaster messages for a cryptocurrency trader on Polygon. You never execute trades yourself.
+
+Each user message is a Farcaster cast from an authorized user. Decide whether it explicitly instructs
+a trade (buy/sell a token against USDC) and answer with exactly one JSON object and nothing else:
+
+{{"trade": true, "side": "buy", "token": "WETH", "amount_usdc": 0.5, "reason": "short explanation"}}
+{{"trade": false, "reason": "short explanation"}}
+
+Rules:
+- Conservative: only answer "trade": true when the cast explicitly asks for a trade now. Opinions,
+  questions, news, past trades, negated or conditional instructions and sarcasm are not trades
+- "side" is "buy" (USDC into the token, also "long", "ape", "swap into") or "sell" (the token into USDC,
+  also "dump", "take profit", "cut")
+- "token" is one of: {tokens}. For BTC use WBTC, for ETH use WETH, for MATIC or POL use WMATIC.
+  Any other token, including USDC.e, is not tradable: answer "trade": false
+- "amount_usdc" is the trade size in USDC, never above {trade_limit} USDC or the cast's limit if one is
+  given; clamp larger amounts to the limit. Sizes given as a share of the limit are relative to it
+- Casts may come with cached market data; use it to convert amounts given in tokens to USDC
+- "reason" is one short sentence, no line breaks
+
+Examples (trade limit {trade_limit} USDC):
+
+{_render_examples(trade_limit)}"""
+
+
+def build_event_prompt(text: str, username: Optional[str] = None, market: Optional[str] = None,
+                       trade_limit: Optional[float] = None) -> str:
+    """Build the per-cast message sent after the cached system prompt
+
+    Args:
+        text: Cast text
+        username: Author username
+        market: Optional cached market data summary, see ``MarketDataCache.describe``
+        trade_limit: Optional largest trade the author may make with this cast, in USDC
+
+    Returns:
+        User message
+    """
+    prompt = f"Cast from @{username}: {text!r}" if username else f"Cast: {text!r}"
+    if trade_limit is not None:
+        prompt += f"\nLimit for this cast: {trade_limit:g} USDC"
+    if market:
+        prompt += f"\n\nCached market data:\n{market}"
+    return prompt
+
+
+def estimate_tokens(text: str) -> int:
+    """Roughly estimate the number of LLM tokens in a text
+
+    About 4 characters per token for prose and 2 for hex strings, which is
+    close enough to compare prompt layouts without a tokenizer.
+    """
+    hex_chars = sum(len(match) for match in _HEX.findall(text))
+    return math.ceil(hex_chars / 2 + (len(text) - hex_chars) / 4)
+
+
+class StubProvider:
+    """Replays a provider's prompt caching and latency profile
+
+    Time to first token is modelled as a base latency plus a prefill cost
+    per uncached input token and a much smaller one per cached token. A
+    request marks its cacheable prefix (tools and system prompt); the first
+    request with a prefix writes the cache and later ones within ``cache_ttl``
+    read it, as with Anthropic prompt caching. Prefixes shorter than
+    ``min_cacheable_tokens`` are never cached.
+
+    The default profile is a rough Claude 3.7 Sonnet figure; load a profile
+    recorded from real responses with ``from_profile``.
+    """
+
+    def __init__(
+        self,
+        base_latency: float = 0.35,
+        prefill_per_token: float = 0.00012,
+        cached_prefill_per_token: float = 0.00001,
+        min_cacheable_tokens: int = 1024,
+        cache_ttl: float = 300.0,
+        sleep: bool = False,
+    ):
+        """Initialize the provider
+
+        Args:
+            base_latency: Seconds to first token for an empty prompt
+            prefill_per_token: Seconds added per uncached input token
+            cached_prefill_per_token: Seconds added per input token read from the cache
+            min_cacheable_tokens: Smallest prefix the provider caches
+            cache_ttl: Seconds a cached prefix stays valid after its last use
+            sleep: Actually wait for the modelled time to first token
+        """
+        self.base_latency = base_latency
+        self.prefill_per_token = prefill_per_token
+        self.cached_prefill_per_token = cached_prefill_per_token
+        self.min_cacheable_tokens = min_cacheable_tokens
+        self.cache_ttl = cache_ttl
+        self.sleep = sleep
+        self._cache: Dict[str, float] = {}
+
+    @classmethod
+    def from_profile(cls, path: str, **kwargs) -> "StubProvider":
+        """Create a provider from a JSON profile with the constructor's arguments"""
+        with open(path) as f:
+            profile = json.load(f)
+        profile.update(kwargs)
+        return cls(**profile)
+
+    async def complete(self, prefix: str, message: str, cache: bool = True) -> Dict[str, Any]:
+        """Simulate one request
+
+        Args:
+            prefix: Tool definitions and system prompt
+            message: Conversation sent after the prefix
+            cache: Whether the request marks the prefix as cacheable
+
+        Returns:
+            Usage in the shape of Anthropic's response: input_tokens,
+            cache_creation_input_tokens, cache_read_input_tokens, plus ttft
+        """
+        prefix_tokens = estimate_tokens(prefix)
+        message_tokens = estimate_tokens(message)
+        usage = {"input_tokens": prefix_tokens + message_tokens,
+                 "cache_creation_input_tokens": 0, "cache_read_input_tokens": 0}
+
+        now = time.monotonic()
+        cached_tokens = 0
+        if cache and prefix_tokens >= self.min_cacheable_tokens:
+            key = hashlib.sha256(prefix.encode()).hexdigest()
+            if now - self._cache.get(key, -math.inf) <= self.cache_ttl:
+                cached_tokens = prefix_tokens
+                usage["cache_read_input_tokens"] = prefix_tokens
+            else:
+                usage["cache_creation_input_tokens"] = prefix_tokens
+            usage["input_tokens"] = message_tokens
+            self._cache[key] = now
+
+        ttft = (self.base_latency
+                + (prefix_tokens + message_tokens - cached_tokens) * self.prefill_per_token
+                + cached_tokens * self.cached_prefill_per_token)
+        if self.sleep:
+            await asyncio.sleep(ttft)
+        usage["ttft"] = ttft
+        return usage
+
+
+# System prompt of the trading agent before the static rules moved into it
+# (verbatim from the original quantar.py, including its hardcoded limit)
+LEGACY_INSTRUCTION = """You are an AI assistant specialized in analyzing Farcaster messages and executing cryptocurrency trades.
+
+When you receive a Farcaster message, you need to:
+1. Analyze the message content to determine if it contains trading intent (buy/sell a token)
+2. If trading intent is detected, identify the trade type (buy/sell), token symbol, and amount (if specified)
+3. Execute the appropriate trading operation, ensuring the trade amount does not exceed 1 USDC
+4. Return the trade execution results
+
+Trading style:
+- Conservative: Do not execute trades unless explicitly instructed
+- Precise: Execute trades strictly according to the message instructions
+- Safe: Always adhere to trading limits
+- Transparent: Clearly report all trading details
+
+Important notes:
+- STRICTLY PROHIBITED from using USDC.e for any transactions, always use only native USDC (0x3c499c542cEF5E3811e1192ce70d8cC03d5c3359)
+- Use token addresses defined in the TOKEN_ADDRESSES dictionary
+- Only messages from authorized users will trigger trades
+- PAY ATTENTION TO TOKEN DECIMALS when calculating amounts:
+  * USDC: 6 decimals (1 USDC = 1,000,000 wei)
+  * WBTC: 8 decimals (1 WBTC = 100,000,000 wei)
+  * WETH/WMATIC: 18 decimals (1 token = 1,000,000,000,000,000,000 wei)
+- Always use get_token_decimals tool to verify token decimals before calculating amounts
+
+Always ensure trading safety and follow all restrictions."""
+
+
+def _legacy_event_prompt(text: str, token_addresses: Dict[str, str], trade_limit: float) -> str:
+    """Per-cast prompt of the original quantar.py, sent with LEGACY_INSTRUCTION"""
+    return f"""Analyze this Farcaster message and decide whether to execute a trade (limit {trade_limit} USDC): '{text}'
+
+Notes:
+1. STRICTLY PROHIBITED from using USDC.e for any transactions, always use only native USDC (address: {token_addresses['USDC']})
+2. If trading BTC is needed, use WBTC (address: {token_addresses['WBTC']})
+3. If trading ETH is needed, use WETH (address: {token_addresses['WETH']})
+4. If trading MATIC is needed, use WMATIC (address: {token_addresses['WMATIC']})
+5. PAY ATTENTION TO TOKEN DECIMALS when calculating amounts:
+   - USDC uses 6 decimals (1 USDC = 1,000,000 wei)
+   - WBTC uses 8 decimals (1 WBTC = 100,000,000 wei)
+   - WETH uses 18 decimals (1 WETH = 1,000,000,000,000,000,000 wei)
+   - WMATIC uses 18 decimals (1 WMATIC = 1,000,000,000,000,000,000 wei)
+6. Always use get_token_decimals tool to verify token decimals before calculating amounts
+"""
+
+
+async def measure_prompts(casts: List[str], provider: StubProvider, tool_tokens: int = 1500):
+    """Compare input tokens and time to first token per cast, before and after compaction
+
+    "Before" replays the original system prompt and per-cast prompt, sent to
+    the trading agent with its tool definitions. "After" is the live layout:
+    the tool-less signal analysts with their cached system prompt and a
+    per-cast message. All figures are estimates: token counts come from
+    ``estimate_tokens``, not the provider's tokenizer, and time to first
+    token from the StubProvider latency profile, so use them to compare the
+    two layouts rather than as measured numbers.
+
+    Args:
+        casts: Cast texts to replay
+        provider: Stub provider
+        tool_tokens: Approximate size of the MCP tool definitions sent with every trading agent request
+    """
+    token_addresses = {
+        'USDC': '0x3c499c542cEF5E3811e1192ce70d8cC03d5c3359',
+        'WBTC': '0x1BFD67037B42Cf73acF2047067bd4F2C47D9BfD6',
+        'WETH': '0x7ceB23fD6bC0adD59E62ac25578270cFf1b9f619',
+        'WMATIC': '0x0d500B1d8E8eF31E21C99d1Db9A6444d3ADf1270',
+    }
+    trade_limit = 1.0
+    analyst_instruction = build_analyst_instruction(token_addresses, trade_limit)
+    # Stand-in for the tool schemas, which precede the system prompt
+    tools = "x" * (tool_tokens * 4)
+    market = "- Gas price: 31.20 gwei (3s old)\n- WETH: 3102.4 USDC (8s old)"
+
+    layouts = {
+        "before (rules per cast, no caching)": lambda text: (
+            tools + LEGACY_INSTRUCTION, _legacy_event_prompt(text, token_addresses, trade_limit), False),
+        "after (analysts, cached system prompt)": lambda text: (
+            analyst_instruction, build_event_prompt(text, "alice", market, trade_limit), True),
+    }
+    print("Estimated with the stub provider and approximate token counts, not provider-reported usage")
+    print(f"Analyst system prompt: ~{estimate_tokens(analyst_instruction)} tokens "
+          f"(cached from {provider.min_cacheable_tokens})")
+    for name, build in layouts.items():
+        provider._cache.clear()
+        usages = []
+        for text in casts:
+            prefix, message, cache = build(text)
+            usages.append(await provider.complete(prefix, message, cache=cache))
+        steady = usages[1:] or usages
+        print(f"{name}:")
+        print(f"  est. uncached input tokens/cast {sum(u['input_tokens'] for u in steady) / len(steady):7.0f}"
+              f"   cache reads/cast {sum(u['cache_read_input_tokens'] for u in steady) / len(steady):6.0f}"
+              f"   first cast cache write {usages[0]['cache_creation_input_tokens']}")
+        print(f"  est. ttft avg {sum(u['ttft'] for u in steady) / len(steady) * 1000:7.1f} ms"
+              f"   first cast {usages[0]['ttft'] * 1000:7.1f} ms")
+
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(description="Measure per-cast prompt tokens and time to first token")
+    arg_parser.add_argument("--profile", help="JSON latency profile recorded from the provider")
+    arg_parser.add_argument("--casts", type=int, default=50, help="Number of casts to replay")
+    arg_parser.add_argument("--tool-tokens", type=int, default=1500, help="Approximate size of the tool definitions")
+    args = arg_parser.parse_args()
+
+    provider = StubProvider.from_profile(args.profile) if args.profile else StubProvider()
+    texts = ["ETH looks strong here, adding a small position",
+             "Sell some $MATIC, the unlock is coming",
+             "rotating a bit of USDC into WBTC ahead of the halving"]
+    asyncio.run(measure_prompts([texts[i % len(texts)] for i in range(args.casts)], provider, args.tool_tokens))
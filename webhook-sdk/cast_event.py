@@ -0,0 +1,218 @@
+import json
+import time
+import tracemalloc
+from typing import Any, Dict, List, Optional, Union
+
+try:
+    import orjson
+except ImportError:  # orjson is optional, the stdlib parser is used without it
+    orjson = None
+
+# JSON backend used to decode webhook bodies
+JSON_BACKEND = "orjson" if orjson else "json"
+
+CAST_CREATED = "cast.created"
+
+
+def loads(body: Union[bytes, str]) -> Any:
+    """Decode JSON with orjson when installed, else the stdlib parser
+
+    Both raise a ``json.JSONDecodeError`` subclass on invalid input.
+    """
+    if orjson:
+        return orjson.loads(body)
+    return json.loads(body)
+
+
+class CastEvent:
+    """A cast.created webhook event, reduced to the fields the pipeline uses
+
+    Only a handful of strings are kept per event, instead of the full nested
+    payload Neynar delivers (author profile, reactions, channel, ...).
+    """
+
+    __slots__ = ("created_at", "hash", "fid", "username", "display_name",
+                 "text", "timestamp", "embeds", "parent_hash")
+
+    type = CAST_CREATED
+
+    def __init__(
+        self,
+        hash: Optional[str],
+        fid: Optional[int],
+        username: str,
+        text: str,
+        created_at: Optional[int] = None,
+        timestamp: Optional[str] = None,
+        embeds: Optional[List[str]] = None,
+        display_name: str = "unknown",
+        parent_hash: Optional[str] = None,
+    ):
+        self.hash = hash
+        self.fid = fid
+        self.username = username
+        self.text = text
+        self.created_at = created_at
+        self.timestamp = timestamp
+        self.embeds = embeds or []
+        self.display_name = display_name
+        self.parent_hash = parent_hash
+
+    @classmethod
+    def from_payload(cls, payload: Dict[str, Any]) -> "CastEvent":
+        """Build the event from a decoded cast.created payload
+
+        Args:
+            payload: Webhook payload, ``{"type": ..., "created_at": ..., "data": cast}``
+        """
+        cast = payload.get("data") or {}
+        author = cast.get("author") or {}
+        fid = author.get("fid")
+        return cls(
+            hash=cast.get("hash"),
+            fid=int(fid) if fid is not None else None,
+            username=author.get("username", "unknown"),
+            display_name=author.get("display_name", "unknown"),
+            text=cast.get("text", ""),
+            created_at=payload.get("created_at"),
+            timestamp=cast.get("timestamp"),
+            embeds=[embed["url"] for embed in cast.get("embeds") or () if embed.get("url")],
+            parent_hash=cast.get("parent_hash"),
+        )
+
+    @property
+    def key(self) -> str:
+        """Deduplication key, matching ``dedup_store.event_key`` for dict payloads"""
+        if self.hash:
+            return f"{CAST_CREATED}:{self.hash}"
+        return f"{CAST_CREATED}_{self.created_at}"
+
+    @property
+    def is_reply(self) -> bool:
+        return bool(self.parent_hash)
+
+    def to_payload(self) -> Dict[str, Any]:
+        """Rebuild a (reduced) webhook payload, e.g. to forward the event as JSON"""
+        return {
+            "type": CAST_CREATED,
+            "created_at": self.created_at,
+            "data": {
+                "hash": self.hash,
+                "parent_hash": self.parent_hash,
+                "author": {"fid": self.fid, "username": self.username, "display_name": self.display_name},
+                "text": self.text,
+                "timestamp": self.timestamp,
+                "embeds": [{"url": url} for url in self.embeds],
+            },
+        }
+
+    def __repr__(self) -> str:
+        return f"CastEvent(hash={self.hash!r}, fid={self.fid!r}, username={self.username!r}, text={self.text!r})"
+
+
+# Events passed through the pipeline: casts are typed, other event types stay dicts
+WebhookEvent = Union[CastEvent, Dict[str, Any]]
+
+
+def as_event(payload: Any) -> Any:
+    """Convert a decoded cast.created payload to a CastEvent, leaving other events as they are"""
+    if isinstance(payload, dict) and payload.get("type") == CAST_CREATED and isinstance(payload.get("data"), dict):
+        return CastEvent.from_payload(payload)
+    return payload
+
+
+def decode_event(body: Union[bytes, str]) -> Any:
+    """Decode a webhook request body into a CastEvent or, for other events, a dict"""
+    return as_event(loads(body))
+
+
+def to_payload(event: WebhookEvent) -> Dict[str, Any]:
+    """Return a JSON-serializable payload for an event"""
+    return event.to_payload() if isinstance(event, CastEvent) else event
+
+
+def sample_payload(index: int = 0) -> bytes:
+    """A cast.created body shaped like the ones Neynar delivers, for benchmarks"""
+    return json.dumps({
+        "created_at": 1712150400 + index,
+        "type": CAST_CREATED,
+        "data": {
+            "object": "cast",
+            "hash": f"0x{index:040x}",
+            "thread_hash": f"0x{index:040x}",
+            "parent_hash": None,
+            "parent_url": None,
+            "root_parent_url": None,
+            "parent_author": {"fid": None},
+            "author": {
+                "object": "user",
+                "fid": 12345,
+                "custody_address": "0x" + "1f" * 20,
+                "username": "0xhardman",
+                "display_name": "hardman",
+                "pfp_url": "https://i.imgur.com/abcdefg.jpg",
+                "profile": {"bio": {"text": "building onchain trading agents " * 4, "mentioned_profiles": []}},
+                "follower_count": 1234,
+                "following_count": 321,
+                "verifications": ["0x" + "2e" * 20],
+                "verified_addresses": {"eth_addresses": ["0x" + "2e" * 20], "sol_addresses": []},
+                "active_status": "active",
+                "power_badge": False,
+            },
+            "text": "buy 0.5 USDC of WETH",
+            "timestamp": "2025-04-03T12:00:00.000Z",
+            "embeds": [{"url": "https://example.com/chart.png"}],
+            "reactions": {"likes_count": 3, "recasts_count": 1, "likes": [], "recasts": []},
+            "replies": {"count": 0},
+            "channel": None,
+            "mentioned_profiles": [],
+        },
+    }).encode()
+
+
+def run_benchmark(events: int = 20000):
+    """Compare decode time and retained memory per event of the dict and CastEvent paths"""
+    bodies = [sample_payload(i) for i in range(events)]
+
+    def dict_path(body: bytes):
+        # What the pipeline did before: full json.loads, then .get() chains at each stage
+        event = json.loads(body)
+        if event.get("type") == CAST_CREATED:
+            cast = event.get("data", {})
+            author = cast.get("author", {})
+            author.get("fid"), author.get("username"), cast.get("text", ""), cast.get("parent_hash")
+        return event
+
+    def typed_path(body: bytes):
+        event = decode_event(body)
+        event.fid, event.username, event.text, event.is_reply
+        return event
+
+    def stdlib_typed_path(body: bytes):
+        event = as_event(json.loads(body))
+        event.fid, event.username, event.text, event.is_reply
+        return event
+
+    paths = [("dict (json.loads + .get chains)", dict_path),
+             ("CastEvent (json)", stdlib_typed_path)]
+    if orjson:
+        paths.append(("CastEvent (orjson)", typed_path))
+
+    print(f"{events} events, {len(bodies[0])} bytes each\n")
+    for label, decode in paths:
+        started = time.perf_counter()
+        for body in bodies:
+            decode(body)
+        elapsed = time.perf_counter() - started
+
+        # Memory held while events wait in the queue
+        tracemalloc.start()
+        retained = [decode(body) for body in bodies]
+        size, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        del retained
+        print(f"{label:<34} {elapsed / events * 1e6:7.2f} us/event  {size / events:8.0f} bytes/event retained")
+
+
+if __name__ == "__main__":
+    run_benchmark()
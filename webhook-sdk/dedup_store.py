@@ -0,0 +1,294 @@
+import asyncio
+import logging
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+from cast_event import CastEvent
+
+logger = logging.getLogger("webhook-server.dedup")
+
+
+def event_key(event_data: Dict[str, Any]) -> str:
+    """Build the deduplication key for a Neynar webhook event
+
+    Casts are keyed on their hash, which is stable across Neynar retries and
+    unique per cast. Other events fall back to an explicit event id, and only
+    as a last resort to the type and creation timestamp.
+
+    Args:
+        event_data: Event data received from Neynar, or a decoded CastEvent
+
+    Returns:
+        Deduplication key
+    """
+    if isinstance(event_data, CastEvent):
+        return event_data.key
+    event_type = event_data.get('type')
+    data = event_data.get('data') or {}
+    if isinstance(data, dict):
+        if data.get('hash'):
+            return f"{event_type}:{data['hash']}"
+        if data.get('id'):
+            return f"{event_type}:{data['id']}"
+    if event_data.get('id'):
+        return f"{event_type}:{event_data['id']}"
+    return f"{event_type}_{event_data.get('created_at')}"
+
+
+class DedupStore:
+    """Bounded set of recently seen event keys with LRU and TTL eviction
+
+    Lookups are served from an in-memory ordered dictionary. When a path is
+    given, keys are also written to SQLite so dedup state survives restarts,
+    and keys evicted from memory by the size cap are looked up there, so a
+    replay within the TTL is still caught. Writes are buffered and committed
+    in batches by a background task (see ``start``), which also prunes
+    expired keys from the database.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 100_000,
+        ttl: float = 86400.0,
+        path: Optional[str] = None,
+        commit_interval: float = 0.5,
+        prune_interval: float = 300.0,
+    ):
+        """Initialize the dedup store
+
+        Args:
+            max_entries: Maximum number of keys kept in memory
+            ttl: Seconds after which a key is forgotten
+            path: Optional SQLite database file for persistent dedup state
+            commit_interval: Seconds between commits of buffered writes
+            prune_interval: Seconds between removals of expired keys from the database
+        """
+        if max_entries < 1:
+            raise ValueError("max_entries must be at least 1")
+
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.path = path
+        self.commit_interval = commit_interval
+        self.prune_interval = prune_interval
+        self._entries: "OrderedDict[str, float]" = OrderedDict()
+        self._db: Optional[sqlite3.Connection] = None
+        # The connection is shared by the event loop (lookups) and the writer thread
+        self._db_lock = threading.Lock()
+        # Buffered writes, key -> seen_at, or None for a deleted key
+        self._pending: Dict[str, Optional[float]] = {}
+        self._committing: Dict[str, Optional[float]] = {}
+        # Whether the database may hold live keys that are not in memory
+        self._spilled = False
+        self._writer: Optional[asyncio.Task] = None
+        self._last_prune = time.time()
+
+        # Counters
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.db_lookups = 0
+        self.db_hits = 0
+        self.commits = 0
+
+        if path:
+            self._open(path)
+
+    def _open(self, path: str):
+        """Open the SQLite store and load unexpired keys into memory"""
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS dedup (key TEXT PRIMARY KEY, seen_at REAL NOT NULL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS dedup_seen_at ON dedup (seen_at)")
+        cutoff = time.time() - self.ttl
+        self._db.execute("DELETE FROM dedup WHERE seen_at < ?", (cutoff,))
+        self._db.commit()
+
+        rows = self._db.execute(
+            "SELECT key, seen_at FROM (SELECT key, seen_at FROM dedup ORDER BY seen_at DESC LIMIT ?) ORDER BY seen_at",
+            (self.max_entries,),
+        ).fetchall()
+        for key, seen_at in rows:
+            self._entries[key] = seen_at
+        self._spilled = len(rows) >= self.max_entries
+        logger.info("Loaded %d dedup keys from %s", len(rows), path)
+
+    async def start(self):
+        """Start committing buffered writes in the background, on the running event loop"""
+        if self._db and self._writer is None:
+            self._writer = asyncio.create_task(self._write_loop())
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: str) -> bool:
+        seen_at = self._lookup(key)
+        return seen_at is not None and time.time() - seen_at <= self.ttl
+
+    def _lookup(self, key: str) -> Optional[float]:
+        """Return when a key was seen, from memory, buffered writes or the database"""
+        seen_at = self._entries.get(key)
+        if seen_at is not None or not self._spilled:
+            return seen_at
+        for writes in (self._pending, self._committing):
+            if key in writes:
+                return writes[key]
+        self.db_lookups += 1
+        with self._db_lock:
+            row = self._db.execute("SELECT seen_at FROM dedup WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        self.db_hits += 1
+        return row[0]
+
+    def add(self, key: str) -> bool:
+        """Record a key unless it was already seen
+
+        Args:
+            key: Event key, see ``event_key``
+
+        Returns:
+            True if the key is new, False if it is a duplicate
+        """
+        now = time.time()
+        seen_at = self._lookup(key)
+        if seen_at is not None:
+            if now - seen_at <= self.ttl:
+                self.hits += 1
+                # Keys found in the database are recent again
+                self._entries[key] = seen_at
+                self._entries.move_to_end(key)
+                self._evict(now)
+                return False
+            # Expired entry, treat as new
+            if self._entries.pop(key, None) is not None:
+                self.evictions += 1
+
+        self.misses += 1
+        self._entries[key] = now
+        if self._db:
+            self._write(key, now)
+        self._evict(now)
+        return True
+
+    def discard(self, key: str):
+        """Forget a key, e.g. when the event could not be queued
+
+        Args:
+            key: Event key
+        """
+        self._entries.pop(key, None)
+        if self._db:
+            self._write(key, None)
+
+    def _write(self, key: str, seen_at: Optional[float]):
+        self._pending[key] = seen_at
+        if self._writer is None:
+            # Not started, e.g. used outside an event loop: write through
+            self.flush()
+
+    def _evict(self, now: float):
+        """Drop expired keys and the least recently used keys over the memory cap"""
+        cutoff = now - self.ttl
+        while self._entries:
+            key, seen_at = next(iter(self._entries.items()))
+            if seen_at >= cutoff and len(self._entries) <= self.max_entries:
+                break
+            if seen_at >= cutoff and self._db:
+                # Still live in the database, so misses must look there from now on
+                self._spilled = True
+            del self._entries[key]
+            self.evictions += 1
+
+    def flush(self):
+        """Commit buffered writes now"""
+        if not self._db:
+            return
+        self._committing, self._pending = self._pending, {}
+        try:
+            self._commit(self._committing)
+        finally:
+            self._committing = {}
+
+    def _commit(self, writes: Dict[str, Optional[float]]):
+        if not writes:
+            return
+        with self._db_lock:
+            self._db.executemany("INSERT OR REPLACE INTO dedup (key, seen_at) VALUES (?, ?)",
+                                 [(key, seen_at) for key, seen_at in writes.items() if seen_at is not None])
+            self._db.executemany("DELETE FROM dedup WHERE key = ?",
+                                 [(key,) for key, seen_at in writes.items() if seen_at is None])
+            self._db.commit()
+        self.commits += 1
+
+    def _prune_db(self, cutoff: float):
+        with self._db_lock:
+            self._db.execute("DELETE FROM dedup WHERE seen_at < ?", (cutoff,))
+            self._db.commit()
+
+    async def _write_loop(self):
+        """Commit buffered writes every ``commit_interval`` and prune every ``prune_interval``"""
+        while True:
+            await asyncio.sleep(self.commit_interval)
+            try:
+                if self._pending:
+                    self._committing, self._pending = self._pending, {}
+                    try:
+                        await asyncio.to_thread(self._commit, self._committing)
+                    finally:
+                        self._committing = {}
+                now = time.time()
+                if now - self._last_prune >= self.prune_interval:
+                    self._last_prune = now
+                    self._evict(now)
+                    await asyncio.to_thread(self._prune_db, now - self.ttl)
+            except sqlite3.Error as e:
+                logger.error("Failed to write dedup keys: %s", e)
+
+    def prune(self):
+        """Remove expired keys from memory and from the SQLite store"""
+        now = time.time()
+        self._evict(now)
+        if self._db:
+            self._prune_db(now - self.ttl)
+            self._last_prune = now
+
+    async def stop(self):
+        """Stop the background writer and commit what it left buffered"""
+        if self._writer:
+            self._writer.cancel()
+            await asyncio.gather(self._writer, return_exceptions=True)
+            self._writer = None
+        self.flush()
+
+    def close(self):
+        """Commit buffered writes and close the SQLite store"""
+        if self._db:
+            self.flush()
+            self._db.close()
+            self._db = None
+
+    def stats(self) -> Dict[str, Any]:
+        """Return dedup statistics
+
+        Returns:
+            Dictionary with size, hit, miss and eviction counters
+        """
+        return {
+            "size": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl": self.ttl,
+            "persistent": self.path is not None,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "db_lookups": self.db_lookups,
+            "db_hits": self.db_hits,
+            "commits": self.commits,
+        }
@@ -0,0 +1,192 @@
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional, Tuple
+
+from tracing import Trace, summarize, use_trace
+
+logger = logging.getLogger("webhook-server.queue")
+
+# Backpressure policies applied when the queue is full
+DROP_OLDEST = "drop_oldest"
+REJECT = "reject"
+BLOCK = "block"
+OVERFLOW_POLICIES = (DROP_OLDEST, REJECT, BLOCK)
+
+
+class EventQueue:
+    """Bounded queue feeding webhook events to a pool of worker tasks"""
+
+    def __init__(
+        self,
+        callback: Callable[[Dict[str, Any]], Awaitable[None]],
+        maxsize: int = 1000,
+        workers: int = 4,
+        overflow_policy: str = DROP_OLDEST,
+        block_timeout: float = 5.0,
+        sample_size: int = 1000,
+        on_state: Optional[Callable[[Any, str], None]] = None,
+    ):
+        """Initialize the event queue
+
+        Args:
+            callback: Coroutine invoked by the workers for each event
+            maxsize: Maximum number of queued events
+            workers: Number of worker tasks invoking the callback
+            overflow_policy: What to do when full: drop_oldest, reject or block
+            block_timeout: Maximum seconds ``put`` waits under the block policy
+            sample_size: Number of recent timing samples kept for the stats
+            on_state: Optional hook called with (event, state) when a worker starts an
+                event ("started") and when it is processed, failed or dropped, but not
+                when the worker is cancelled mid-event
+        """
+        if overflow_policy not in OVERFLOW_POLICIES:
+            raise ValueError(f"Unknown overflow policy: {overflow_policy}")
+        if maxsize < 1 or workers < 1:
+            raise ValueError("maxsize and workers must be at least 1")
+
+        self.callback = callback
+        self.maxsize = maxsize
+        self.num_workers = workers
+        self.overflow_policy = overflow_policy
+        self.block_timeout = block_timeout
+        self.on_state = on_state
+
+        self._queue: Optional["asyncio.Queue[Tuple[float, Dict[str, Any], Optional[Trace]]]"] = None
+        self._workers: List[asyncio.Task] = []
+
+        # Stats
+        self._wait_times: Deque[float] = deque(maxlen=sample_size)
+        self._processing_times: Deque[float] = deque(maxlen=sample_size)
+        self.enqueued = 0
+        self.processed = 0
+        self.failed = 0
+        self.dropped = 0
+        self.rejected = 0
+        self.max_depth = 0
+
+    async def start(self):
+        """Start the worker tasks on the running event loop"""
+        self._queue = asyncio.Queue(maxsize=self.maxsize)
+        self._workers = [
+            asyncio.create_task(self._worker(i)) for i in range(self.num_workers)
+        ]
+
+    async def stop(self, drain: bool = True, timeout: Optional[float] = None):
+        """Stop the worker tasks
+
+        Args:
+            drain: Wait for queued events to be processed before stopping
+            timeout: Maximum seconds to wait for the queue to drain
+        """
+        if self._queue is None:
+            return
+        if drain:
+            try:
+                await asyncio.wait_for(self._queue.join(), timeout)
+            except asyncio.TimeoutError:
+                logger.warning("Event queue not drained, %d events left", self._queue.qsize())
+        for task in self._workers:
+            task.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+    async def put(self, event: Dict[str, Any], trace: Optional[Trace] = None) -> bool:
+        """Enqueue an event for processing
+
+        Args:
+            event: Parsed webhook event
+            trace: Optional latency trace, made current while the callback runs
+
+        Returns:
+            True if the event was queued, False if it was rejected
+        """
+        item = (time.perf_counter(), event, trace)
+
+        if self._queue.full():
+            if self.overflow_policy == REJECT:
+                self.rejected += 1
+                return False
+
+            if self.overflow_policy == DROP_OLDEST:
+                try:
+                    _, dropped_event, dropped_trace = self._queue.get_nowait()
+                    self._queue.task_done()
+                    self.dropped += 1
+                    if self.on_state:
+                        self.on_state(dropped_event, "dropped")
+                    if dropped_trace:
+                        dropped_trace.finish(status="dropped")
+                    logger.warning("Event queue full, dropped oldest event")
+                except asyncio.QueueEmpty:
+                    pass
+            else:
+                try:
+                    await asyncio.wait_for(self._queue.put(item), self.block_timeout)
+                except asyncio.TimeoutError:
+                    self.rejected += 1
+                    return False
+                self._record_enqueue()
+                return True
+
+        self._queue.put_nowait(item)
+        self._record_enqueue()
+        return True
+
+    def _record_enqueue(self):
+        self.enqueued += 1
+        self.max_depth = max(self.max_depth, self._queue.qsize())
+
+    async def _worker(self, index: int):
+        """Invoke the callback for queued events until cancelled"""
+        while True:
+            enqueued_at, event, trace = await self._queue.get()
+            started = time.perf_counter()
+            self._wait_times.append(started - enqueued_at)
+            status = "failed"
+            if trace:
+                trace.add_span("queue_wait", started - enqueued_at)
+            if self.on_state:
+                self.on_state(event, "started")
+            try:
+                with use_trace(trace):
+                    await self.callback(event)
+                self.processed += 1
+                status = "processed"
+            except asyncio.CancelledError:
+                # Stopped mid-event: the event is not finished, so it stays
+                # "started" and a journal replays it on the next start
+                status = "interrupted"
+                raise
+            except Exception as e:
+                self.failed += 1
+                logger.error("Worker %d failed to process event: %s", index, e)
+            finally:
+                self._processing_times.append(time.perf_counter() - started)
+                self._queue.task_done()
+                if self.on_state and status != "interrupted":
+                    self.on_state(event, status)
+                if trace:
+                    trace.finish(status=status)
+
+    def stats(self) -> Dict[str, Any]:
+        """Return queue statistics
+
+        Returns:
+            Dictionary with queue depth, counters, wait and processing times
+        """
+        return {
+            "depth": self._queue.qsize() if self._queue else 0,
+            "max_depth": self.max_depth,
+            "maxsize": self.maxsize,
+            "workers": self.num_workers,
+            "overflow_policy": self.overflow_policy,
+            "enqueued": self.enqueued,
+            "processed": self.processed,
+            "failed": self.failed,
+            "dropped": self.dropped,
+            "rejected": self.rejected,
+            "wait_time": summarize(self._wait_times),
+            "processing_time": summarize(self._processing_times),
+        }
@@ -0,0 +1,224 @@
+import json
+import asyncio
+import logging
+import itertools
+from typing import Any, Awaitable, Callable, Dict, Optional, Set
+
+logger = logging.getLogger("webhook-server.ipc")
+
+# Largest forwarded event accepted over the IPC socket, in bytes
+MAX_MESSAGE_SIZE = 4 * 1024 * 1024
+
+
+class IngestBridge:
+    """Receives events forwarded by ingest worker processes
+
+    Runs in the single executor process. Workers send one JSON line per event,
+    ``{"id": 1, "event": {...}, "spans": {"json_parse": 0.0001}}``, and get
+    ``{"id": 1, "ok": true}`` back once the event has been deduplicated and
+    queued, so all dedup and trading state stays in one process. The spans
+    are the worker-side stage durations, recorded with the event's trace.
+
+    Workers also query the executor's state for their ``/stats`` and
+    ``/metrics`` endpoints: ``{"id": 2, "query": "stats"}`` is answered with
+    ``{"id": 2, "result": ...}``.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        submit: Callable[[Dict[str, Any], Dict[str, float]], Awaitable[bool]],
+        query: Optional[Callable[[str], Any]] = None,
+    ):
+        """Initialize the bridge
+
+        Args:
+            path: Unix socket path the workers connect to
+            submit: Coroutine deduplicating and queuing an event with its worker-side spans,
+                returning False if rejected
+            query: Function answering a named query (e.g. "stats") with a JSON-serializable result
+        """
+        self.path = path
+        self.submit = submit
+        self.query = query
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._tasks: Set[asyncio.Task] = set()
+        self.received = 0
+        self.rejected = 0
+
+    async def start(self):
+        """Start listening on the Unix socket"""
+        self._server = await asyncio.start_unix_server(self._handle, path=self.path, limit=MAX_MESSAGE_SIZE)
+
+    async def stop(self):
+        """Stop listening and wait for events still being submitted"""
+        if self._server:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        write_lock = asyncio.Lock()
+
+        async def send(message: Dict[str, Any]):
+            async with write_lock:
+                writer.write(json.dumps(message).encode() + b"\n")
+                await writer.drain()
+
+        async def reply(message_id: int, event: Dict[str, Any], spans: Dict[str, float]):
+            try:
+                ok = await self.submit(event, spans)
+            except Exception as e:
+                logger.error("Failed to submit forwarded event: %s", e)
+                ok = False
+            if not ok:
+                self.rejected += 1
+            await send({"id": message_id, "ok": ok})
+
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                message = json.loads(line)
+                if "query" in message:
+                    try:
+                        result = self.query(message["query"]) if self.query else None
+                    except Exception as e:
+                        logger.error("Failed to answer query %r: %s", message["query"], e)
+                        result = None
+                    await send({"id": message["id"], "result": result})
+                    continue
+                self.received += 1
+                # Submit concurrently, so a blocking queue does not stall the worker's other requests
+                task = asyncio.create_task(reply(message["id"], message["event"], message.get("spans") or {}))
+                self._tasks.add(task)
+                task.add_done_callback(self._tasks.discard)
+        except (ConnectionError, ValueError) as e:
+            logger.warning("Ingest worker connection closed: %s", e)
+        finally:
+            writer.close()
+
+    def stats(self) -> Dict[str, Any]:
+        """Return the number of forwarded and rejected events"""
+        return {"received": self.received, "rejected": self.rejected}
+
+
+class IngestForwarder:
+    """Forwards events from an ingest worker process to the executor process
+
+    When the connection drops, requests fail fast with ConnectionError while
+    the forwarder reconnects in the background with exponential backoff.
+    """
+
+    def __init__(self, path: str, timeout: float = 10.0,
+                 reconnect_backoff: float = 0.1, max_reconnect_backoff: float = 5.0):
+        """Initialize the forwarder
+
+        Args:
+            path: Unix socket path of the executor's IngestBridge
+            timeout: Maximum seconds to wait for the executor to accept an event
+            reconnect_backoff: Initial delay before reconnecting a dropped connection
+            max_reconnect_backoff: Upper bound for the reconnect delay
+        """
+        self.path = path
+        self.timeout = timeout
+        self.reconnect_backoff = reconnect_backoff
+        self.max_reconnect_backoff = max_reconnect_backoff
+        self._ids = itertools.count(1)
+        self._pending: Dict[int, asyncio.Future] = {}
+        self._writer: Optional[asyncio.StreamWriter] = None
+        self._reader_task: Optional[asyncio.Task] = None
+        self.reconnects = 0
+
+    async def connect(self):
+        """Connect to the executor process"""
+        reader, self._writer = await asyncio.open_unix_connection(self.path, limit=MAX_MESSAGE_SIZE)
+        self._reader_task = asyncio.create_task(self._run(reader))
+
+    async def _run(self, reader: asyncio.StreamReader):
+        """Read replies, reconnecting whenever the executor connection drops"""
+        while True:
+            await self._read_replies(reader)
+            if self._writer:
+                self._writer.close()
+            self._writer = None
+            self._fail_pending(ConnectionError("Executor connection lost"))
+
+            backoff = self.reconnect_backoff
+            while self._writer is None:
+                await asyncio.sleep(backoff)
+                try:
+                    reader, self._writer = await asyncio.open_unix_connection(self.path, limit=MAX_MESSAGE_SIZE)
+                except OSError as e:
+                    logger.warning("Reconnecting to the executor failed, retrying in %.1fs: %s", backoff, e)
+                    backoff = min(backoff * 2, self.max_reconnect_backoff)
+            self.reconnects += 1
+            logger.info("Reconnected to the executor process")
+
+    async def close(self):
+        """Close the connection, failing events still waiting for a reply"""
+        if self._writer:
+            self._writer.close()
+            self._writer = None
+        if self._reader_task:
+            self._reader_task.cancel()
+            await asyncio.gather(self._reader_task, return_exceptions=True)
+            self._reader_task = None
+        self._fail_pending(ConnectionError("Forwarder closed"))
+
+    async def submit(self, data: Dict[str, Any], spans: Optional[Dict[str, float]] = None) -> bool:
+        """Forward an event to the executor
+
+        Args:
+            data: Parsed webhook event
+            spans: Durations in seconds of the stages already run in this worker
+
+        Returns:
+            False if the executor rejected the event (e.g. queue full), True otherwise
+        """
+        return await self._request({"event": data, "spans": spans or {}})
+
+    async def query(self, name: str) -> Any:
+        """Ask the executor for its state, e.g. "stats" or "metrics"
+
+        Args:
+            name: Query name
+
+        Returns:
+            The executor's answer
+        """
+        return await self._request({"query": name})
+
+    async def _request(self, message: Dict[str, Any]) -> Any:
+        if self._writer is None:
+            raise ConnectionError("Not connected to the executor process")
+        message_id = next(self._ids)
+        future = asyncio.get_running_loop().create_future()
+        self._pending[message_id] = future
+        try:
+            self._writer.write(json.dumps({"id": message_id, **message}).encode() + b"\n")
+            await self._writer.drain()
+            return await asyncio.wait_for(future, self.timeout)
+        finally:
+            self._pending.pop(message_id, None)
+
+    async def _read_replies(self, reader: asyncio.StreamReader):
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                reply = json.loads(line)
+                future = self._pending.get(reply["id"])
+                if future and not future.done():
+                    future.set_result(reply["ok"] if "ok" in reply else reply.get("result"))
+        except (ConnectionError, ValueError) as e:
+            logger.warning("Executor connection closed: %s", e)
+
+    def _fail_pending(self, error: Exception):
+        for future in self._pending.values():
+            if not future.done():
+                future.set_exception(error)
@@ -0,0 +1,192 @@
+import os
+import sys
+import json
+import time
+import queue
+import random
+import logging
+import tempfile
+import logging.handlers
+from typing import Any, Dict, Optional
+
+# Format used by the text mode, same as the webhook server's default
+TEXT_FORMAT = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+
+# Listener moving log records to their handlers on a background thread
+_listener: Optional[logging.handlers.QueueListener] = None
+
+
+class LazyText:
+    """Defers decoding a request body until a log record is actually formatted"""
+
+    __slots__ = ("data",)
+
+    def __init__(self, data: bytes):
+        self.data = data
+
+    def __str__(self) -> str:
+        return self.data.decode("utf-8", errors="replace")
+
+
+class PayloadSampler:
+    """Decides which requests get their full payload logged"""
+
+    def __init__(self, rate: float = 0.01):
+        """Initialize the sampler
+
+        Args:
+            rate: Fraction of payloads to log, 0 disables and 1 logs all
+        """
+        self.rate = rate
+
+    def sample(self) -> bool:
+        """Return True if the current payload should be logged"""
+        return self.rate >= 1.0 or (self.rate > 0.0 and random.random() < self.rate)
+
+
+class StructuredFormatter(logging.Formatter):
+    """Formats records as one JSON object per line"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry: Dict[str, Any] = {
+            "ts": round(record.created, 6),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class DeferredQueueHandler(logging.handlers.QueueHandler):
+    """Queue handler that leaves all formatting to the listener thread
+
+    The stdlib QueueHandler formats the message in the calling thread, which
+    would keep string formatting on the event loop. Records are passed on
+    unformatted instead; this is safe because the queue never leaves the
+    process.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+
+def parse_levels(spec: str) -> Dict[str, str]:
+    """Parse per-logger levels, e.g. ``webhook-server=WARNING,webhook-server.queue=INFO``"""
+    levels = {}
+    for item in spec.split(","):
+        if "=" in item:
+            name, level = item.split("=", 1)
+            levels[name.strip()] = level.strip().upper()
+    return levels
+
+
+def configure_logging(
+    level: str = "INFO",
+    stage_levels: Optional[Dict[str, str]] = None,
+    structured: bool = False,
+    use_queue: bool = True,
+    stream: Any = None,
+):
+    """Configure logging for the webhook hot path
+
+    Replaces the root handlers with a handler writing to ``stream``. With
+    ``use_queue`` the handler runs behind a queue on a background thread, so
+    the event loop only pays for enqueuing a record.
+
+    Args:
+        level: Root log level
+        stage_levels: Levels per logger (stage), e.g. {"webhook-server.queue": "WARNING"}
+        structured: Emit JSON lines instead of text
+        use_queue: Move formatting and I/O off the calling thread
+        stream: Output stream, defaults to stderr
+    """
+    global _listener
+    shutdown_logging()
+
+    handler = logging.StreamHandler(stream or sys.stderr)
+    handler.setFormatter(StructuredFormatter() if structured else logging.Formatter(TEXT_FORMAT))
+
+    root = logging.getLogger()
+    for existing in list(root.handlers):
+        root.removeHandler(existing)
+    root.setLevel(level.upper())
+
+    if use_queue:
+        log_queue: "queue.SimpleQueue[logging.LogRecord]" = queue.SimpleQueue()
+        root.addHandler(DeferredQueueHandler(log_queue))
+        _listener = logging.handlers.QueueListener(log_queue, handler, respect_handler_level=True)
+        _listener.start()
+    else:
+        root.addHandler(handler)
+
+    for name, stage_level in (stage_levels or {}).items():
+        logging.getLogger(name).setLevel(stage_level.upper())
+
+
+def configure_from_env():
+    """Configure logging from LOG_LEVEL, LOG_LEVELS, LOG_FORMAT and LOG_QUEUE"""
+    configure_logging(
+        level=os.getenv("LOG_LEVEL", "INFO"),
+        stage_levels=parse_levels(os.getenv("LOG_LEVELS", "")),
+        structured=os.getenv("LOG_FORMAT", "text").lower() == "json",
+        use_queue=os.getenv("LOG_QUEUE", "1") != "0",
+    )
+
+
+def shutdown_logging():
+    """Flush queued records and stop the listener thread"""
+    global _listener
+    if _listener:
+        _listener.stop()
+        _listener = None
+
+
+def measure_overhead(requests: int = 5000):
+    """Compare per-request logging cost of the old and the new webhook logging path"""
+    payload = json.dumps({
+        "created_at": 1712150400,
+        "type": "cast.created",
+        "data": {
+            "hash": "0x" + "ab" * 20,
+            "author": {"fid": 1, "username": "0xhardman", "display_name": "hardman", "bio": "x" * 500},
+            "text": "buy 0.5 USDC of WETH",
+            "embeds": [{"url": f"https://example.com/{i}"} for i in range(40)],
+        },
+    }).encode()
+    logger = logging.getLogger("webhook-server")
+
+    def run(label: str, emit, use_queue: bool):
+        with tempfile.TemporaryFile("w") as out:
+            configure_logging("INFO", use_queue=use_queue, stream=out)
+            started = time.perf_counter()
+            for _ in range(requests):
+                emit()
+            elapsed = time.perf_counter() - started
+            shutdown_logging()
+        print(f"{label:<48} {elapsed / requests * 1e6:8.2f} us/request")
+
+    # Before: synchronous handler, full payload decoded and formatted at INFO on every request
+    def before():
+        logger.info(f"Received webhook event: {payload.decode('utf-8')}")
+        logger.info(f"Processing event type: cast.created")
+        logger.info(f"New cast from hardman (@0xhardman): buy 0.5 USDC of WETH")
+
+    # After: lazy formatting, 1% payload sampling, per-request summaries at DEBUG
+    sampler = PayloadSampler(0.01)
+
+    def after():
+        if sampler.sample():
+            logger.info("Sampled webhook payload: %s", LazyText(payload))
+        logger.debug("Received webhook event (%d bytes)", len(payload))
+        logger.debug("Processing event type: %s", "cast.created")
+        logger.info("New cast from %s (@%s): %s", "hardman", "0xhardman", "buy 0.5 USDC of WETH")
+
+    run("before (sync handler, full payload at INFO)", before, use_queue=False)
+    run("after (sync handler, lazy, 1% payload sample)", after, use_queue=False)
+    run("after (queue handler, lazy, 1% payload sample)", after, use_queue=True)
+
+
+if __name__ == "__main__":
+    measure_overhead()
@@ -1,5 +1,13 @@
+import os
+import sys
+import ast
+import json
+import asyncio
 import argparse
-from neynar_client import NeynarClient
+from neynar_client import AsyncNeynarClient, NeynarClient
+from subscription_compiler import (compile_subscription, estimate_traffic, load_payloads,
+                                   plan_sync, webhook_fields)
+from user_directory import UserDirectory
 
 def list_webhooks(client):
     """列出所有 webhooks"""
@@ -28,6 +36,148 @@ def delete_webhook(client, webhook_id):
     except Exception as e:
         print(f"Error deleting webhook: {str(e)}")
 
+def _split(value):
+    return [item.strip() for item in (value or "").split(",") if item.strip()]
+
+
+ROOT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+
+
+def quantar_setting(name, default=None):
+    """读取 quantar.py 中的模块级常量
+
+    只解析源码而不导入，避免加载 MCP 依赖和钱包配置。
+    """
+    try:
+        with open(os.path.join(ROOT_DIR, "quantar.py")) as f:
+            tree = ast.parse(f.read())
+    except OSError:
+        return default
+    for node in tree.body:
+        if isinstance(node, ast.Assign) and any(getattr(target, "id", None) == name for target in node.targets):
+            return ast.literal_eval(node.value)
+    return default
+
+
+def load_authors(args):
+    """从命令行和交易策略文件收集授权作者的 FID 和用户名
+
+    没有策略文件时与 quantar 的默认授权一致: AUTHORIZED_USERS 和 AUTHORIZED_FIDS。
+    """
+    fids = {int(fid) for fid in _split(args.fids)}
+    usernames = set(_split(args.usernames))
+    if args.policy:
+        with open(args.policy) as f:
+            for entry in json.load(f).get("authors", []):
+                if entry.get("fid") is not None:
+                    fids.add(int(entry["fid"]))
+                elif entry.get("username"):
+                    usernames.add(entry["username"])
+    else:
+        usernames.update(quantar_setting("AUTHORIZED_USERS", []))
+        fids.update(int(fid) for fid in _split(os.getenv("AUTHORIZED_FIDS")))
+    return fids, usernames
+
+
+def load_tokens(args):
+    """代币符号: 命令行 > 代币缓存 > quantar 的 TOKEN_ADDRESSES"""
+    tokens = _split(args.tokens)
+    if tokens:
+        return tokens
+    # 缓存默认在仓库根目录（quantar 的工作目录）
+    if args.token_cache:
+        for path in (args.token_cache, os.path.join(ROOT_DIR, args.token_cache)):
+            if os.path.isfile(path):
+                with open(path) as f:
+                    return [record["symbol"] for record in json.load(f)]
+    tokens = list(quantar_setting("TOKEN_ADDRESSES", {}))
+    if not tokens:
+        raise SystemExit(f"Token cache {args.token_cache} not found and no TOKEN_ADDRESSES in quantar.py, "
+                         "pass --tokens or --no-text")
+    print(f"Warning: token cache {args.token_cache} not found, using TOKEN_ADDRESSES from quantar.py")
+    return tokens
+
+
+def load_terms(args):
+    """构建文本过滤词: 代币符号、别名、交易关键词和关注列表
+
+    优先使用仓库根目录的 CastPrefilter 词表，保证上游过滤不会比本地预过滤更严格。
+    """
+    tokens = load_tokens(args)
+    watchlist = _split(args.watchlist)
+
+    sys.path.append(ROOT_DIR)
+    try:
+        from prefilter import CastPrefilter
+    except ImportError:
+        return set(tokens) | set(watchlist) | set(_split(args.terms))
+    prefilter = CastPrefilter({symbol: symbol for symbol in tokens}, watchlist=watchlist)
+    return prefilter.tickers | prefilter.keywords | prefilter.watchlist | set(_split(args.terms))
+
+
+async def sync_webhooks(args):
+    """编译最严格的订阅，与线上 webhooks 对比后一次性批量更新"""
+    fids, usernames = load_authors(args)
+    terms = set() if args.no_text else load_terms(args)
+
+    async with AsyncNeynarClient() as client:
+        # 用户名解析为 FID，无法解析的用户会被上游过滤掉，因此直接中止
+        if usernames:
+            directory = UserDirectory(client, path=args.user_directory)
+            resolved = await directory.resolve(sorted(usernames))
+            directory.close()
+            missing = [username for username, fid in resolved.items() if fid is None]
+            if missing:
+                print(f"Could not resolve {', '.join('@' + name for name in missing)} to FIDs, aborting sync")
+                return
+            fids.update(resolved.values())
+        if not fids:
+            print("Warning: no authors given, the subscription delivers casts from every author")
+
+        desired = {
+            "name": args.name,
+            "url": args.url,
+            "subscription": compile_subscription(fids, terms, cashtags=not args.no_text),
+        }
+        live = [webhook_fields(webhook) for webhook in await client.list_webhooks_detailed()
+                if not isinstance(webhook, Exception)]
+        plan = plan_sync(desired, live, prune=args.prune)
+
+        print(f"Desired subscription ({len(fids)} author(s), {len(terms)} term(s)):")
+        print(json.dumps(desired["subscription"], indent=2))
+        if plan.create:
+            print(f"\nCreate webhook {args.name} -> {args.url}")
+        if plan.update:
+            print(f"\nUpdate webhook {plan.update['id']} ({args.name})")
+        for webhook in plan.delete:
+            print(f"\nDelete duplicate webhook {webhook['id']} ({webhook['name']})")
+        if plan.empty:
+            print("\nWebhooks are up to date")
+
+        if args.sample:
+            current = plan.current["subscription"] if plan.current else None
+            report = estimate_traffic(load_payloads(args.sample), current, desired["subscription"])
+            print(f"\nExpected inbound traffic on {report['sample']} sampled casts: "
+                  f"{report['delivered_before']} -> {report['delivered_after']} deliveries "
+                  f"({report['reduction']:.1%} reduction)")
+
+        if plan.empty or args.dry_run:
+            return
+
+        # 所有变更并发提交
+        requests = []
+        if plan.create:
+            requests.append(client.publish_webhook(args.name, args.url, desired["subscription"]))
+        if plan.update:
+            requests.append(client.update_webhook(plan.update["id"], args.name, args.url, desired["subscription"]))
+        requests.extend(client.delete_webhook(webhook["id"]) for webhook in plan.delete)
+        results = await client.gather(requests)
+        failed = [result for result in results if isinstance(result, Exception)]
+        for error in failed:
+            print(f"Error syncing webhooks: {str(error)}")
+        print(f"\nApplied {len(results) - len(failed)}/{len(results)} change(s)")
+
+
 def main():
     parser = argparse.ArgumentParser(description="Manage Neynar webhooks")
     subparsers = parser.add_subparsers(dest="command", help="Command to execute")
@@ -38,9 +188,31 @@ def main():
     # 删除 webhook 的子命令
     delete_parser = subparsers.add_parser("delete", help="Delete a webhook")
     delete_parser.add_argument("webhook_id", help="ID of the webhook to delete")
+
+    # 同步订阅的子命令
+    sync_parser = subparsers.add_parser("sync", help="Compile the subscription from authors and tokens and sync it")
+    sync_parser.add_argument("--name", default="python-webhook", help="Name of the webhook")
+    sync_parser.add_argument("--url", required=True, help="URL to send webhook events to")
+    sync_parser.add_argument("--fids", help="Comma separated author FIDs")
+    sync_parser.add_argument("--usernames", help="Comma separated author usernames, resolved to FIDs")
+    sync_parser.add_argument("--policy", help="Trade policy JSON file to take the authors from, defaults to quantar's AUTHORIZED_USERS")
+    sync_parser.add_argument("--tokens", help="Comma separated token symbols, defaults to the token cache or quantar's TOKEN_ADDRESSES")
+    sync_parser.add_argument("--token-cache", default="token_cache.json", help="Token registry cache file")
+    sync_parser.add_argument("--watchlist", default=os.getenv("PREFILTER_WATCHLIST", ""),
+                             help="Comma separated extra keywords")
+    sync_parser.add_argument("--terms", help="Comma separated extra text filter terms")
+    sync_parser.add_argument("--no-text", action="store_true", help="Filter by author only")
+    sync_parser.add_argument("--sample", help="Recorded payloads (JSON lines) to estimate the traffic reduction on")
+    sync_parser.add_argument("--prune", action="store_true", help="Delete other webhooks targeting the same URL")
+    sync_parser.add_argument("--dry-run", action="store_true", help="Only print the plan")
+    sync_parser.add_argument("--user-directory", default="user_directory.db", help="Username cache file")
     
     args = parser.parse_args()
-    
+
+    if args.command == "sync":
+        asyncio.run(sync_webhooks(args))
+        return
+
     # 创建 Neynar 客户端
     client = NeynarClient()
     
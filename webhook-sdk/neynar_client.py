@@ -1,96 +1,527 @@
 import os
+import time
+import random
+import asyncio
+import logging
 import requests
-from typing import Dict, Any, Optional
+import httpx
+import urllib3
+from email.utils import parsedate_to_datetime
+from requests.adapters import HTTPAdapter
+from typing import Dict, Any, Optional, List
 from dotenv import load_dotenv
 
+try:
+    import h2  # noqa: F401 - enables HTTP/2 in httpx
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+logger = logging.getLogger("neynar-client")
+
+# Status codes worth retrying
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+
+# Methods safe to send twice. Others, e.g. POST creating a webhook, are only
+# retried when rate limited or when the connection failed before the request was sent
+IDEMPOTENT_METHODS = {"GET", "HEAD", "OPTIONS", "PUT", "DELETE"}
+
+
+def should_retry(status_code: int, idempotent: bool) -> bool:
+    """Whether a response is worth retrying
+
+    A 429 is rejected before the request is processed, so any method can be
+    resent. A server error may come after the request took effect, so only
+    idempotent methods are retried then.
+
+    Args:
+        status_code: HTTP status of the response
+        idempotent: Whether the request method is in IDEMPOTENT_METHODS
+    """
+    if status_code == 429:
+        return True
+    return idempotent and status_code in RETRY_STATUS_CODES
+
+
+def is_unsent(error: Exception) -> bool:
+    """Whether a failed request never reached the server, so resending it is safe
+
+    Args:
+        error: Exception raised by requests or httpx
+
+    Returns:
+        True if the connection could not be established
+    """
+    if isinstance(error, (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout)):
+        return True
+    if isinstance(error, requests.ConnectTimeout):
+        return True
+    if isinstance(error, requests.ConnectionError) and error.args:
+        # requests wraps urllib3's MaxRetryError, whose reason is the connect failure
+        reason = getattr(error.args[0], "reason", error.args[0])
+        return isinstance(reason, urllib3.exceptions.ConnectTimeoutError)
+    return False
+
+
+def retry_delay(headers: Any, attempt: int, backoff: float, max_delay: float = 60.0) -> float:
+    """Compute how long to wait before retrying a request
+
+    Honors ``Retry-After`` (seconds or HTTP date) and the rate limit reset
+    header when the remaining quota is exhausted, and otherwise falls back
+    to exponential backoff with jitter.
+
+    Args:
+        headers: Response headers, or None if the request failed without a response
+        attempt: Number of the retry, starting at 0
+        backoff: Base delay in seconds
+        max_delay: Upper bound for the delay
+
+    Returns:
+        Delay in seconds
+    """
+    if headers is not None:
+        retry_after = headers.get("retry-after")
+        if retry_after:
+            try:
+                return min(max(float(retry_after), 0.0), max_delay)
+            except ValueError:
+                try:
+                    return min(max(parsedate_to_datetime(retry_after).timestamp() - time.time(), 0.0), max_delay)
+                except (TypeError, ValueError):
+                    pass
+
+        remaining = headers.get("x-ratelimit-remaining")
+        reset = headers.get("x-ratelimit-reset")
+        if remaining == "0" and reset:
+            try:
+                reset = float(reset)
+                # Reset is either an epoch timestamp or a number of seconds
+                delay = reset - time.time() if reset > 1e9 else reset
+                return min(max(delay, 0.0), max_delay)
+            except ValueError:
+                pass
+
+    return min(backoff * (2 ** attempt) * (1 + random.random() * 0.1), max_delay)
+
+
 class NeynarClient:
     """Python client for the Neynar API"""
-    
+
     BASE_URL = "https://api.neynar.com/v2/farcaster"
-    
-    def __init__(self, api_key: Optional[str] = None):
+
+    def __init__(
+        self,
+        api_key: Optional[str] = None,
+        base_url: Optional[str] = None,
+        timeout: float = 10.0,
+        max_retries: int = 3,
+        backoff: float = 0.5,
+        pool_size: int = 10,
+    ):
         """Initialize the Neynar client with an API key
-        
+
         Args:
             api_key: Neynar API key. If not provided, will look for NEYNAR_API_KEY in environment variables
+            base_url: API base URL, e.g. a local mock server
+            timeout: Request timeout in seconds
+            max_retries: Maximum retries for rate limited, failed or timed out requests, see _request
+            backoff: Base delay in seconds for exponential backoff
+            pool_size: Maximum number of keep-alive connections
         """
         load_dotenv()  # Load environment variables from .env file
-        
+
         self.api_key = api_key or os.environ.get("NEYNAR_API_KEY")
         if not self.api_key:
             raise ValueError("NEYNAR_API_KEY is not set in environment variables and not provided to constructor")
-        
+
+        self.base_url = (base_url or self.BASE_URL).rstrip("/")
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff = backoff
         self.headers = {
             "accept": "application/json",
             "content-type": "application/json",
-            "api_key": self.api_key
+            "api_key": self.api_key,
+            "x-api-key": self.api_key
         }
-    
+
+        # Keep-alive session so calls reuse connections instead of paying DNS + TCP + TLS each time
+        self.session = requests.Session()
+        self.session.headers.update(self.headers)
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        """Close pooled connections"""
+        self.session.close()
+
+    def _request(self, method: str, path: str, **kwargs) -> Dict[str, Any]:
+        """Send a request, retrying rate limited and transient failures
+
+        Only idempotent methods are retried after a server error or a timeout,
+        other methods only when rate limited or when the connection could not
+        be established.
+
+        Args:
+            method: HTTP method
+            path: Path relative to the base URL
+            **kwargs: Extra arguments for requests (json, params)
+
+        Returns:
+            Decoded JSON response
+        """
+        url = f"{self.base_url}{path}"
+        for attempt in range(self.max_retries + 1):
+            idempotent = method.upper() in IDEMPOTENT_METHODS
+            try:
+                response = self.session.request(method, url, timeout=self.timeout, **kwargs)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                if attempt == self.max_retries or not (idempotent or is_unsent(e)):
+                    raise
+                delay = retry_delay(None, attempt, self.backoff)
+                logger.warning(f"{method} {path} failed ({str(e)}), retrying in {delay:.2f}s")
+                time.sleep(delay)
+                continue
+
+            if should_retry(response.status_code, idempotent) and attempt < self.max_retries:
+                delay = retry_delay(response.headers, attempt, self.backoff)
+                logger.warning(f"{method} {path} returned {response.status_code}, retrying in {delay:.2f}s")
+                time.sleep(delay)
+                continue
+
+            response.raise_for_status()  # Raise exception for HTTP errors
+            return response.json()
+
     def publish_webhook(self, name: str, url: str, subscription: Dict[str, Any]) -> Dict[str, Any]:
         """Create a new webhook
-        
+
         Args:
             name: Name of the webhook
             url: URL to send webhook events to
             subscription: Subscription configuration for the webhook
-            
+
         Returns:
             Response from the Neynar API
         """
-        endpoint = f"{self.BASE_URL}/webhook"
-        
         payload = {
             "name": name,
             "url": url,
             "subscription": subscription
         }
-        
-        response = requests.post(endpoint, json=payload, headers=self.headers)
-        response.raise_for_status()  # Raise exception for HTTP errors
-        
-        return response.json()
-    
+
+        return self._request("POST", "/webhook", json=payload)
+
+    def update_webhook(self, webhook_id: str, name: str, url: str, subscription: Dict[str, Any]) -> Dict[str, Any]:
+        """Replace the name, URL and subscription of a webhook
+
+        Args:
+            webhook_id: ID of the webhook
+            name: Name of the webhook
+            url: URL to send webhook events to
+            subscription: Subscription configuration for the webhook
+
+        Returns:
+            Response from the Neynar API
+        """
+        payload = {
+            "webhook_id": webhook_id,
+            "name": name,
+            "url": url,
+            "subscription": subscription
+        }
+        return self._request("PUT", "/webhook", json=payload)
+
     def list_webhooks(self) -> Dict[str, Any]:
         """List all webhooks
-        
+
         Returns:
             Response from the Neynar API
         """
-        endpoint = f"{self.BASE_URL}/webhook"
-        
-        response = requests.get(endpoint, headers=self.headers)
-        response.raise_for_status()
-        
-        return response.json()
-    
+        return self._request("GET", "/webhook")
+
     def delete_webhook(self, webhook_id: str) -> Dict[str, Any]:
         """Delete a webhook
-        
+
         Args:
             webhook_id: ID of the webhook to delete
-            
+
         Returns:
             Response from the Neynar API
         """
-        endpoint = f"{self.BASE_URL}/webhook/{webhook_id}"
-        
-        response = requests.delete(endpoint, headers=self.headers)
-        response.raise_for_status()
-        
-        return response.json()
-    
+        return self._request("DELETE", f"/webhook/{webhook_id}")
+
     def get_webhook(self, webhook_id: str) -> Dict[str, Any]:
         """Get information about a webhook
-        
+
+        Args:
+            webhook_id: ID of the webhook
+
+        Returns:
+            Response from the Neynar API
+        """
+        return self._request("GET", f"/webhook/{webhook_id}")
+
+
+class AsyncNeynarClient:
+    """Asyncio client for the Neynar API with connection pooling and HTTP/2"""
+
+    BASE_URL = NeynarClient.BASE_URL
+
+    def __init__(
+        self,
+        api_key: Optional[str] = None,
+        base_url: Optional[str] = None,
+        timeout: float = 10.0,
+        max_retries: int = 3,
+        backoff: float = 0.5,
+        max_connections: int = 20,
+        max_concurrency: int = 10,
+        http2: Optional[bool] = None,
+    ):
+        """Initialize the async Neynar client
+
+        Args:
+            api_key: Neynar API key. If not provided, will look for NEYNAR_API_KEY in environment variables
+            base_url: API base URL, e.g. a local mock server
+            timeout: Request timeout in seconds
+            max_retries: Maximum retries for rate limited, failed or timed out requests, see request
+            backoff: Base delay in seconds for exponential backoff
+            max_connections: Maximum number of pooled connections
+            max_concurrency: Maximum number of requests in flight for bulk operations
+            http2: Use HTTP/2, defaults to enabled when the h2 package is installed
+        """
+        load_dotenv()
+
+        self.api_key = api_key or os.environ.get("NEYNAR_API_KEY")
+        if not self.api_key:
+            raise ValueError("NEYNAR_API_KEY is not set in environment variables and not provided to constructor")
+
+        self.base_url = (base_url or self.BASE_URL).rstrip("/")
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_concurrency = max_concurrency
+        self.headers = {
+            "accept": "application/json",
+            "content-type": "application/json",
+            "api_key": self.api_key,
+            "x-api-key": self.api_key
+        }
+
+        self.client = httpx.AsyncClient(
+            base_url=self.base_url,
+            headers=self.headers,
+            timeout=timeout,
+            http2=HTTP2_AVAILABLE if http2 is None else http2,
+            limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections),
+        )
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    async def close(self):
+        """Close pooled connections"""
+        await self.client.aclose()
+
+    async def request(self, method: str, path: str, **kwargs) -> Dict[str, Any]:
+        """Send a request, retrying rate limited and transient failures
+
+        Only idempotent methods are retried after a server error or a timeout,
+        other methods only when rate limited or when the connection could not
+        be established.
+
+        Args:
+            method: HTTP method
+            path: Path relative to the base URL
+            **kwargs: Extra arguments for httpx (json, params)
+
+        Returns:
+            Decoded JSON response
+        """
+        for attempt in range(self.max_retries + 1):
+            idempotent = method.upper() in IDEMPOTENT_METHODS
+            try:
+                response = await self.client.request(method, path, **kwargs)
+            except httpx.TransportError as e:
+                if attempt == self.max_retries or not (idempotent or is_unsent(e)):
+                    raise
+                delay = retry_delay(None, attempt, self.backoff)
+                logger.warning(f"{method} {path} failed ({str(e)}), retrying in {delay:.2f}s")
+                await asyncio.sleep(delay)
+                continue
+
+            if should_retry(response.status_code, idempotent) and attempt < self.max_retries:
+                delay = retry_delay(response.headers, attempt, self.backoff)
+                logger.warning(f"{method} {path} returned {response.status_code}, retrying in {delay:.2f}s")
+                await asyncio.sleep(delay)
+                continue
+
+            response.raise_for_status()
+            return response.json()
+
+    async def gather(self, coros: List[Any]) -> List[Any]:
+        """Run coroutines concurrently, at most ``max_concurrency`` at a time
+
+        Args:
+            coros: Coroutines to run
+
+        Returns:
+            Results in the same order, exceptions included as values
+        """
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        async def limited(coro):
+            async with semaphore:
+                return await coro
+
+        return await asyncio.gather(*(limited(coro) for coro in coros), return_exceptions=True)
+
+    async def publish_webhook(self, name: str, url: str, subscription: Dict[str, Any]) -> Dict[str, Any]:
+        """Create a new webhook
+
+        Args:
+            name: Name of the webhook
+            url: URL to send webhook events to
+            subscription: Subscription configuration for the webhook
+
+        Returns:
+            Response from the Neynar API
+        """
+        payload = {
+            "name": name,
+            "url": url,
+            "subscription": subscription
+        }
+        return await self.request("POST", "/webhook", json=payload)
+
+    async def update_webhook(self, webhook_id: str, name: str, url: str,
+                             subscription: Dict[str, Any]) -> Dict[str, Any]:
+        """Replace the name, URL and subscription of a webhook
+
+        Args:
+            webhook_id: ID of the webhook
+            name: Name of the webhook
+            url: URL to send webhook events to
+            subscription: Subscription configuration for the webhook
+
+        Returns:
+            Response from the Neynar API
+        """
+        payload = {
+            "webhook_id": webhook_id,
+            "name": name,
+            "url": url,
+            "subscription": subscription
+        }
+        return await self.request("PUT", "/webhook", json=payload)
+
+    async def list_webhooks(self) -> Dict[str, Any]:
+        """List all webhooks
+
+        Returns:
+            Response from the Neynar API
+        """
+        return await self.request("GET", "/webhook")
+
+    async def delete_webhook(self, webhook_id: str) -> Dict[str, Any]:
+        """Delete a webhook
+
+        Args:
+            webhook_id: ID of the webhook to delete
+
+        Returns:
+            Response from the Neynar API
+        """
+        return await self.request("DELETE", f"/webhook/{webhook_id}")
+
+    async def get_webhook(self, webhook_id: str) -> Dict[str, Any]:
+        """Get information about a webhook
+
         Args:
             webhook_id: ID of the webhook
-            
+
         Returns:
             Response from the Neynar API
         """
-        endpoint = f"{self.BASE_URL}/webhook/{webhook_id}"
-        
-        response = requests.get(endpoint, headers=self.headers)
-        response.raise_for_status()
-        
-        return response.json()
+        return await self.request("GET", f"/webhook/{webhook_id}")
+
+    async def fetch_user_casts(self, fid: int, limit: int = 25, cursor: Optional[str] = None,
+                               include_replies: bool = True) -> Dict[str, Any]:
+        """Fetch a page of a user's casts, newest first
+
+        Args:
+            fid: Farcaster ID of the user
+            limit: Page size
+            cursor: Cursor returned in ``next.cursor`` of the previous page
+            include_replies: Include the user's replies
+
+        Returns:
+            Response from the Neynar API with ``casts`` and ``next``
+        """
+        params = {"fid": fid, "limit": limit, "include_replies": str(include_replies).lower()}
+        if cursor:
+            params["cursor"] = cursor
+        return await self.request("GET", "/feed/user/casts", params=params)
+
+    async def lookup_user_by_username(self, username: str) -> Dict[str, Any]:
+        """Look up a user by exact username
+
+        Args:
+            username: Farcaster username without the leading @
+
+        Returns:
+            Response from the Neynar API with ``user``
+        """
+        return await self.request("GET", "/user/by_username", params={"username": username})
+
+    async def fetch_bulk_users(self, fids: List[int]) -> Dict[str, Any]:
+        """Fetch several users by FID in one request
+
+        Args:
+            fids: Farcaster IDs, at most 100
+
+        Returns:
+            Response from the Neynar API with ``users``
+        """
+        return await self.request("GET", "/user/bulk", params={"fids": ",".join(str(fid) for fid in fids)})
+
+    async def get_webhooks(self, webhook_ids: List[str]) -> List[Any]:
+        """Get several webhooks concurrently
+
+        Args:
+            webhook_ids: IDs of the webhooks
+
+        Returns:
+            Responses in the same order, or the exception raised for a webhook
+        """
+        return await self.gather([self.get_webhook(webhook_id) for webhook_id in webhook_ids])
+
+    async def list_webhooks_detailed(self) -> List[Any]:
+        """List all webhooks and fetch their details concurrently
+
+        Returns:
+            Detailed responses for every webhook
+        """
+        response = await self.list_webhooks()
+        webhook_ids = [webhook.get("webhook_id") or webhook.get("id") for webhook in response.get("webhooks", [])]
+        return await self.get_webhooks([webhook_id for webhook_id in webhook_ids if webhook_id])
+
+    async def delete_webhooks(self, webhook_ids: List[str]) -> List[Any]:
+        """Delete several webhooks concurrently
+
+        Args:
+            webhook_ids: IDs of the webhooks to delete
+
+        Returns:
+            Responses in the same order, or the exception raised for a webhook
+        """
+        return await self.gather([self.delete_webhook(webhook_id) for webhook_id in webhook_ids])
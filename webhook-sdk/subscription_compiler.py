@@ -0,0 +1,207 @@
+import re
+import json
+import logging
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+logger = logging.getLogger("webhook-server.subscription")
+
+# Cashtags such as $DEGEN, forwarded even when the ticker is not in the term list
+CASHTAG_PATTERN = r"\$[A-Za-z]{2,10}"
+
+# Characters that may not surround a term, matching the prefilter's whole-word rule
+_WORD_CHAR = "A-Za-z0-9"
+
+
+def _case_insensitive(term: str) -> str:
+    """Spell a term as a case-insensitive regex without relying on inline flags"""
+    parts = []
+    for char in term:
+        if char.isalpha() and char.lower() != char.upper():
+            parts.append(f"[{char.lower()}{char.upper()}]")
+        else:
+            parts.append(re.escape(char))
+    return "".join(parts)
+
+
+def text_pattern(terms: Iterable[str], cashtags: bool = True) -> Optional[str]:
+    """Compile terms into one regex for a webhook text filter
+
+    Terms match case-insensitively as whole words. Only basic regex syntax
+    is used (character classes, groups, anchors), so the pattern behaves the
+    same in Python and in the JavaScript-style engines webhook providers use.
+
+    Args:
+        terms: Tickers and keywords
+        cashtags: Also match any cashtag
+
+    Returns:
+        Regex, or None if there is nothing to match
+    """
+    unique = sorted({term.strip().lower() for term in terms if term and term.strip()},
+                    key=lambda term: (-len(term), term))
+    alternatives = []
+    if unique:
+        words = "|".join(_case_insensitive(term) for term in unique)
+        alternatives.append(f"(^|[^{_WORD_CHAR}])({words})([^{_WORD_CHAR}]|$)")
+    if cashtags:
+        alternatives.append(CASHTAG_PATTERN)
+    return "|".join(alternatives) or None
+
+
+def compile_subscription(
+    author_fids: Iterable[int] = (),
+    terms: Iterable[str] = (),
+    cashtags: bool = True,
+    event_type: str = "cast.created",
+) -> Dict[str, Any]:
+    """Build the tightest Neynar subscription for the given authors and terms
+
+    Args:
+        author_fids: Only deliver casts by these authors; empty delivers all authors
+        terms: Only deliver casts mentioning one of these tickers or keywords; empty skips the text filter
+        cashtags: Let any cashtag through the text filter
+        event_type: Event type subscribed to
+
+    Returns:
+        Subscription in the format of ``publish_webhook``
+    """
+    filters: Dict[str, Any] = {}
+    fids = sorted({int(fid) for fid in author_fids})
+    if fids:
+        filters["author_fids"] = fids
+    terms = list(terms)
+    if terms:
+        filters["text"] = text_pattern(terms, cashtags)
+    return {event_type: filters}
+
+
+def normalize_subscription(subscription: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """Put a subscription in a canonical form, so equal subscriptions compare equal
+
+    Accepts both the format sent to Neynar and the one returned by it,
+    where the filters are nested under ``filters``.
+    """
+    subscription = subscription or {}
+    if isinstance(subscription.get("filters"), dict):
+        subscription = subscription["filters"]
+    normalized = {}
+    for event_type, filters in subscription.items():
+        if not isinstance(filters, dict):
+            continue
+        normalized[event_type] = {
+            key: sorted(value) if isinstance(value, list) else value
+            for key, value in filters.items()
+            if value not in (None, [], "")
+        }
+    return normalized
+
+
+def matches(subscription: Dict[str, Any], payload: Dict[str, Any]) -> bool:
+    """Evaluate a subscription locally against a webhook payload
+
+    Only the author and text filters are evaluated; other filters are
+    assumed to match.
+
+    Args:
+        subscription: Subscription, see ``normalize_subscription``
+        payload: Neynar webhook payload
+
+    Returns:
+        True if Neynar would deliver the payload
+    """
+    filters = normalize_subscription(subscription).get(payload.get("type"))
+    if filters is None:
+        return False
+    data = payload.get("data") or {}
+    if filters.get("author_fids") and (data.get("author") or {}).get("fid") not in filters["author_fids"]:
+        return False
+    if filters.get("text") and not re.search(filters["text"], data.get("text") or ""):
+        return False
+    return True
+
+
+def webhook_fields(webhook: Dict[str, Any]) -> Dict[str, Any]:
+    """Extract id, name, url and subscription from a Neynar webhook object
+
+    Args:
+        webhook: Webhook as returned by the list or get endpoints, with or without a ``webhook`` wrapper
+    """
+    webhook = webhook.get("webhook", webhook)
+    return {
+        "id": webhook.get("webhook_id") or webhook.get("id"),
+        "name": webhook.get("title") or webhook.get("name"),
+        "url": webhook.get("target_url") or webhook.get("url"),
+        "subscription": normalize_subscription(webhook.get("subscription")),
+    }
+
+
+@dataclass
+class SyncPlan:
+    """Changes needed to bring live webhooks in line with the desired one"""
+
+    create: Optional[Dict[str, Any]] = None
+    update: Optional[Dict[str, Any]] = None
+    delete: List[Dict[str, Any]] = field(default_factory=list)
+    current: Optional[Dict[str, Any]] = None
+
+    @property
+    def empty(self) -> bool:
+        return self.create is None and self.update is None and not self.delete
+
+
+def plan_sync(desired: Dict[str, Any], live: Sequence[Dict[str, Any]], prune: bool = False) -> SyncPlan:
+    """Diff the desired webhook against the live ones
+
+    The live webhook with the desired name is updated in place, or created
+    when missing. With ``prune``, other webhooks delivering to the same URL
+    are deleted, since they would send the same casts again.
+
+    Args:
+        desired: Dictionary with name, url and subscription
+        live: Live webhooks, see ``webhook_fields``
+        prune: Delete duplicate webhooks targeting the desired URL
+
+    Returns:
+        SyncPlan
+    """
+    plan = SyncPlan()
+    wanted = normalize_subscription(desired["subscription"])
+    for webhook in live:
+        if webhook["name"] == desired["name"] and plan.current is None:
+            plan.current = webhook
+            if webhook["url"] != desired["url"] or webhook["subscription"] != wanted:
+                plan.update = {**desired, "id": webhook["id"]}
+        elif prune and webhook["url"] == desired["url"]:
+            plan.delete.append(webhook)
+    if plan.current is None:
+        plan.create = desired
+    return plan
+
+
+def estimate_traffic(payloads: Sequence[Dict[str, Any]], current: Optional[Dict[str, Any]],
+                     desired: Dict[str, Any]) -> Dict[str, Any]:
+    """Estimate inbound deliveries before and after a subscription change
+
+    Args:
+        payloads: Sample of webhook payloads, e.g. recorded cast.created events
+        current: Live subscription, None if there is no webhook yet
+        desired: Compiled subscription
+
+    Returns:
+        Dictionary with sample size, deliveries per subscription and the reduction
+    """
+    before = sum(1 for payload in payloads if matches(current, payload)) if current else len(payloads)
+    after = sum(1 for payload in payloads if matches(desired, payload))
+    return {
+        "sample": len(payloads),
+        "delivered_before": before,
+        "delivered_after": after,
+        "reduction": round(1 - after / before, 4) if before else 0.0,
+    }
+
+
+def load_payloads(path: str) -> List[Dict[str, Any]]:
+    """Load recorded webhook payloads, one JSON object per line"""
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
@@ -0,0 +1,302 @@
+import os
+import json
+import math
+import time
+import logging
+import itertools
+import contextvars
+from contextlib import contextmanager
+from typing import Dict, Any, Iterable, Iterator, List, Optional, Sequence
+
+logger = logging.getLogger("webhook-server.tracing")
+
+# Quantiles reported for every histogram
+QUANTILES = (0.5, 0.95, 0.99)
+
+
+class Histogram:
+    """Latency histogram with exponential buckets and O(1) recording"""
+
+    def __init__(self, min_value: float = 1e-5, max_value: float = 120.0, growth: float = 1.2):
+        """Initialize the histogram
+
+        Args:
+            min_value: Upper bound of the first bucket, in seconds
+            max_value: Values above this land in the last bucket
+            growth: Ratio between consecutive bucket bounds (1.2 = ~10% error)
+        """
+        self.min_value = min_value
+        self._log_growth = math.log(growth)
+        size = int(math.ceil(math.log(max_value / min_value) / self._log_growth)) + 1
+        self.bounds = [min_value * growth ** i for i in range(size)]
+        self.counts = [0] * size
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def record(self, value: float):
+        """Record a value in seconds"""
+        if value <= self.min_value:
+            index = 0
+        else:
+            index = min(int(math.ceil(math.log(value / self.min_value) / self._log_growth)), len(self.counts) - 1)
+        self.counts[index] += 1
+        self.count += 1
+        self.sum += value
+        if value > self.max:
+            self.max = value
+
+    def quantile(self, q: float) -> float:
+        """Estimate a quantile, returning the upper bound of its bucket"""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(self.bounds, self.counts):
+            seen += count
+            if seen >= rank:
+                return min(bound, self.max)
+        return self.max
+
+    def summary(self) -> Dict[str, Any]:
+        """Return count, mean, p50/p95/p99 and max in milliseconds"""
+        if not self.count:
+            return {"count": 0}
+        summary = {
+            "count": self.count,
+            "avg_ms": round(self.sum / self.count * 1000, 3),
+        }
+        for q in QUANTILES:
+            summary[f"p{int(q * 100)}_ms"] = round(self.quantile(q) * 1000, 3)
+        summary["max_ms"] = round(self.max * 1000, 3)
+        return summary
+
+
+
+def summarize(samples: Iterable[float], quantiles: Sequence[float] = (0.5, 0.95)) -> Dict[str, Any]:
+    """Return count, mean, quantiles and max in milliseconds of raw samples
+
+    Exact counterpart of ``Histogram.summary`` for the bounded sample windows
+    kept by queues and pools.
+
+    Args:
+        samples: Durations in seconds
+        quantiles: Quantiles to report, e.g. 0.95 as ``p95_ms``
+    """
+    ordered = sorted(samples)
+    if not ordered:
+        return {"count": 0}
+    summary = {
+        "count": len(ordered),
+        "avg_ms": round(sum(ordered) / len(ordered) * 1000, 3),
+    }
+    for q in quantiles:
+        summary[f"p{int(q * 100)}_ms"] = round(ordered[min(int(len(ordered) * q), len(ordered) - 1)] * 1000, 3)
+    summary["max_ms"] = round(ordered[-1] * 1000, 3)
+    return summary
+
+class Trace:
+    """Timing spans of one event on its way through the pipeline"""
+
+    __slots__ = ("tracer", "trace_id", "event_id", "started", "started_wall", "spans", "attrs", "finished")
+
+    def __init__(self, tracer: "Tracer", trace_id: int, event_id: Optional[str] = None):
+        self.tracer = tracer
+        self.trace_id = trace_id
+        self.event_id = event_id
+        self.started = time.perf_counter()
+        self.started_wall = time.time()
+        self.spans: List[Dict[str, Any]] = []
+        self.attrs: Dict[str, Any] = {}
+        self.finished = False
+
+    @contextmanager
+    def span(self, name: str, **attrs) -> Iterator[Dict[str, Any]]:
+        """Time a block of work
+
+        Works around ``await`` as well, e.g. ``with trace.span("llm_turn"): await agent.send(...)``.
+
+        Args:
+            name: Span name, used as the histogram key
+            **attrs: Extra attributes stored with the span
+
+        Yields:
+            The span record, so attributes can be added inside the block
+        """
+        started = time.perf_counter()
+        record = {"name": name, "start_ms": round((started - self.started) * 1000, 3), **attrs}
+        try:
+            yield record
+        except BaseException as e:
+            record["error"] = type(e).__name__
+            raise
+        finally:
+            duration = time.perf_counter() - started
+            record["duration_ms"] = round(duration * 1000, 3)
+            self.spans.append(record)
+            self.tracer.record(name, duration)
+
+    def add_span(self, name: str, duration: float, **attrs):
+        """Record a span measured elsewhere, e.g. time spent in a queue
+
+        Args:
+            name: Span name
+            duration: Duration in seconds
+            **attrs: Extra attributes stored with the span
+        """
+        start = time.perf_counter() - duration - self.started
+        self.spans.append({
+            "name": name,
+            "start_ms": round(start * 1000, 3),
+            "duration_ms": round(duration * 1000, 3),
+            **attrs,
+        })
+        self.tracer.record(name, duration)
+
+    def finish(self, **attrs):
+        """Close the trace, recording its total time and dumping it"""
+        if self.finished:
+            return
+        self.finished = True
+        self.attrs.update(attrs)
+        self.tracer.finish(self, time.perf_counter() - self.started)
+
+
+_current_trace: contextvars.ContextVar[Optional[Trace]] = contextvars.ContextVar("current_trace", default=None)
+
+
+def current_trace() -> Optional[Trace]:
+    """Return the trace of the event being processed, if any"""
+    return _current_trace.get()
+
+
+@contextmanager
+def use_trace(trace: Optional[Trace]) -> Iterator[Optional[Trace]]:
+    """Make a trace current for the duration of the block"""
+    token = _current_trace.set(trace)
+    try:
+        yield trace
+    finally:
+        _current_trace.reset(token)
+
+
+@contextmanager
+def span(name: str, **attrs) -> Iterator[Optional[Dict[str, Any]]]:
+    """Time a block of work in the current trace, no-op without one
+
+    Args:
+        name: Span name
+        **attrs: Extra attributes stored with the span
+    """
+    trace = _current_trace.get()
+    if trace is None:
+        yield None
+        return
+    with trace.span(name, **attrs) as record:
+        yield record
+
+
+def record_span(name: str, duration: float, **attrs):
+    """Add a span measured elsewhere to the current trace, no-op without one"""
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.add_span(name, duration, **attrs)
+
+
+def annotate(**attrs):
+    """Attach attributes (e.g. the route an event took) to the current trace"""
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.attrs.update(attrs)
+
+
+class Tracer:
+    """Collects per-stage latency histograms and dumps traces as JSON lines"""
+
+    def __init__(self, dump_path: Optional[str] = None, flush_every: int = 100):
+        """Initialize the tracer
+
+        Args:
+            dump_path: Optional JSON-lines file receiving every finished trace
+            flush_every: Number of traces buffered before the dump file is flushed
+        """
+        self.histograms: Dict[str, Histogram] = {}
+        self.flush_every = flush_every
+        self._ids = itertools.count(1)
+        self._dump = None
+        self._pending = 0
+        self.configure(dump_path)
+
+    def configure(self, dump_path: Optional[str] = None):
+        """Set the JSON-lines dump file, closing the previous one"""
+        self.close()
+        self.dump_path = dump_path
+        if dump_path:
+            os.makedirs(os.path.dirname(dump_path) or ".", exist_ok=True)
+            self._dump = open(dump_path, "a", buffering=1 << 16)
+
+    def start_trace(self, event_id: Optional[str] = None) -> Trace:
+        """Start a new trace
+
+        Args:
+            event_id: Optional identifier of the traced event
+        """
+        return Trace(self, next(self._ids), event_id)
+
+    def record(self, name: str, duration: float):
+        """Record a duration in the histogram of a stage"""
+        histogram = self.histograms.get(name)
+        if histogram is None:
+            histogram = self.histograms[name] = Histogram()
+        histogram.record(duration)
+
+    def finish(self, trace: Trace, total: float):
+        """Record a finished trace and append it to the dump file"""
+        self.record("total", total)
+        if self._dump is None:
+            return
+        self._dump.write(json.dumps({
+            "trace_id": trace.trace_id,
+            "event_id": trace.event_id,
+            "started_at": trace.started_wall,
+            "total_ms": round(total * 1000, 3),
+            "spans": trace.spans,
+            **trace.attrs,
+        }, default=str) + "\n")
+        self._pending += 1
+        if self._pending >= self.flush_every:
+            self.flush()
+
+    def flush(self):
+        """Flush buffered traces to the dump file"""
+        if self._dump:
+            self._dump.flush()
+            self._pending = 0
+
+    def close(self):
+        """Flush and close the dump file"""
+        if getattr(self, "_dump", None):
+            self._dump.close()
+            self._dump = None
+
+    def stats(self) -> Dict[str, Any]:
+        """Return a summary of every stage histogram"""
+        return {name: histogram.summary() for name, histogram in sorted(self.histograms.items())}
+
+    def prometheus(self, prefix: str = "newsquantar") -> str:
+        """Render the histograms in the Prometheus text exposition format"""
+        metric = f"{prefix}_stage_duration_seconds"
+        lines = [
+            f"# HELP {metric} Time spent per pipeline stage",
+            f"# TYPE {metric} summary",
+        ]
+        for name, histogram in sorted(self.histograms.items()):
+            for q in QUANTILES:
+                lines.append(f'{metric}{{stage="{name}",quantile="{q}"}} {histogram.quantile(q):.6f}')
+            lines.append(f'{metric}_sum{{stage="{name}"}} {histogram.sum:.6f}')
+            lines.append(f'{metric}_count{{stage="{name}"}} {histogram.count}')
+        return "\n".join(lines) + "\n"
+
+
+# Process-wide tracer shared by the webhook server and the trading pipeline
+tracer = Tracer()
@@ -0,0 +1,155 @@
+import time
+import sqlite3
+import logging
+import httpx
+from typing import Dict, Any, Iterable, List, Optional, Tuple
+
+from neynar_client import AsyncNeynarClient
+
+logger = logging.getLogger("user-directory")
+
+# Maximum FIDs per /user/bulk request
+BULK_BATCH_SIZE = 100
+
+
+class UserDirectory:
+    """Username to FID resolution with an in-memory TTL cache and optional SQLite store"""
+
+    def __init__(self, client: AsyncNeynarClient, ttl: float = 3600.0, path: Optional[str] = None):
+        """Initialize the user directory
+
+        Args:
+            client: Async Neynar client
+            ttl: Seconds a resolved username stays valid
+            path: Optional SQLite file persisting resolved usernames across restarts
+        """
+        self.client = client
+        self.ttl = ttl
+        self.path = path
+        # username (lowercase) -> (fid or None if not found, resolved_at)
+        self._cache: Dict[str, Tuple[Optional[int], float]] = {}
+        self._db: Optional[sqlite3.Connection] = None
+
+        # Counters
+        self.hits = 0
+        self.misses = 0
+        self.lookups = 0
+
+        if path:
+            self._open(path)
+
+    def _open(self, path: str):
+        """Open the SQLite store and load unexpired entries"""
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS users (username TEXT PRIMARY KEY, fid INTEGER, resolved_at REAL NOT NULL)"
+        )
+        cutoff = time.time() - self.ttl
+        for username, fid, resolved_at in self._db.execute(
+            "SELECT username, fid, resolved_at FROM users WHERE resolved_at >= ?", (cutoff,)
+        ):
+            self._cache[username] = (fid, resolved_at)
+
+    def close(self):
+        """Close the SQLite store"""
+        if self._db:
+            self._db.close()
+            self._db = None
+
+    def _store(self, username: str, fid: Optional[int]):
+        now = time.time()
+        self._cache[username] = (fid, now)
+        if self._db:
+            self._db.execute(
+                "INSERT OR REPLACE INTO users (username, fid, resolved_at) VALUES (?, ?, ?)",
+                (username, fid, now),
+            )
+
+    def cached(self, username: str) -> Optional[int]:
+        """Return the cached FID of a username without any network I/O
+
+        Args:
+            username: Farcaster username
+
+        Returns:
+            FID, or None if unknown or expired
+        """
+        entry = self._cache.get(username.lower().lstrip('@'))
+        if entry and time.time() - entry[1] <= self.ttl:
+            return entry[0]
+        return None
+
+    async def resolve(self, usernames: Iterable[str]) -> Dict[str, Optional[int]]:
+        """Resolve usernames to FIDs, looking up cache misses concurrently
+
+        Args:
+            usernames: Farcaster usernames
+
+        Returns:
+            Mapping of username to FID, None for usernames that do not exist
+        """
+        names = {name: name.lower().lstrip('@') for name in usernames}
+        now = time.time()
+        missing: List[str] = []
+        for key in set(names.values()):
+            entry = self._cache.get(key)
+            if entry and now - entry[1] <= self.ttl:
+                self.hits += 1
+            else:
+                self.misses += 1
+                missing.append(key)
+
+        if missing:
+            self.lookups += len(missing)
+            results = await self.client.gather([self.client.lookup_user_by_username(key) for key in missing])
+            for key, result in zip(missing, results):
+                if isinstance(result, httpx.HTTPStatusError) and result.response.status_code == 404:
+                    self._store(key, None)
+                elif isinstance(result, Exception):
+                    # Keep a stale entry rather than failing the whole batch
+                    logger.warning(f"Failed to resolve @{key}: {str(result)}")
+                else:
+                    fid = (result.get('user') or {}).get('fid')
+                    self._store(key, int(fid) if fid is not None else None)
+            if self._db:
+                self._db.commit()
+
+        return {name: (self._cache.get(key) or (None, 0))[0] for name, key in names.items()}
+
+    async def get_users(self, fids: Iterable[int]) -> Dict[int, Dict[str, Any]]:
+        """Fetch user profiles by FID in batches of 100, batches in parallel
+
+        Profiles also refresh the username cache, which keeps it correct
+        when users rename themselves.
+
+        Args:
+            fids: Farcaster IDs
+
+        Returns:
+            Mapping of FID to user profile
+        """
+        fids = sorted({int(fid) for fid in fids})
+        batches = [fids[i:i + BULK_BATCH_SIZE] for i in range(0, len(fids), BULK_BATCH_SIZE)]
+        results = await self.client.gather([self.client.fetch_bulk_users(batch) for batch in batches])
+
+        users: Dict[int, Dict[str, Any]] = {}
+        for result in results:
+            if isinstance(result, Exception):
+                logger.warning(f"Failed to fetch users: {str(result)}")
+                continue
+            for user in result.get('users', []):
+                users[user['fid']] = user
+                if user.get('username'):
+                    self._store(user['username'].lower(), user['fid'])
+        if self._db:
+            self._db.commit()
+        return users
+
+    def stats(self) -> Dict[str, Any]:
+        """Return cache statistics"""
+        return {
+            "size": len(self._cache),
+            "hits": self.hits,
+            "misses": self.misses,
+            "lookups": self.lookups,
+        }
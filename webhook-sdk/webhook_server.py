@@ -1,10 +1,24 @@
 import uvicorn
 from fastapi import FastAPI, Request, HTTPException
+from fastapi.responses import PlainTextResponse
 from pydantic import BaseModel
 from typing import Dict, Any, Optional, Callable, Awaitable
-import json
+import os
+import signal
+import socket
+import shutil
 import logging
 import asyncio
+import tempfile
+import multiprocessing
+
+from event_queue import EventQueue, DROP_OLDEST
+from dedup_store import DedupStore, event_key
+from tracing import Trace, tracer
+from log_config import LazyText, PayloadSampler, configure_from_env
+from ingest_ipc import IngestBridge, IngestForwarder
+from cast_event import CastEvent, WebhookEvent, as_event, decode_event, to_payload
+from event_journal import EventJournal
 
 # Configure logging
 logging.basicConfig(
@@ -12,100 +26,471 @@ logging.basicConfig(
     format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
 )
 logger = logging.getLogger("webhook-server")
+# Per-stage loggers, so each stage's level can be tuned (see log_config.py)
+http_logger = logging.getLogger("webhook-server.http")
+dedup_logger = logging.getLogger("webhook-server.dedup")
+event_logger = logging.getLogger("webhook-server.events")
 
 
 class WebhookServer:
     """Neynar Webhook Receiver Service Class"""
     
-    def __init__(self, callback: Optional[Callable[[Dict[str, Any]], Awaitable[None]]] = None):
+    def __init__(
+        self,
+        callback: Optional[Callable[[WebhookEvent], Awaitable[None]]] = None,
+        queue_size: int = 1000,
+        workers: int = 4,
+        overflow_policy: str = DROP_OLDEST,
+        dedup_max_entries: int = 100_000,
+        dedup_ttl: float = 86400.0,
+        dedup_path: Optional[str] = None,
+        trace_path: Optional[str] = None,
+        payload_sample_rate: float = 0.01,
+        drain_timeout: Optional[float] = 30.0,
+        forward_path: Optional[str] = None,
+        journal_path: Optional[str] = None,
+        journal_max_age: float = 600.0,
+        journal_durable_ack: bool = False,
+    ):
         """Initialize webhook receiver service
         
         Args:
-            callback: Optional callback function to call when webhook events are received
+            callback: Optional callback function to call when webhook events are received,
+                with a CastEvent for cast.created and the decoded dict for other events
+            queue_size: Maximum number of events waiting for the callback
+            workers: Number of worker tasks invoking the callback concurrently
+            overflow_policy: Backpressure policy when the queue is full (drop_oldest, reject or block)
+            dedup_max_entries: Maximum number of event keys remembered for deduplication
+            dedup_ttl: Seconds an event key is remembered
+            dedup_path: Optional SQLite file so dedup state survives restarts
+            trace_path: Optional JSON-lines file receiving a latency trace per event
+            payload_sample_rate: Fraction of requests whose full payload is logged
+            drain_timeout: Maximum seconds to wait for in-flight events on shutdown
+            forward_path: Unix socket of an executor process to forward events to,
+                used by the ingest workers of ``serve(processes=N)``
+            journal_path: Optional SQLite file journaling queued events, so events
+                unfinished at a crash are replayed on the next start
+            journal_max_age: Seconds after which an unfinished event is too stale to replay
+            journal_durable_ack: Acknowledge webhooks only once their event is on disk
         """
         self.app = FastAPI(title="Neynar Webhook Receiver")
         self.callback = callback
-        self.processed_events = set()
+        self.dedup = DedupStore(max_entries=dedup_max_entries, ttl=dedup_ttl, path=dedup_path)
+        if trace_path:
+            tracer.configure(trace_path)
+        self.payload_sampler = PayloadSampler(payload_sample_rate)
+        self.drain_timeout = drain_timeout
+        
+        # Ingest workers hand events to the executor process instead of a local queue
+        self.forwarder = IngestForwarder(forward_path) if forward_path else None
+        
+        # Events are acknowledged immediately and handed to the callback by workers
+        self.event_queue = None
+        self.journal = None
+        self.journal_max_age = journal_max_age
+        if callback:
+            if journal_path:
+                self.journal = EventJournal(journal_path, durable_ack=journal_durable_ack)
+            self.event_queue = EventQueue(
+                callback,
+                maxsize=queue_size,
+                workers=workers,
+                overflow_policy=overflow_policy,
+                on_state=self._journal_state if self.journal else None,
+            )
+        
+        # Event loop the server runs on, set at startup
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self._ready = asyncio.Event()
+        self._should_exit = asyncio.Event()
+        self._server: Optional[uvicorn.Server] = None
+        self.bridge: Optional[IngestBridge] = None
+        
+        @self.app.on_event("startup")
+        async def startup():
+            await self.start()
+        
+        @self.app.on_event("shutdown")
+        async def shutdown():
+            await self.stop()
         
         # Register routes
         @self.app.get("/")
         async def root():
             return {"message": "Neynar Webhook Server is running"}
         
+        @self.app.get("/stats")
+        async def stats():
+            """Endpoint exposing event queue statistics"""
+            # Ingest workers hold no pipeline state, the executor process answers
+            if self.forwarder:
+                return await self.forwarder.query("stats")
+            return self.stats()
+        
+        @self.app.get("/metrics", response_class=PlainTextResponse)
+        async def metrics():
+            """Endpoint exposing per-stage latency histograms in Prometheus format"""
+            if self.forwarder:
+                return await self.forwarder.query("metrics")
+            return tracer.prometheus()
+        
         @self.app.post("/webhook")
         async def webhook(request: Request):
             """Endpoint for receiving Neynar webhook events"""
+            trace = tracer.start_trace()
+            # Once submitted, the trace is finished by submit() or the queue worker
+            submitted = False
+            status = "error"
             try:
                 # Get raw request body
-                body = await request.body()
+                with trace.span("http_receive"):
+                    body = await request.body()
                 
-                # Log received event
-                logger.info(f"Received webhook event: {body.decode('utf-8')}")
+                # Log received event, the full payload only for a sample of requests
+                if self.payload_sampler.sample():
+                    http_logger.info("Sampled webhook payload: %s", LazyText(body))
+                http_logger.debug("Received webhook event (%d bytes)", len(body))
                 
-                # Parse JSON
+                # Parse JSON straight into a typed event
                 try:
-                    data = json.loads(body)
-                    # Process event
-                    await self.process_event(data)
-                    
-                    # Call callback function if provided
-                    if self.callback:
-                        # Add event ID check
-                        event_id = f"{data.get('type')}_{data.get('created_at')}"
-                        if event_id not in self.processed_events:
-                            self.processed_events.add(event_id)
-                            logger.info(f"Processing new event: {event_id}")
-                            await self.callback(data)
-                        else:
-                            logger.info(f"Already processed event, skipping: {event_id}")
-                    
-                    return {"status": "success", "message": "Event received"}
-                except json.JSONDecodeError:
+                    with trace.span("json_parse"):
+                        data = decode_event(body)
+                except ValueError:
                     logger.error("Failed to parse JSON")
+                    status = "invalid_json"
                     raise HTTPException(status_code=400, detail="Invalid JSON")
+                
+                # Process event
+                await self.process_event(data)
+                
+                # Hand the event to the executor process, or queue it for the callback
+                if self.forwarder:
+                    # The executor records this worker's stages with the event's trace
+                    spans = {record["name"]: record["duration_ms"] / 1000 for record in trace.spans}
+                    try:
+                        accepted = await self.forwarder.submit(to_payload(data), spans)
+                    except ConnectionError:
+                        # The forwarder is reconnecting, Neynar retries the delivery
+                        status = "rejected"
+                        raise HTTPException(status_code=503, detail="Executor unavailable")
+                    if not accepted:
+                        status = "rejected"
+                        raise HTTPException(status_code=503, detail="Event queue full")
+                    status = "forwarded"
+                    return {"status": "success", "message": "Event received"}
+                if self.event_queue:
+                    submitted = True
+                    if not await self.submit(data, trace):
+                        raise HTTPException(status_code=503, detail="Event queue full")
+                
+                status = "received"
+                return {"status": "success", "message": "Event received"}
+            except HTTPException:
+                raise
             except Exception as e:
                 logger.error(f"Error processing webhook: {str(e)}")
                 raise HTTPException(status_code=500, detail=str(e))
+            finally:
+                if not submitted:
+                    trace.finish(status=status)
+    
+    async def start(self):
+        """Start the event queue workers on the running event loop"""
+        self.loop = asyncio.get_running_loop()
+        await self.dedup.start()
+        if self.event_queue:
+            await self.event_queue.start()
+        if self.journal:
+            await self.replay_journal()
+            await self.journal.start()
+        if self.forwarder:
+            await self.forwarder.connect()
+        self._ready.set()
+    
+    async def stop(self):
+        """Drain the event queue and release resources"""
+        self._ready.clear()
+        if self.forwarder:
+            await self.forwarder.close()
+        if self.event_queue:
+            await self.event_queue.stop(drain=True, timeout=self.drain_timeout)
+        if self.journal:
+            await self.journal.close()
+        await self.dedup.stop()
+        self.dedup.close()
+        tracer.close()
+    
+    async def replay_journal(self):
+        """Queue events left unfinished by a previous run, oldest first"""
+        for key, payload in self.journal.recover(self.journal_max_age):
+            # Remember the key, so a late redelivery of the same event is skipped
+            self.dedup.add(key)
+            trace = tracer.start_trace(key)
+            trace.attrs["replayed"] = True
+            if not await self.event_queue.put(as_event(payload), trace):
+                logger.warning("Event queue full, could not replay journaled event: %s", key)
+                self.journal.mark(key, "rejected")
+                trace.finish(status="rejected")
+            else:
+                logger.info("Replaying journaled event: %s", key)
+    
+    def _journal_state(self, event: WebhookEvent, state: str):
+        """Record an event's processing state in the journal"""
+        self.journal.mark(event_key(event), state)
+    
+    async def wait_ready(self):
+        """Wait until the server has started and accepts events"""
+        await self._ready.wait()
     
-    async def process_event(self, event_data: Dict[str, Any]):
+    async def submit(self, data: WebhookEvent, trace: Optional[Trace] = None) -> bool:
+        """Deduplicate an event and queue it for the callback
+        
+        Used by the webhook endpoint and by other ingestion paths (e.g. polling)
+        so an event delivered by both is only processed once.
+        
+        Args:
+            data: Decoded event, or a raw cast.created payload (converted to a CastEvent)
+            trace: Latency trace of the event, a new one is started if not given
+            
+        Returns:
+            False if the event queue rejected the event, True otherwise
+        """
+        trace = trace or tracer.start_trace()
+        data = as_event(data)
+        
+        # Add event ID check
+        event_id = event_key(data)
+        trace.event_id = event_id
+        with trace.span("dedup"):
+            is_new = self.dedup.add(event_id)
+        if not is_new:
+            dedup_logger.info("Already processed event, skipping: %s", event_id)
+            trace.finish(status="duplicate")
+            return True
+        
+        dedup_logger.debug("Queueing new event: %s", event_id)
+        if self.journal:
+            with trace.span("journal"):
+                await self.journal.append(event_id, to_payload(data))
+        if not await self.event_queue.put(data, trace):
+            # Forget the event so Neynar's retry is not treated as a duplicate
+            self.dedup.discard(event_id)
+            if self.journal:
+                self.journal.mark(event_id, "rejected")
+            logger.warning("Event queue full, rejecting event: %s", event_id)
+            trace.finish(status="rejected")
+            return False
+        return True
+    
+    async def submit_forwarded(self, data: Dict[str, Any], spans: Dict[str, float]) -> bool:
+        """Submit an event forwarded by an ingest worker, with the stages it ran there
+        
+        Args:
+            data: Event payload
+            spans: Durations in seconds of the worker-side stages, e.g. json_parse
+        """
+        trace = tracer.start_trace()
+        for name, duration in spans.items():
+            trace.add_span(name, duration, process="ingest")
+        return await self.submit(data, trace)
+    
+    def query(self, name: str) -> Any:
+        """Answer a query of an ingest worker, see ``IngestBridge``"""
+        if name == "stats":
+            return self.stats()
+        if name == "metrics":
+            return tracer.prometheus()
+        raise ValueError(f"Unknown query: {name}")
+    
+    def submit_threadsafe(self, data: WebhookEvent):
+        """Submit an event from another thread or event loop
+        
+        Args:
+            data: Event data received from Neynar
+            
+        Returns:
+            concurrent.futures.Future resolving to the result of ``submit``
+        """
+        if self.loop is None:
+            raise RuntimeError("Webhook server is not running")
+        return asyncio.run_coroutine_threadsafe(self.submit(data), self.loop)
+    
+    async def process_event(self, event_data: WebhookEvent):
         """Process received events
         
         Args:
-            event_data: Event data received from Neynar
+            event_data: CastEvent, or the decoded dict of other event types
         """
         try:
-            # Check event type
-            event_type = event_data.get('type')
-            logger.info(f"Processing event type: {event_type}")
-            
-            if event_type == 'cast.created':
-                # Get cast data from data field
-                cast_data = event_data.get('data', {})
-                
-                # Get author information
-                author = cast_data.get('author', {})
-                username = author.get('username', 'unknown')
-                display_name = author.get('display_name', 'unknown')
-                
-                # Get cast text
-                text = cast_data.get('text', '')
-                
-                logger.info(f"New cast from {display_name} (@{username}): {text}")
+            if isinstance(event_data, CastEvent):
+                event_logger.info("New cast from %s (@%s): %s",
+                                  event_data.display_name, event_data.username, event_data.text)
+            else:
+                event_logger.debug("Processing event type: %s", event_data.get('type'))
         except Exception as e:
             logger.error(f"Error processing event: {str(e)}")
             logger.error(f"Event data: {event_data}")
     
-    def run(self, host: str = "0.0.0.0", port: int = 8000):
-        """Start webhook receiver service
+    def stats(self) -> Dict[str, Any]:
+        """Return webhook server statistics
+        
+        Returns:
+            Dictionary with event queue, dedup and latency statistics
+        """
+        return {
+            "queue": self.event_queue.stats() if self.event_queue else None,
+            "dedup": self.dedup.stats(),
+            "ipc": self.bridge.stats() if self.bridge else None,
+            "journal": self.journal.stats() if self.journal else None,
+            "latency": tracer.stats(),
+        }
+    
+    async def serve(self, host: str = "0.0.0.0", port: int = 8000, processes: int = 1):
+        """Serve the webhook endpoint on the running event loop
+        
+        The callback runs on the caller's loop, so it can share state (e.g. an
+        agent pool) with the rest of the application. Returns after a graceful
+        shutdown (SIGINT/SIGTERM or ``shutdown()``): the listening socket is
+        closed first, then in-flight requests finish and queued events drain.
+        
+        With ``processes > 1`` the HTTP endpoint runs in that many ingest worker
+        processes sharing the listening socket. Workers parse events and forward
+        them over a Unix socket to this process, which alone deduplicates and
+        runs the callback, so scaling ingestion never duplicates trades.
+        
+        Args:
+            host: Service host address
+            port: Service port
+            processes: Number of ingest worker processes, 1 serves in-process
+        """
+        self._should_exit.clear()
+        if processes > 1:
+            if self.event_queue is None:
+                raise ValueError("Serving with processes > 1 needs a callback, "
+                                 "forwarded events are queued for it in this process")
+            await self._serve_multiprocess(host, port, processes)
+            return
+        
+        config = uvicorn.Config(
+            self.app,
+            host=host,
+            port=port,
+            log_config=None,
+            timeout_graceful_shutdown=self.drain_timeout,
+        )
+        self._server = uvicorn.Server(config)
+        try:
+            await self._server.serve()
+        finally:
+            self._server = None
+    
+    def shutdown(self):
+        """Ask a running ``serve()`` to shut down gracefully"""
+        self._should_exit.set()
+        if self._server:
+            self._server.should_exit = True
+    
+    async def _serve_multiprocess(self, host: str, port: int, processes: int):
+        """Run ingest worker processes feeding this process's event queue"""
+        loop = asyncio.get_running_loop()
+        sock = socket.socket(socket.AF_INET6 if ":" in host else socket.AF_INET, socket.SOCK_STREAM)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        sock.bind((host, port))
+        sock.listen(2048)
+        sock.set_inheritable(True)
+        ipc_dir = tempfile.mkdtemp(prefix="webhook-ipc-")
+        ipc_path = os.path.join(ipc_dir, "ingest.sock")
+        
+        await self.start()
+        self.bridge = IngestBridge(ipc_path, self.submit_forwarded, self.query)
+        await self.bridge.start()
+        
+        context = multiprocessing.get_context("spawn")
+        options = {
+            "payload_sample_rate": self.payload_sampler.rate,
+            "drain_timeout": self.drain_timeout,
+            "forward_path": ipc_path,
+        }
+        
+        def spawn(index: int):
+            process = context.Process(
+                target=_run_ingest_worker,
+                args=(sock, options),
+                name=f"webhook-ingest-{index}",
+                daemon=True,
+            )
+            process.start()
+            return process
+        
+        workers = [spawn(i) for i in range(processes)]
+        logger.info("Serving on %s:%d with %d ingest worker processes", host, port, processes)
+        
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(sig, self.shutdown)
+        try:
+            while not self._should_exit.is_set():
+                # Replace ingest workers that died
+                for i, process in enumerate(workers):
+                    if not process.is_alive():
+                        logger.error("Ingest worker %s exited (%s), restarting", process.name, process.exitcode)
+                        workers[i] = spawn(i)
+                try:
+                    await asyncio.wait_for(self._should_exit.wait(), 1.0)
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            for sig in (signal.SIGINT, signal.SIGTERM):
+                loop.remove_signal_handler(sig)
+            
+            # Workers finish their in-flight requests, which still need the bridge
+            for process in workers:
+                process.terminate()
+            await asyncio.to_thread(_join_processes, workers, self.drain_timeout)
+            await self.bridge.stop()
+            sock.close()
+            await self.stop()
+            shutil.rmtree(ipc_dir, ignore_errors=True)
+    
+    def run(self, host: str = "0.0.0.0", port: int = 8000, processes: int = 1):
+        """Start webhook receiver service, blocking until it shuts down
         
         Args:
             host: Service host address
             port: Service port
+            processes: Number of ingest worker processes, 1 serves in-process
         """
-        uvicorn.run(self.app, host=host, port=port)
+        asyncio.run(self.serve(host=host, port=port, processes=processes))
+
+
+def _join_processes(processes, timeout: Optional[float]):
+    """Wait for processes to exit, killing those still running after the timeout"""
+    for process in processes:
+        process.join(timeout)
+        if process.is_alive():
+            process.kill()
+            process.join()
+
+
+def _run_ingest_worker(sock: socket.socket, options: Dict[str, Any]):
+    """Entry point of an ingest worker process started by ``serve(processes=N)``"""
+    configure_from_env()
+    server = WebhookServer(**options)
+    config = uvicorn.Config(
+        server.app,
+        log_config=None,
+        timeout_graceful_shutdown=options["drain_timeout"],
+    )
+    uvicorn.Server(config).run(sockets=[sock])
 
 
 # If this file is run directly, start the service
 if __name__ == "__main__":
-    server = WebhookServer()
-    server.run()
+    configure_from_env()
+    processes = int(os.getenv("WEBHOOK_PROCESSES", "1"))
+    
+    async def ignore_event(event: WebhookEvent):
+        """Events are already logged on receipt, there is nothing else to run"""
+    
+    # Forwarded events go through this process's queue, which only exists with a callback
+    server = WebhookServer(callback=ignore_event if processes > 1 else None)
+    server.run(processes=processes)